@@ -44,6 +44,27 @@ import os
 import sys
 import time
 import shutil
+import json
+import heapq
+import argparse
+import random
+import math
+import bisect
+import itertools
+import asyncio
+import concurrent.futures
+import multiprocessing
+import collections
+import signal
+import hashlib
+import threading
+import queue
+import cProfile
+import pstats
+import io
+import sqlite3
+import contextlib
+import atexit
 
 
 #The following changes the working directory to the folder in which the Python executable
@@ -54,10 +75,192 @@ import shutil
 cwd = os.getcwd()
 folder = os.path.basename(cwd) #Needed to get name of working directory.
 
+#Command-line options (all optional; with no options, Aligator runs on the FASTA files in the current folder).
+ArgParser = argparse.ArgumentParser(description="Aligator predicts optimal chemical ligation strategies for all FASTA .txt files in the current folder.")
+ArgParser.add_argument("--rerank", metavar="FOLDER", help="re-rank the strategies of a previous run (its output FOLDER) using the weights in the 'Scoring Weights' sheet of the Custom Parameters Input file, without recomputing segments")
+ArgParser.add_argument("--time-budget", type=float, metavar="SECONDS", help="stop building strategies for a protein after this many seconds, reporting the best strategies found so far and a bound on how far they could be from optimal")
+ArgParser.add_argument("--beam", metavar="N|auto", help="number of partial strategies kept for each endpoint while building strategies (default: the maximum number of strategies output); 'auto' starts small and widens the beam until the output strategies are proven to be the true top strategies")
+ArgParser.add_argument("--diverse", type=int, metavar="D", help="instead of the top-ranked strategies, list the best strategies that differ from each other in at least D junctions (moving one junction counts as 2)")
+ArgParser.add_argument("--sample", type=int, metavar="N", help="instead of the top-ranked strategies, draw N random strategies (with replacement) from all valid strategies of each protein")
+ArgParser.add_argument("--temperature", type=float, metavar="T", help="with --sample, draw strategies with probability proportional to exp(score/T) instead of uniformly")
+ArgParser.add_argument("--seed", type=int, help="with --sample, seed for the random number generator (for reproducible samples)")
+ArgParser.add_argument("--pareto", nargs="?", const="thioester,solubility,length,thiol,ligations", metavar="SCORES",
+                       help="also find the Pareto-optimal strategies over a comma-separated list of sub-scores (thioester, solubility, length, thiol, ligations; all five if none are given), written to a 'Pareto Front' sheet of the Aligator Analysis file")
+ArgParser.add_argument("--assembly", action="store_true", help="also find the best order in which to ligate the segments of each output strategy (convergent or sequential), written to an 'Assembly Orders' sheet of the Aligator Analysis file")
+ArgParser.add_argument("--serve", metavar="ADDRESS", help="run as a local service that takes jobs over HTTP on ADDRESS: [HOST:]PORT (e.g. 8765 or 127.0.0.1:8765), or unix:PATH for a Unix socket")
+ArgParser.add_argument("--watch", metavar="FOLDER", help="run as a local service that takes jobs from FASTA (.txt/.fasta) or job (.json) files dropped into FOLDER")
+ArgParser.add_argument("--workers", type=int, metavar="N", help="number of worker processes for --serve/--watch, --triage and for writing --shard workbooks (default: number of CPUs), or for building the strategies of each protein in a batch run (default: 1); the strategies found do not depend on the number of workers")
+ArgParser.add_argument("--benchmark", action="store_true", help="build the strategies of each protein with 1, 2, 4, ... up to --workers worker processes (default: number of CPUs), and report the time and speedup of each")
+ArgParser.add_argument("--profile", action="store_true", help="profile each phase of every protein, and write function tables, collapsed stacks (for flame graphs) and a summary ranking the proteins to a 'Profiles' sub-folder")
+ArgParser.add_argument("--boundary-scan", metavar="FIRST-LAST:FIRST-LAST",
+                       help="also find the best strategy of every construct of each protein that starts at a residue in the first range and ends at a residue in the second (e.g. 1-30:380-420), written to an Aligator Boundary Scan file with a heatmap of the best scores")
+ArgParser.add_argument("--triage", action="store_true", help="only find, for each protein, whether any strategy is possible, the best score and its number of segments, and the number of valid strategies, and write them to one summary table (no other output files)")
+ArgParser.add_argument("--shard", metavar="N|SIZEMB", help="split the Viable Segment Lists and Aligator Analysis workbooks into parts of at most N proteins, or of at most SIZE megabytes of output (e.g. 50MB), built at the same time on --workers processes, with an index workbook listing the part and sheet of each protein")
+ArgParser.add_argument("--database", nargs="?", const="", metavar="FILE",
+                       help="also save the segments and strategies of every protein, with their score breakdowns and junctions, to a SQLite database: 'Aligator Results.sqlite' in the output folder, or FILE, which is added to by every run that names it")
+ArgParser.add_argument("--export-database", metavar="FILE", help="write an Excel view of the SQLite database FILE (its runs, their proteins, and the strategies of its latest run) next to it, and exit")
+ArgParser.add_argument("--resume", metavar="FOLDER", help="finish an interrupted run (its output FOLDER) with the same settings and options, skipping the proteins it already completed")
+Args = ArgParser.parse_args()
+
+# RESUME MODE
+# The options of the interrupted run are restored from its manifest; its settings are restored after the prompts
+ResumeOptionList = ["rerank","time_budget","beam","diverse","sample","temperature","seed","pareto","boundary_scan","shard","database"]
+ResumeFlagList = ["assembly"] # Options given without a value
+ResumeFolder = Args.resume
+ResumeManifest = None
+if ResumeFolder!=None:
+    if any(getattr(Args,Option)!=None for Option in ResumeOptionList+["serve","watch","export_database"]) or Args.assembly==True or Args.benchmark==True or Args.triage==True:
+        ArgParser.error("--resume uses the options of the interrupted run, so it cannot be combined with other options")
+    try:
+        with open(os.path.join(ResumeFolder,"Aligator Run Manifest.json"),'r') as f:
+            ResumeManifest = json.load(f)
+    except (IOError,ValueError):
+        ArgParser.error(f"--resume: '{ResumeFolder}' does not have a readable Aligator Run Manifest.json (is it an Aligator output folder?)")
+    if not "settings" in ResumeManifest:
+        ArgParser.error(f"--resume: the run in '{ResumeFolder}' was made by an older version of Aligator and cannot be resumed")
+    if ResumeManifest.get("complete")==True:
+        print(f'The run in "{ResumeFolder}" is already complete; there is nothing to resume.')
+        sys.exit()
+    # The proteins finished by the interrupted run are listed in its journal, one line each; a line cut short by the
+    # interruption is ignored, and a protein listed twice (redone after its constraints changed) keeps its last line
+    ResumeJournalDict = {ManifestEntry["protein"]:ManifestEntry for ManifestEntry in ResumeManifest["proteins"]}
+    if os.path.exists(os.path.join(ResumeFolder,"Aligator Run Journal.jsonl")):
+        with open(os.path.join(ResumeFolder,"Aligator Run Journal.jsonl"),'r') as f:
+            for JournalLine in f:
+                try:
+                    ManifestEntry = json.loads(JournalLine)
+                except ValueError:
+                    continue
+                ResumeJournalDict[ManifestEntry["protein"]] = ManifestEntry
+    ResumeManifest["proteins"] = list(ResumeJournalDict.values())
+    for Option in ResumeOptionList:
+        setattr(Args,Option,ResumeManifest["settings"]["options"].get(Option))
+    for Flag in ResumeFlagList:
+        setattr(Args,Flag,ResumeManifest["settings"]["options"].get(Flag)==True)
+RerankFolder = Args.rerank
+TimeBudget = Args.time_budget
+SampleCount = Args.sample
+Temperature = Args.temperature
+if TimeBudget!=None and TimeBudget<=0:
+    ArgParser.error("--time-budget must be larger than 0 seconds")
+if TimeBudget!=None and RerankFolder!=None:
+    ArgParser.error("--time-budget cannot be used with --rerank, which always finds the exact top strategies")
+BeamWidth = None # None uses the maximum number of strategies output
+BeamAuto = Args.beam=="auto"
+if Args.beam!=None and BeamAuto==False:
+    try:
+        BeamWidth = int(Args.beam)
+    except ValueError:
+        ArgParser.error("--beam must be a number of strategies or 'auto'")
+    if BeamWidth<=0:
+        ArgParser.error("--beam must be at least 1")
+if Args.beam!=None and (SampleCount!=None or RerankFolder!=None):
+    ArgParser.error("--beam cannot be used with --sample or --rerank, which do not trim partial strategies")
+DiverseDistance = Args.diverse
+if DiverseDistance!=None and DiverseDistance<1:
+    ArgParser.error("--diverse must be at least 1 junction")
+if DiverseDistance!=None and (SampleCount!=None or TimeBudget!=None or Args.beam!=None):
+    ArgParser.error("--diverse cannot be used with --sample, --time-budget or --beam")
+if SampleCount!=None and SampleCount<=0:
+    ArgParser.error("--sample must be at least 1")
+if SampleCount!=None and TimeBudget!=None:
+    ArgParser.error("--time-budget cannot be used with --sample")
+if SampleCount==None and (Temperature!=None or Args.seed!=None):
+    ArgParser.error("--temperature and --seed can only be used with --sample")
+if Temperature!=None and Temperature<=0:
+    ArgParser.error("--temperature must be larger than 0")
+ServeSocketPath=None
+ServeHost="127.0.0.1"
+ServePort=None
+if Args.serve!=None:
+    if Args.serve.startswith("unix:"):
+        ServeSocketPath=Args.serve[len("unix:"):]
+        if ServeSocketPath=="" or not hasattr(asyncio,"start_unix_server"):
+            ArgParser.error("--serve: Unix sockets need a PATH (unix:PATH) and are not available on this system")
+    else:
+        (ServeHostText,Separator,ServePortText)=Args.serve.rpartition(":")
+        if ServeHostText!="":
+            ServeHost=ServeHostText
+        if not ServePortText.isdigit() or not 0<int(ServePortText)<65536:
+            ArgParser.error(f"--serve: '{Args.serve}' is not a valid address (use [HOST:]PORT or unix:PATH)")
+        ServePort=int(ServePortText)
+WatchFolder=Args.watch
+if WatchFolder!=None and not os.path.isdir(WatchFolder):
+    ArgParser.error(f"--watch: the folder '{WatchFolder}' does not exist")
+ServiceMode=Args.serve!=None or WatchFolder!=None
+if ServiceMode and (Args.rerank!=None or Args.time_budget!=None or Args.diverse!=None or Args.sample!=None or Args.pareto!=None or Args.assembly==True or Args.boundary_scan!=None or Args.shard!=None or Args.database!=None):
+    ArgParser.error("--serve and --watch cannot be combined with --rerank, --time-budget, --diverse, --sample, --pareto, --assembly, --boundary-scan, --shard or --database")
+if Args.workers!=None and Args.workers<1:
+    ArgParser.error("--workers must be at least 1")
+if Args.profile==True and ServiceMode:
+    ArgParser.error("--profile cannot be used with --serve or --watch")
+if Args.benchmark==True and (ServiceMode or Args.rerank!=None or Args.diverse!=None or Args.sample!=None or Args.time_budget!=None):
+    ArgParser.error("--benchmark cannot be combined with --serve, --watch, --rerank, --diverse, --sample or --time-budget")
+WorkerCount=Args.workers
+if WorkerCount==None:
+    WorkerCount=os.cpu_count() or 1
+# Batch runs build the strategies of each protein on one process unless --workers is given (or benchmarked)
+SearchWorkerCount=1
+if Args.workers!=None or Args.benchmark==True:
+    SearchWorkerCount=WorkerCount
+if Args.triage==True and (any(getattr(Args,Option)!=None for Option in ResumeOptionList) or Args.assembly==True or ServiceMode or Args.benchmark==True or Args.profile==True):
+    ArgParser.error("--triage only writes its summary table, so it can only be combined with --workers")
+# The boundary scan ranges are kept as the list of start indices and the list of end indices (after the last residue)
+BoundaryRanges=None
+if Args.boundary_scan!=None:
+    BoundaryRangeList=[]
+    for RangeText in Args.boundary_scan.split(":"):
+        (FirstText,Separator,LastText)=RangeText.strip().partition("-")
+        if Separator=="":
+            LastText=FirstText
+        if not FirstText.strip().isdigit() or not LastText.strip().isdigit() or not 1<=int(FirstText)<=int(LastText):
+            ArgParser.error(f"--boundary-scan: '{RangeText}' is not a range of residue numbers (such as 380-420)")
+        BoundaryRangeList.append((int(FirstText),int(LastText)))
+    if len(BoundaryRangeList)!=2:
+        ArgParser.error(f"--boundary-scan: '{Args.boundary_scan}' is not two ranges of residue numbers (such as 1-30:380-420)")
+    BoundaryRanges=(list(range(BoundaryRangeList[0][0]-1,BoundaryRangeList[0][1])),list(range(BoundaryRangeList[1][0],BoundaryRangeList[1][1]+1)))
+    if RerankFolder!=None:
+        ArgParser.error("--boundary-scan cannot be used with --rerank, which does not keep the junctions of the previous run")
+ShardProteins=None
+ShardBytes=None
+if Args.shard!=None:
+    try:
+        if Args.shard.upper().endswith("MB"):
+            ShardBytes=int(float(Args.shard[:-2])*1000000)
+        else:
+            ShardProteins=int(Args.shard)
+    except ValueError:
+        ArgParser.error(f"--shard: '{Args.shard}' is not a number of proteins or a size in megabytes (such as 50MB)")
+    if (ShardProteins!=None and ShardProteins<1) or (ShardBytes!=None and ShardBytes<=0):
+        ArgParser.error("--shard must be at least 1 protein or larger than 0 MB")
+ExportDatabasePath=Args.export_database
+if ExportDatabasePath!=None:
+    if any(getattr(Args,Option)!=None for Option in ResumeOptionList+["serve","watch","workers"]) or Args.assembly==True or Args.benchmark==True or Args.profile==True or Args.triage==True:
+        ArgParser.error("--export-database only writes the Excel view of a database, so it cannot be combined with other options")
+    if not os.path.isfile(ExportDatabasePath):
+        ArgParser.error(f"--export-database: the database '{ExportDatabasePath}' does not exist")
+ParetoScoreList=None
+if Args.pareto!=None:
+    ParetoScoreList=[Score.strip().lower() for Score in Args.pareto.split(",") if Score.strip()!=""]
+    for Score in ParetoScoreList:
+        if not Score in ("thioester","solubility","length","thiol","ligations"):
+            ArgParser.error(f"--pareto: '{Score}' is not a sub-score (choose from thioester, solubility, length, thiol, ligations)")
+    if len(ParetoScoreList)==0:
+        ArgParser.error("--pareto: no sub-scores were given")
+    ParetoScoreList=list(dict.fromkeys(ParetoScoreList))
+
 #Creates the output folder for a run based on the timestamp.
-timestamp = str(datetime.datetime.now().strftime("%B %d, %Y %I_%M_%S %p"))
-os.makedirs("./" + timestamp)
-OutputFolder=f'./{timestamp}'
+#A resumed run keeps writing to the folder of the interrupted run, and exporting a database needs no output folder.
+if ExportDatabasePath!=None:
+    timestamp = None
+    OutputFolder = None
+elif ResumeFolder==None:
+    timestamp = str(datetime.datetime.now().strftime("%B %d, %Y %I_%M_%S %p"))
+    os.makedirs("./" + timestamp)
+    OutputFolder=f'./{timestamp}'
+else:
+    timestamp = ResumeManifest["started"]
+    OutputFolder=ResumeFolder
 
 
 # The following variables toggle different functions of the program (for development purposes only).
@@ -72,6 +275,10 @@ prompt_for_user_inputs=True # Toggle False to quickly test program without runni
 
 merge_output_csv=True # Final output CSV files are merged into Excel format (.xlsx) for better readability.
 
+output_segment_tables=True # Saves the raw segment components of each protein in a sub-folder, so the run can be re-ranked later with new scoring weights.
+
+output_queue_size=2 # Number of finished proteins that can wait for the background output writer before the next protein has to wait for it.
+
 
 #The following codes for variables that are important in scoring segments and compiling
 #optimal strategies. All of these variables cannot be changed while running Aligator,
@@ -110,6 +317,29 @@ MinSegLen = 10
 #Defines the maximum number of strategies to put in the Excel output file:
 MaxStrategies = 1000
 
+#Defines the first beam width tried by --beam auto, as a fraction of the maximum number of strategies
+#(the beam is then doubled until the output strategies are proven exact).
+AutoBeamFraction = 1/16
+
+#Defines the largest number of partial strategies --diverse extends for each protein before giving up on finding
+#enough strategies that differ from each other.
+DiverseCandidateLimit = 1000000
+
+#Defines the temperature T of the weighted segment and junction usage in the Viable Segment List, where each valid
+#strategy is weighted by exp(score/T); with --sample and --temperature, the sampling temperature is used instead.
+UsageTemperature = 1
+
+#Defines the weights used to score the order in which the segments of a strategy are ligated (--assembly): the
+#score per ligation step on the longest path to the full-length protein (sequential assembly of n segments takes
+#n-1 steps, convergent assembly fewer), the score per convergent ligation (two intermediates of more than one segment
+#joined, which needs extra protecting group or thioester surrogate steps), and the weight of the solubility score of
+#each intermediate.
+AssemblyWeights = {
+    "LigationStep":-1,
+    "ConvergentLigation":-1,
+    "IntermediateSolubility":1
+    }
+
 #Defines the optimal segment length for scoring segments based on length (point at which
 #score = 2)
 bestSegmentLen = 40
@@ -122,6 +352,51 @@ autoCutoffSegLength = 35
 #strategies that are longer than (protein length / penaltySegLength) segments.
 autoPenaltySegLength = 40
 
+#Defines the weights used to score segments and strategies. A previous run can be re-ranked with
+#different weights (from the "Scoring Weights" sheet of the Custom Parameters Input file) without
+#recomputing any segments by running Aligator with the --rerank option.
+ScoringWeights = {
+    "PreferredTE":2, # Score for segments with a preferred thioester
+    "AcceptedTE":0, # Score for segments with an accepted thioester
+    "OKThiol":-2, # Desulfurization penalty for accepted thiols
+    "PoorThiol":-4, # Desulfurization & kinetics penalty for poor thiols
+    "LengthPeak":2, # Length score for segments of bestSegmentLen
+    "LengthSlope":0.1, # Length score lost per residue away from bestSegmentLen
+    "bestSegmentLen":bestSegmentLen,
+    "ExtraLigation":-2, # Penalty per segment beyond the ideal number of segments
+    "autoPenaltySegLength":autoPenaltySegLength,
+    "meanSolLimit":meanSolLimit,
+    "oneStdDev":oneStdDev,
+    "twoStdDev":twoStdDev,
+    "threeStdDev":threeStdDev,
+    "HHDivisor":2 # Negative solubility scores are divided by this for segments with helping hand sites
+    }
+
+#Cells of the "Scoring Weights" sheet in the Custom Parameters Input file holding each weight.
+ScoringWeightCells = [("PreferredTE","B2"), ("AcceptedTE","B3"), ("OKThiol","B4"), ("PoorThiol","B5"),
+                      ("LengthPeak","B6"), ("LengthSlope","B7"), ("bestSegmentLen","B8"), ("ExtraLigation","B9"),
+                      ("autoPenaltySegLength","B10"), ("meanSolLimit","B11"), ("oneStdDev","B12"),
+                      ("twoStdDev","B13"), ("threeStdDev","B14"), ("HHDivisor","B15")]
+
+#Defines the extra per-residue scoring terms added to every segment score (none by default). Each term is a
+#per-residue value table and a mapping (from ScoringTermMappings below) that turns the values of a segment into a
+#score; terms are read from the "Scoring Terms" sheet of the Custom Parameters Input file, or can be declared here
+#with addScoringTerm in the developer defaults further below.
+ScoringTermList = []
+
+#Kyte-Doolittle hydrophobicity scale (J. Mol. Biol. 1982, 157, 105-132).
+KyteDoolittleScale = {"A":1.8, "R":-4.5, "N":-3.5, "D":-3.5, "C":2.5, "Q":-3.5, "E":-3.5, "G":-0.4, "H":-3.2, "I":4.5,
+                      "L":3.8, "K":-3.9, "M":1.9, "F":2.8, "P":-1.6, "S":-0.8, "T":-0.7, "W":-0.9, "Y":-1.3, "V":4.2}
+
+#Defines the largest number of sequences one motif of a scoring term can stand for (see expandMotif).
+MotifExpansionLimit = 100000
+
+#Amino acid columns of the "Scoring Terms" sheet in the Custom Parameters Input file.
+ScoringTermResidues = ["A","C","D","E","F","G","H","I","K","L","M","N","P","Q","R","S","T","V","W","Y"]
+
+#Name of the sub-folder holding the cached segment tables of each run (used for re-ranking).
+SegmentTablesFolder = "Segment Tables"
+
 #Creates colors to fill in Excel cells (openpyxl).
 aquaFill = PatternFill(start_color='007FFFD4',
                        end_color='007FFFD4',
@@ -156,13 +431,17 @@ def numericalSort(value):
     return parts
 
 # This function takes an input strategy (a list of numbers representing start, NCL junctions, and end) and gives a dictionary of scores
-def scoreStrategy(InputStrategy):
+# The segment scores of the current protein are used unless another protein's SegmentScores are given
+def scoreStrategy(InputStrategy,SegmentScores=None):
+    if SegmentScores==None:
+        SegmentScores=SegmentScoreDict
     ScoreDict={
         "thioester":0,
         "solubility":0,
         "length":0,
         "thiol":0,
         "ligations":0,
+        "terms":0,
         "total":0
         }
     # Loop through segments and add up their sub-scores
@@ -170,33 +449,3078 @@ def scoreStrategy(InputStrategy):
         SegmentLeft=InputStrategy[i]
         SegmentRight=InputStrategy[i+1]
         SegmentKey=(SegmentLeft,SegmentRight)
-        ScoreDict["thioester"]+=SegmentScoreDict[SegmentKey]["thioester"]
-        ScoreDict["solubility"]+=SegmentScoreDict[SegmentKey]["solubility"]
-        ScoreDict["length"]+=SegmentScoreDict[SegmentKey]["length"]
-        ScoreDict["thiol"]+=SegmentScoreDict[SegmentKey]["thiol"]
-    # Calculate 'ideal' number of segments in a strategy; strategies with more segments than this will be penalized
-    # As an example, if this ends up being 6.5 (e.g., a 260-aa protein with ideal segment length of 40), 6-segment and below strategies will be fine, 7+ will be penalized
-    # Save as an integer (cutting off the decimal and rounding down) for easier math
-    ProteinLength=InputStrategy[-1]-InputStrategy[0]
-    IdealSegmentCount = int(ProteinLength/autoPenaltySegLength)
+        ScoreDict["thioester"]+=SegmentScores[SegmentKey]["thioester"]
+        ScoreDict["solubility"]+=SegmentScores[SegmentKey]["solubility"]
+        ScoreDict["length"]+=SegmentScores[SegmentKey]["length"]
+        ScoreDict["thiol"]+=SegmentScores[SegmentKey]["thiol"]
+        ScoreDict["terms"]+=SegmentScores[SegmentKey]["terms"]
     # Add ligation penalty if necessary
+    ProteinLength=InputStrategy[-1]-InputStrategy[0]
     NumberOfSegments=len(InputStrategy)-1
-    if NumberOfSegments>IdealSegmentCount:
-        LigationPenalty = -2 * (NumberOfSegments-IdealSegmentCount)
-        ScoreDict["ligations"]+=LigationPenalty
+    ScoreDict["ligations"]+=getLigationPenalty(NumberOfSegments,ProteinLength)
     # Sum up total score
-    SumScore=ScoreDict["thioester"]+ScoreDict["solubility"]+ScoreDict["length"]+ScoreDict["thiol"]+ScoreDict["ligations"]
+    SumScore=ScoreDict["thioester"]+ScoreDict["solubility"]+ScoreDict["length"]+ScoreDict["thiol"]+ScoreDict["ligations"]+ScoreDict["terms"]
     ScoreDict["total"]=SumScore
     # Return dictionary of scores
     return ScoreDict
 
+# STRATEGY CONSTRAINTS
+# Constraints are read from the "Strategy Constraints" sheet of the Custom Parameters Input file, one row per protein
+# (or "ALL" for every protein). Junction positions are the residue number of the thiol (e.g., C87 or 87), and segments
+# are given as "First AA-Last AA" using the same numbering as the Viable Segment List.
+JunctionEntryPattern = re.compile(r'^([A-Z]?)(\d+)$')
+SegmentEntryPattern = re.compile(r'^(\d+)-(\d+)$')
+WindowEntryPattern = re.compile(r'^(?:(\d+):)?(\d+)-(\d+)$')
+
+# This function splits a single constraint cell into a list of entries, ignoring blank cells and spaces
+def splitConstraintCell(CellValue):
+    if CellValue is None:
+        return []
+    CellText = str(CellValue).upper().replace(" ","").replace("NONE","")
+    return [Entry for Entry in CellText.split(",") if Entry!=""]
+
+# This function reads every row of the Strategy Constraints sheet into a dictionary keyed by protein name
+# Returns the dictionary and a list of error messages (empty if the sheet was filled in correctly)
+def parseStrategyConstraints(sheet):
+    return parseConstraintRows(sheet.iter_rows(min_row=2, max_col=7, values_only=True))
+
+# This function reads the Strategy Constraints sheet of the Custom Parameters Input file, waiting until the file is in
+# the folder. Returns the constraints of each row and a list of error messages (empty if the sheet was read correctly)
+def readStrategyConstraintsFile():
+    fileExistCheck = False
+    while fileExistCheck == False:
+        try:
+            customParametersFile = load_workbook(filename = 'Custom Parameters Input.xlsx', data_only=True)
+            fileExistCheck = True
+        except IOError:
+            print ("The 'Custom Parameters Input.xlsx' file is not in the current working")
+            print ("directory! Please put this file into the folder containing your FASTA")
+            print ("files and try again!")
+            print ("")
+            checkpoint = input("Press 'enter' when the input file is in the folder:")
+            print ("")
+    if not "Strategy Constraints" in customParametersFile.sheetnames:
+        return {}, ["The input file does not have a 'Strategy Constraints' sheet."]
+    (ConstraintDict,ErrorList)=parseStrategyConstraints(customParametersFile["Strategy Constraints"])
+    if len(ErrorList)==0 and len(ConstraintDict)==0:
+        ErrorList.append("No constraints were found in the 'Strategy Constraints' sheet.")
+    return ConstraintDict, ErrorList
+
+# This function reads rows laid out like the Strategy Constraints sheet (protein name, required junctions, forbidden
+# junctions, forbidden segments, minimum segments, maximum segments, segment length windows)
+def parseConstraintRows(RowList):
+    ConstraintDict={}
+    ErrorList=[]
+    for row in RowList:
+        if row[0] is None or str(row[0]).strip()=="":
+            continue
+        RowName=str(row[0]).strip()
+        Constraints={
+            "required":{}, # Index of thiol residue : single-letter code given by the user ("" if none)
+            "forbidden":{},
+            "forbiddensegs":set(), # Segment keys (LeftIndex,RightIndex)
+            "minsegs":None,
+            "maxsegs":None,
+            "lenwindow":None, # (min,max) length applied to every segment
+            "ordinalwindows":{} # Segment number (1 = N-terminal segment) : (min,max) length
+            }
+        # Required and forbidden junctions
+        for (Column,Key) in ((1,"required"),(2,"forbidden")):
+            for Entry in splitConstraintCell(row[Column]):
+                Match=JunctionEntryPattern.match(Entry)
+                if Match==None or int(Match.group(2))<1:
+                    ErrorList.append(f'{RowName}: "{Entry}" is not a valid junction (use e.g. C87 or 87).')
+                else:
+                    Constraints[Key][int(Match.group(2))-1]=Match.group(1)
+        Overlap=set(Constraints["required"]).intersection(Constraints["forbidden"])
+        for Index in sorted(Overlap):
+            ErrorList.append(f'{RowName}: junction {Index+1} is both required and forbidden.')
+        # Forbidden segments
+        for Entry in splitConstraintCell(row[3]):
+            Match=SegmentEntryPattern.match(Entry)
+            if Match==None or int(Match.group(1))<1 or int(Match.group(1))>int(Match.group(2)):
+                ErrorList.append(f'{RowName}: "{Entry}" is not a valid segment (use First AA-Last AA, e.g. 1-45).')
+            else:
+                Constraints["forbiddensegs"].add((int(Match.group(1))-1,int(Match.group(2))))
+        # Minimum and maximum number of segments
+        for (Column,Key) in ((4,"minsegs"),(5,"maxsegs")):
+            Entries=splitConstraintCell(row[Column])
+            if len(Entries)==0:
+                continue
+            if len(Entries)>1 or not Entries[0].isdigit() or int(Entries[0])<1:
+                ErrorList.append(f'{RowName}: "{row[Column]}" is not a valid number of segments.')
+            else:
+                Constraints[Key]=int(Entries[0])
+        if Constraints["minsegs"]!=None and Constraints["maxsegs"]!=None and Constraints["minsegs"]>Constraints["maxsegs"]:
+            ErrorList.append(f'{RowName}: the minimum number of segments is larger than the maximum.')
+        # Segment length windows
+        for Entry in splitConstraintCell(row[6]):
+            Match=WindowEntryPattern.match(Entry)
+            if Match==None or int(Match.group(2))>int(Match.group(3)) or Match.group(1)=="0":
+                ErrorList.append(f'{RowName}: "{Entry}" is not a valid length window (use e.g. 20-50 or 2:20-50).')
+            elif Match.group(1)==None:
+                Constraints["lenwindow"]=(int(Match.group(2)),int(Match.group(3)))
+            else:
+                Constraints["ordinalwindows"][int(Match.group(1))]=(int(Match.group(2)),int(Match.group(3)))
+        if RowName in ConstraintDict:
+            ErrorList.append(f'{RowName} is listed more than once.')
+        ConstraintDict[RowName]=Constraints
+    return ConstraintDict, ErrorList
+
+# This function gives the constraints that apply to one protein, combining its own row with the "ALL" row
+# Returns None if the protein is unconstrained
+def getProteinConstraints(ProteinName):
+    RowList=[StrategyConstraintDict[Name] for Name in ("ALL",ProteinName) if Name in StrategyConstraintDict]
+    if len(RowList)==0:
+        return None
+    Constraints={"required":{},"forbidden":{},"forbiddensegs":set(),"minsegs":None,"maxsegs":None,"lenwindow":None,"ordinalwindows":{}}
+    # Protein-specific rows are applied last, so their counts and windows take priority over the "ALL" row
+    for Row in RowList:
+        Constraints["required"].update(Row["required"])
+        Constraints["forbidden"].update(Row["forbidden"])
+        Constraints["forbiddensegs"].update(Row["forbiddensegs"])
+        Constraints["ordinalwindows"].update(Row["ordinalwindows"])
+        for Key in ("minsegs","maxsegs","lenwindow"):
+            if Row[Key]!=None:
+                Constraints[Key]=Row[Key]
+    # Rows left blank do not constrain anything
+    if len(describeConstraints(Constraints))==0:
+        return None
+    return Constraints
+
+# This function checks that the residue entered for each required and forbidden junction (the C of C87) is the residue
+# at that position of the sequence, so that a typo cannot constrain the wrong junction
+# Returns a list of error messages (empty if every residue matches, or if the protein is unconstrained)
+def getConstraintResidueErrors(ProteinName,ProteinSeq,Constraints):
+    ErrorList=[]
+    if Constraints==None:
+        return ErrorList
+    for Key in ("required","forbidden"):
+        for Index in sorted(Constraints[Key]):
+            if Index<len(ProteinSeq) and Constraints[Key][Index]!="" and Constraints[Key][Index]!=ProteinSeq[Index]:
+                ErrorList.append(f'{ProteinName}: {Key} junction {Constraints[Key][Index]}{Index+1} does not match the sequence, which has {ProteinSeq[Index]}{Index+1}.')
+    return ErrorList
+
+# This function gives a list of lines describing a set of constraints, for printing to screen and to the run info file
+def describeConstraints(Constraints):
+    DescriptionList=[]
+    if len(Constraints["required"])>0:
+        DescriptionList.append("Required junctions = "+" ".join(f'{Constraints["required"][i]}{i+1}' for i in sorted(Constraints["required"])))
+    if len(Constraints["forbidden"])>0:
+        DescriptionList.append("Forbidden junctions = "+" ".join(f'{Constraints["forbidden"][i]}{i+1}' for i in sorted(Constraints["forbidden"])))
+    if len(Constraints["forbiddensegs"])>0:
+        DescriptionList.append("Forbidden segments = "+" ".join(f'{l+1}-{r}' for (l,r) in sorted(Constraints["forbiddensegs"])))
+    if Constraints["minsegs"]!=None:
+        DescriptionList.append(f'Minimum segments = {Constraints["minsegs"]}')
+    if Constraints["maxsegs"]!=None:
+        DescriptionList.append(f'Maximum segments = {Constraints["maxsegs"]}')
+    if Constraints["lenwindow"]!=None:
+        DescriptionList.append(f'Segment length window = {Constraints["lenwindow"][0]}-{Constraints["lenwindow"][1]} residues')
+    for n in sorted(Constraints["ordinalwindows"]):
+        DescriptionList.append(f'Segment {n} length window = {Constraints["ordinalwindows"][n][0]}-{Constraints["ordinalwindows"][n][1]} residues')
+    return DescriptionList
+
+# This function checks if a single segment is allowed by a protein's constraints
+def segmentMeetsConstraints(LeftIndex,RightIndex,Constraints):
+    # Segments may not skip over a required junction
+    for Index in Constraints["required"]:
+        if LeftIndex<Index<RightIndex:
+            return False
+    if (LeftIndex,RightIndex) in Constraints["forbiddensegs"]:
+        return False
+    if Constraints["lenwindow"]!=None and not Constraints["lenwindow"][0]<=RightIndex-LeftIndex<=Constraints["lenwindow"][1]:
+        return False
+    return True
+
+# This function checks if a segment of a given length may be used as the n-th segment of a strategy
+def segmentFitsOrdinalWindow(SegmentNumber,SegmentLength,Constraints):
+    if Constraints==None or not SegmentNumber in Constraints["ordinalwindows"]:
+        return True
+    (WindowMin,WindowMax)=Constraints["ordinalwindows"][SegmentNumber]
+    return WindowMin<=SegmentLength<=WindowMax
+
+# This function checks if a complete strategy has an allowed number of segments
+def segmentCountMeetsConstraints(NumberOfSegments,Constraints):
+    if Constraints==None:
+        return True
+    if Constraints["minsegs"]!=None and NumberOfSegments<Constraints["minsegs"]:
+        return False
+    if Constraints["maxsegs"]!=None and NumberOfSegments>Constraints["maxsegs"]:
+        return False
+    return True
+
+# This function counts the fewest and most segments needed to finish a strategy from each junction, working backwards
+# from the C-terminus; junctions that cannot reach the C-terminus are left out of the dictionary
+def getSegmentsToEnd(StartPointDict,ProteinLength):
+    SegsToEndDict={ProteinLength:(0,0)}
+    for LeftIndex in sorted(StartPointDict,reverse=True):
+        CountList=[SegsToEndDict[RightIndex] for RightIndex in StartPointDict[LeftIndex] if RightIndex in SegsToEndDict]
+        if len(CountList)>0:
+            SegsToEndDict[LeftIndex]=(min(c[0] for c in CountList)+1,max(c[1] for c in CountList)+1)
+    return SegsToEndDict
+
+# This function finds the fewest/most segments needed to finish a strategy from each junction, and drops segments that
+# lead to junctions from which the C-terminus can no longer be reached (StartPointDict is changed in place)
+# Returns the fewest/most segments dictionary (None if unconstrained) and whether strategies are still possible
+def pruneToConstraints(StartPointDict,ProteinLength,Constraints,StrategiesArePossible):
+    if Constraints==None:
+        return None,StrategiesArePossible
+    SegsToEndDict=getSegmentsToEnd(StartPointDict,ProteinLength)
+    for LeftIndex in StartPointDict:
+        StartPointDict[LeftIndex]=[RightIndex for RightIndex in StartPointDict[LeftIndex] if RightIndex in SegsToEndDict]
+    if StrategiesArePossible==True and not 0 in SegsToEndDict:
+        StrategiesArePossible=False
+        print('NO POSSIBLE STRATEGIES - No strategies meet the constraints')
+    elif StrategiesArePossible==True and not strategyMeetsConstraints((0,),Constraints,SegsToEndDict):
+        StrategiesArePossible=False
+        print(f'NO POSSIBLE STRATEGIES - Strategies need between {SegsToEndDict[0][0]} and {SegsToEndDict[0][1]} segments, which does not meet the constraints')
+    return SegsToEndDict,StrategiesArePossible
+
+# This function checks if a partial (or complete) strategy can still lead to a strategy that meets the constraints
+# Only the newest segment is checked, since earlier segments were checked when they were added
+def strategyMeetsConstraints(Strategy,Constraints,SegsToEndDict):
+    NumberOfSegments=len(Strategy)-1
+    if NumberOfSegments>0 and not segmentFitsOrdinalWindow(NumberOfSegments,Strategy[-1]-Strategy[-2],Constraints):
+        return False
+    if not Strategy[-1] in SegsToEndDict:
+        return False
+    (FewestLeft,MostLeft)=SegsToEndDict[Strategy[-1]]
+    if Constraints["maxsegs"]!=None and NumberOfSegments+FewestLeft>Constraints["maxsegs"]:
+        return False
+    if Constraints["minsegs"]!=None and NumberOfSegments+MostLeft<Constraints["minsegs"]:
+        return False
+    return True
+
+# This function converts the average solubility of a peptide into its solubility score; negative scores are divided by
+# the HHDivisor for peptides with helping hand sites (HHSite) when the helping hand reward is on
+def scoreAverageSolubility(AverageSolubScore,HHSite):
+    meanSol = ScoringWeights["meanSolLimit"]
+    oneStd = ScoringWeights["oneStdDev"]
+    twoStd = ScoringWeights["twoStdDev"]
+    threeStd = ScoringWeights["threeStdDev"]
+    if AverageSolubScore >= meanSol:
+        FinalSolubScore = 0
+    elif AverageSolubScore < meanSol and AverageSolubScore >= (oneStd):
+        FinalSolubScore = (-1)*((AverageSolubScore - (meanSol)) / ((oneStd)-(meanSol)))
+    elif AverageSolubScore < (oneStd) and AverageSolubScore >= (twoStd):
+        FinalSolubScore = (-1) + ((-1)*((AverageSolubScore - (oneStd)) / ((twoStd)-(oneStd))))
+    elif AverageSolubScore < (twoStd) and AverageSolubScore >= (threeStd):
+        FinalSolubScore = (-2) + ((-1)*((AverageSolubScore - (twoStd)) / ((threeStd)-(twoStd))))
+    elif AverageSolubScore < (threeStd):
+        FinalSolubScore = (-3)
+    # If helping hand reward function is on, negative solubility scores are halved
+    if FinalSolubScore < 0 and HHSite == True and HHFlag == True:
+        FinalSolubScore = float(FinalSolubScore)/ScoringWeights["HHDivisor"]
+    return FinalSolubScore
+
+# This function converts the raw components of a segment (thioester and thiol types, average solubility, helping
+# hand sites and length) into scores using the current scoring weights. Keeping this separate from the residue-level
+# calculations in buildSegments allows a previous run to be re-ranked with new weights without recomputing segments.
+def applySegmentWeights(SegmentEntry):
+    #Score based on thioesters in segments.
+    TEScore = 0
+    if SegmentEntry['tetype'] == "preferred":
+        TEScore += ScoringWeights["PreferredTE"]
+    elif SegmentEntry['tetype'] == "accepted":
+        TEScore += ScoringWeights["AcceptedTE"]
+    SegmentEntry.update({'thioester':TEScore})
+
+    #Scale for scoring segments based on average solubility.
+    #Scores based on average solubility distributions observed for 3 different
+    #protein subsets of the E. coli ribosome.
+    FinalSolubScore = scoreAverageSolubility(SegmentEntry['avgsolubility'],SegmentEntry['HH'])
+    # Save solubility score to dictionary
+    SegmentEntry.update({'solubility':FinalSolubScore}) # This is actually used for strategy scoring
+
+    #Score based on length of segment.
+    lenScore = 0
+    if SegmentEntry['len'] == ScoringWeights["bestSegmentLen"]:
+        lenScore += ScoringWeights["LengthPeak"]
+    elif SegmentEntry['len'] < ScoringWeights["bestSegmentLen"]:
+        lenScore += ScoringWeights["LengthPeak"] + ((SegmentEntry['len'] - ScoringWeights["bestSegmentLen"]) * ScoringWeights["LengthSlope"])
+    else:
+        lenScore += ScoringWeights["LengthPeak"] + ((SegmentEntry['len'] - ScoringWeights["bestSegmentLen"]) * -ScoringWeights["LengthSlope"])
+    # Save length score to dictionary
+    SegmentEntry.update({'length':lenScore})
+
+    # Thiol penalty - apply penalty for desulfurization (e.g., Ala), and double penalty for poor kinetics w/desulfurization (e.g., Val)
+    LigSiteScore = 0
+    if SegmentEntry['thioltype'] == "ok":
+        LigSiteScore += ScoringWeights["OKThiol"]
+    elif SegmentEntry['thioltype'] == "poor":
+        LigSiteScore += ScoringWeights["PoorThiol"]
+    SegmentEntry.update({'thiol':LigSiteScore})
+
+    # Extra scoring terms - each term maps the sum of its residue values over the segment to a score
+    TermScoreDict={}
+    for Term in ScoringTermList:
+        TermScoreDict[Term["name"]]=ScoringTermMappings[Term["mapping"]](SegmentEntry['termtotals'][Term["name"]],SegmentEntry['len'],Term)
+    SegmentEntry.update({'termscores':TermScoreDict,'terms':sum(TermScoreDict.values())})
+
+    # TOTAL SCORE - SUM OF ALL OTHER SCORES
+    TotalScore=TEScore+FinalSolubScore+lenScore+LigSiteScore
+    if len(ScoringTermList)>0:
+        TotalScore+=SegmentEntry['terms']
+    SegmentEntry.update({'total':TotalScore})
+
+# SCORING TERMS
+# A scoring term is a per-residue value table and the name of a mapping function, which turns the sum of the values
+# over a segment (and the segment length) into a score. Each term is compiled for a protein into a list of prefix
+# sums, so the sum over any segment is one subtraction, however long the segment is. New mappings can be added to
+# ScoringTermMappings; each is called as Mapping(Total,Length,Term).
+# A term can also have sequence motifs (e.g. aspartimide-prone DG), each adding its score to the sum of every segment
+# that contains it. The motifs of all terms are found in one pass over the protein with an Aho-Corasick automaton, and
+# their scores are kept as prefix sums by end position, one list per motif length, so the motifs inside a segment are
+# also summed with a few subtractions, however many motifs there are.
+
+# Score proportional to the average residue value of the segment
+def mapTermAverage(Total,Length,Term):
+    return Term["weight"]*Total/Length
+
+# Score proportional to the sum of the residue values of the segment
+def mapTermSum(Total,Length,Term):
+    return Term["weight"]*Total
+
+# Score proportional to how far the average residue value is above the threshold (e.g. a hydrophobicity penalty)
+def mapTermExcess(Total,Length,Term):
+    return Term["weight"]*max(0,Total/Length-Term["threshold"])
+
+ScoringTermMappings = {"average":mapTermAverage, "sum":mapTermSum, "excess":mapTermExcess}
+
+# This function adds a scoring term, given its name, its per-residue values (residues not listed count as 0), the
+# name of its mapping, its weight, its threshold (only used by some mappings) and its motifs (motif: score)
+def addScoringTerm(TermName,ResidueWeights,Mapping="average",Weight=1,Threshold=0,Motifs=None):
+    Term={"name":TermName,"residues":dict(ResidueWeights),"mapping":Mapping,"weight":Weight,"threshold":Threshold}
+    if Motifs!=None:
+        for Motif in Motifs:
+            expandMotif(Motif)
+        Term.update({"motifs":{Motif.upper():Motifs[Motif] for Motif in Motifs}})
+    ScoringTermList.append(Term)
+
+# This function lists the sequences a motif stands for. Motifs are written in one-letter code, where [..] is any one of
+# the residues in the brackets and X is any residue (e.g. [VIT][VIT][VIT] for a stretch of beta-branched residues). A
+# residue given twice in the same brackets counts once, so each sequence is listed (and scored) only once.
+def expandMotif(Motif):
+    PositionList=re.findall(r'\[([A-Z]+)\]|([A-Z])',Motif.upper())
+    if Motif=="" or ''.join(f'[{Residues}]' if Residues!="" else Residue for (Residues,Residue) in PositionList)!=Motif.upper():
+        raise ValueError(f'{Motif} is not a valid motif (use one-letter codes, [..] for a choice of residues and X for any residue)')
+    ChoiceList=[''.join(dict.fromkeys(Residues)) if Residues!="" else (''.join(ScoringTermResidues) if Residue=="X" else Residue) for (Residues,Residue) in PositionList]
+    if math.prod(len(Choices) for Choices in ChoiceList)>MotifExpansionLimit:
+        raise ValueError(f'{Motif} stands for more than {MotifExpansionLimit} sequences')
+    return [''.join(Sequence) for Sequence in itertools.product(*ChoiceList)]
+
+# This function builds an Aho-Corasick automaton for a list of (sequence, payload): a trie of the sequences with, for
+# each state, the state of the longest proper suffix that is also in the trie (where a scan continues after a mismatch)
+# and the payloads of every sequence ending there
+def buildMotifAutomaton(PatternList):
+    GotoList=[{}]
+    OutputList=[[]]
+    for (Pattern,Payload) in PatternList:
+        State=0
+        for Char in Pattern:
+            if not Char in GotoList[State]:
+                GotoList.append({})
+                OutputList.append([])
+                GotoList[State][Char]=len(GotoList)-1
+            State=GotoList[State][Char]
+        OutputList[State].append(Payload)
+    # Failure links are set breadth-first, so the link of every shorter state is known first
+    FailList=[0]*len(GotoList)
+    StateQueue=collections.deque(GotoList[0].values())
+    while len(StateQueue)>0:
+        State=StateQueue.popleft()
+        for (Char,NextState) in GotoList[State].items():
+            StateQueue.append(NextState)
+            FailState=FailList[State]
+            while FailState!=0 and not Char in GotoList[FailState]:
+                FailState=FailList[FailState]
+            FailList[NextState]=GotoList[FailState].get(Char,0)
+            OutputList[NextState]=OutputList[NextState]+OutputList[FailList[NextState]]
+    return GotoList,FailList,OutputList
+
+# This function scans a protein with a motif automaton, giving (end index, payload) for every motif found
+def scanMotifs(Automaton,ProteinSeq):
+    (GotoList,FailList,OutputList)=Automaton
+    State=0
+    for (Index,Char) in enumerate(ProteinSeq):
+        while State!=0 and not Char in GotoList[State]:
+            State=FailList[State]
+        State=GotoList[State].get(Char,0)
+        for Payload in OutputList[State]:
+            yield (Index+1,Payload)
+
+MotifAutomatonCache = {} # Automaton for the current motifs, keyed by the motifs
+
+# This function gives the automaton for the motifs of all scoring terms, with (term index, motif length, score) as the
+# payload of each sequence (None if no term has motifs); it is only rebuilt when the motifs change
+def getMotifAutomaton():
+    MotifKey=json.dumps([Term.get("motifs",{}) for Term in ScoringTermList],sort_keys=True)
+    if not MotifKey in MotifAutomatonCache:
+        PatternList=[(Sequence,(TermIndex,len(Sequence),Score)) for (TermIndex,Term) in enumerate(ScoringTermList)
+                     for (Motif,Score) in Term.get("motifs",{}).items() for Sequence in expandMotif(Motif)]
+        MotifAutomatonCache.clear()
+        MotifAutomatonCache[MotifKey]=buildMotifAutomaton(PatternList) if len(PatternList)>0 else None
+    return MotifAutomatonCache[MotifKey]
+
+# This function gives the per-residue values summed for the average solubility of a peptide
+def getSolubilityWeights():
+    SolubilityWeights={Char:-1 for Char in ProblematicResList}
+    SolubilityWeights.update({Char:1 for Char in PosResList})
+    return SolubilityWeights
+
+# This function gives the prefix sums of the per-residue values over a protein; the sum over residues LeftIndex to
+# RightIndex-1 is PrefixSums[RightIndex]-PrefixSums[LeftIndex]
+def getResiduePrefixSums(ProteinSeq,ResidueWeights):
+    return list(itertools.accumulate((ResidueWeights.get(Char,0) for Char in ProteinSeq),initial=0))
+
+# This function compiles the scoring terms for a protein into a list of (term name, prefix sums, motif prefix sums);
+# the motif prefix sums are a list of (motif length, prefix sums of the motif scores by end position), or None
+def compileScoringTerms(ProteinSeq):
+    MotifScoreDict={}
+    Automaton=getMotifAutomaton()
+    if Automaton!=None:
+        for (EndIndex,(TermIndex,Length,Score)) in scanMotifs(Automaton,ProteinSeq):
+            if not (TermIndex,Length) in MotifScoreDict:
+                MotifScoreDict.update({(TermIndex,Length):[0]*(len(ProteinSeq)+1)})
+            MotifScoreDict[(TermIndex,Length)][EndIndex]+=Score
+    TermKernelList=[]
+    for (TermIndex,Term) in enumerate(ScoringTermList):
+        MotifPrefixList=None
+        if len(Term.get("motifs",{}))>0:
+            MotifPrefixList=[(Length,list(itertools.accumulate(ScoreList))) for ((Index,Length),ScoreList) in sorted(MotifScoreDict.items()) if Index==TermIndex]
+        TermKernelList.append((Term["name"],getResiduePrefixSums(ProteinSeq,Term["residues"]),MotifPrefixList))
+    return TermKernelList
+
+# This function gives the sum of each compiled scoring term over a segment. A motif of length n lies inside the segment
+# if it ends at RightIndex or before, and at LeftIndex+n or after
+def getTermTotals(TermKernelList,LeftIndex,RightIndex):
+    TermTotals={}
+    for (TermName,PrefixSums,MotifPrefixList) in TermKernelList:
+        TermTotals[TermName]=PrefixSums[RightIndex]-PrefixSums[LeftIndex]
+        if MotifPrefixList!=None:
+            TermTotals[TermName]+=sum(MotifPrefixSums[RightIndex]-MotifPrefixSums[min(RightIndex,LeftIndex+Length-1)] for (Length,MotifPrefixSums) in MotifPrefixList)
+    return TermTotals
+
+# This function reads the scoring terms from the "Scoring Terms" sheet of the Custom Parameters Input file, one row
+# per term; terms with a weight of 0 are not used. Returns the list of terms and a list of error messages
+def parseScoringTerms(sheet):
+    TermList=[]
+    ErrorList=[]
+    ColumnList=[str(Cell.value).strip() if Cell.value!=None else "" for Cell in sheet[1]]
+    for Residue in ScoringTermResidues:
+        if not Residue in ColumnList:
+            ErrorList.append(f'The header row of the Scoring Terms sheet has no column for {Residue}.')
+    if len(ErrorList)>0:
+        return TermList,ErrorList
+    for Row in sheet.iter_rows(min_row=2):
+        if Row[0].value==None or str(Row[0].value).strip()=="":
+            continue
+        TermName=str(Row[0].value).strip()
+        if "," in TermName:
+            ErrorList.append(f'{TermName} (row {Row[0].row}): scoring term names cannot contain commas.')
+            continue
+        try:
+            Weight=float(Row[1].value)
+            Threshold=float(Row[3].value) if Row[3].value!=None else 0
+        except (TypeError,ValueError):
+            ErrorList.append(f'{TermName} (row {Row[0].row}): the weight and threshold must be numbers.')
+            continue
+        if Weight==0:
+            continue
+        if Weight==int(Weight):
+            Weight=int(Weight)
+        if Threshold==int(Threshold):
+            Threshold=int(Threshold)
+        Mapping=str(Row[2].value).strip().lower() if Row[2].value!=None else "average"
+        if not Mapping in ScoringTermMappings:
+            ErrorList.append(f'{TermName} (row {Row[0].row}): the mapping must be one of {", ".join(ScoringTermMappings)}.')
+            continue
+        ResidueWeights={}
+        for Residue in ScoringTermResidues:
+            Value=Row[ColumnList.index(Residue)].value
+            try:
+                ResidueWeights[Residue]=float(Value) if Value!=None else 0
+            except (TypeError,ValueError):
+                ErrorList.append(f'{TermName} (row {Row[0].row}): the value for {Residue} is not a number.')
+        if TermName in [Term["name"] for Term in TermList]:
+            ErrorList.append(f'{TermName} (row {Row[0].row}): another scoring term has the same name.')
+        TermList.append({"name":TermName,"residues":ResidueWeights,"mapping":Mapping,"weight":Weight,"threshold":Threshold})
+    return TermList,ErrorList
+
+# This function reads the motifs of the scoring terms from the "Sequence Motifs" sheet of the Custom Parameters Input
+# file (one motif per row, with the scoring term it belongs to and its score per occurrence; motifs with a score of 0,
+# or of a term with a weight of 0, are not used) and adds them to the terms of the TermList. The names of all terms in
+# the Scoring Terms sheet (TermSheet) are checked, so that a misspelt term name is not silently ignored. Returns a list
+# of error messages
+def parseSequenceMotifs(sheet,TermList,TermSheet):
+    ErrorList=[]
+    TermNameList=[str(Row[0].value).strip() for Row in TermSheet.iter_rows(min_row=2) if Row[0].value!=None]
+    for Row in sheet.iter_rows(min_row=2):
+        if Row[0].value==None or str(Row[0].value).strip()=="":
+            continue
+        TermName=str(Row[0].value).strip()
+        Motif=str(Row[1].value).strip().upper() if Row[1].value!=None else ""
+        if not TermName in TermNameList:
+            ErrorList.append(f'{Motif} (row {Row[0].row}): there is no scoring term called {TermName} in the Scoring Terms sheet.')
+            continue
+        try:
+            expandMotif(Motif)
+        except ValueError as Error:
+            ErrorList.append(f'Row {Row[0].row}: {Error}.')
+            continue
+        try:
+            Score=float(Row[2].value)
+        except (TypeError,ValueError):
+            ErrorList.append(f'{Motif} (row {Row[0].row}): the score per occurrence must be a number.')
+            continue
+        if Score==0:
+            continue
+        if Score==int(Score):
+            Score=int(Score)
+        for Term in TermList:
+            if Term["name"]==TermName:
+                if not "motifs" in Term:
+                    Term.update({"motifs":{}})
+                if Motif in Term["motifs"]:
+                    ErrorList.append(f'{Motif} (row {Row[0].row}): this motif is listed twice for {TermName}.')
+                Term["motifs"][Motif]=Score
+    return ErrorList
+
+# This function describes a scoring term in one line, for the screen and the run info file
+def describeScoringTerm(Term):
+    Description=f'{Term["name"]}: {Term["weight"]} x {Term["mapping"]} of residue values'
+    if len(Term.get("motifs",{}))>0:
+        Description+=' and motif scores ('+'; '.join(f'{Motif} {Score}' for (Motif,Score) in Term["motifs"].items())+')'
+    if Term["mapping"]=="excess":
+        Description+=f' above {Term["threshold"]}'
+    return Description
+
+# This function gives the ligation penalty for a strategy with a given number of segments
+def getLigationPenalty(NumberOfSegments,ProteinLength):
+    # Calculate 'ideal' number of segments in a strategy; strategies with more segments than this will be penalized
+    # As an example, if this ends up being 6.5 (e.g., a 260-aa protein with ideal segment length of 40), 6-segment and below strategies will be fine, 7+ will be penalized
+    # Save as an integer (cutting off the decimal and rounding down) for easier math
+    IdealSegmentCount = int(ProteinLength/ScoringWeights["autoPenaltySegLength"])
+    if NumberOfSegments>IdealSegmentCount:
+        return ScoringWeights["ExtraLigation"] * (NumberOfSegments-IdealSegmentCount)
+    return 0
+
+# This function finds the exact top strategies over the junction graph using only the stored segment totals, without
+# building and sorting every partial strategy. Each node of the graph is (junction, number of segments so far), since
+# the ligation penalty only depends on the number of segments. The k-th best path into each node is generated lazily
+# from the paths into its predecessors (recursive enumeration algorithm), so only the paths needed are ever built.
+# Strategies are generated one at a time in score order, for as long as the caller asks for more.
+def iterateTopStrategies(StartPointDict,SegmentScoreDict,ProteinLength,Constraints=None):
+    # List the segments ending at each junction
+    EndPointDict={}
+    for LeftIndex in StartPointDict:
+        for RightIndex in StartPointDict[LeftIndex]:
+            if not RightIndex in EndPointDict:
+                EndPointDict.update({RightIndex:[]})
+            EndPointDict[RightIndex].append(LeftIndex)
+    # Ranked paths into each node as (score, previous node, rank of path into previous node), and a heap of candidates
+    PathDict={(0,0):[(0,None,None)]}
+    CandidateDict={(0,0):[]}
+    def getPath(Node,Rank):
+        if not Node in PathDict:
+            PathDict[Node]=[]
+            CandidateDict[Node]=[]
+            (RightIndex,NumberOfSegments)=Node
+            for LeftIndex in EndPointDict.get(RightIndex,[]):
+                if not segmentFitsOrdinalWindow(NumberOfSegments,RightIndex-LeftIndex,Constraints):
+                    continue
+                PrevNode=(LeftIndex,NumberOfSegments-1)
+                if (NumberOfSegments>1 and LeftIndex==0) or (NumberOfSegments==1 and LeftIndex!=0):
+                    continue
+                PrevPath=getPath(PrevNode,0)
+                if PrevPath!=None:
+                    CandidateDict[Node].append((-(PrevPath[0]+SegmentScoreDict[(LeftIndex,RightIndex)]["total"]),PrevNode,0))
+            heapq.heapify(CandidateDict[Node])
+        PathList=PathDict[Node]
+        while len(PathList)<=Rank:
+            if len(CandidateDict[Node])==0:
+                return None
+            (NegativeScore,PrevNode,PrevRank)=heapq.heappop(CandidateDict[Node])
+            PathList.append((-NegativeScore,PrevNode,PrevRank))
+            # The next-best path through the same previous node becomes a new candidate
+            NextPrevPath=getPath(PrevNode,PrevRank+1)
+            if NextPrevPath!=None:
+                SegmentTotal=SegmentScoreDict[(PrevNode[0],Node[0])]["total"]
+                heapq.heappush(CandidateDict[Node],(-(NextPrevPath[0]+SegmentTotal),PrevNode,PrevRank+1))
+        return PathList[Rank]
+    # Complete strategies end at the C-terminus with any allowed number of segments; merge these lists in score order
+    FewestSegments=1
+    MostSegments=ProteinLength//MinSegLen
+    if Constraints!=None and Constraints["minsegs"]!=None:
+        FewestSegments=Constraints["minsegs"]
+    if Constraints!=None and Constraints["maxsegs"]!=None:
+        MostSegments=min(MostSegments,Constraints["maxsegs"])
+    FinalHeap=[]
+    for NumberOfSegments in range(FewestSegments,MostSegments+1):
+        Path=getPath((ProteinLength,NumberOfSegments),0)
+        if Path!=None:
+            FinalHeap.append((-(Path[0]+getLigationPenalty(NumberOfSegments,ProteinLength)),NumberOfSegments,0))
+    heapq.heapify(FinalHeap)
+    while len(FinalHeap)>0:
+        (NegativeScore,NumberOfSegments,Rank)=heapq.heappop(FinalHeap)
+        # Follow the path back to the N-terminus
+        Strategy=[]
+        (Node,NodeRank)=((ProteinLength,NumberOfSegments),Rank)
+        while Node!=None:
+            Strategy.append(Node[0])
+            (Score,Node,NodeRank)=PathDict[Node][NodeRank]
+        # The next path into the same end node is only needed once this strategy has been used
+        yield tuple(reversed(Strategy))
+        Path=getPath((ProteinLength,NumberOfSegments),Rank+1)
+        if Path!=None:
+            heapq.heappush(FinalHeap,(-(Path[0]+getLigationPenalty(NumberOfSegments,ProteinLength)),NumberOfSegments,Rank+1))
+
+# This function gives the exact top StrategyCount strategies (see iterateTopStrategies)
+def getTopStrategies(StartPointDict,SegmentScoreDict,ProteinLength,StrategyCount,Constraints=None):
+    return list(itertools.islice(iterateTopStrategies(StartPointDict,SegmentScoreDict,ProteinLength,Constraints),StrategyCount))
+
+# This function gives, for a kept strategy of getDiverseStrategies, the largest number of junctions by which the rest
+# of a strategy from each junction can differ from the kept strategy after that junction (junctions used by only one of
+# the two). The number of segments is not followed, so this can only overestimate the distance, never miss one.
+# Returns the distance from each junction that strategies can be completed from (CompletionDict of getNodeScoreBounds)
+def getMaxJunctionDistances(KeptJunctionList,StartPointDict,CompletionDict,ProteinLength):
+    KeptJunctionSet=set(KeptJunctionList)
+    MaxDistanceDict={ProteinLength:0}
+    for LeftIndex in sorted(CompletionDict,reverse=True):
+        for RightIndex in StartPointDict.get(LeftIndex,[]):
+            if not RightIndex in MaxDistanceDict:
+                continue
+            # Kept junctions the segment skips over, and the segment's own junction if the kept strategy does not use it
+            Distance=bisect.bisect_left(KeptJunctionList,RightIndex)-bisect.bisect_right(KeptJunctionList,LeftIndex)+MaxDistanceDict[RightIndex]
+            if RightIndex<ProteinLength and not RightIndex in KeptJunctionSet:
+                Distance+=1
+            if not LeftIndex in MaxDistanceDict or Distance>MaxDistanceDict[LeftIndex]:
+                MaxDistanceDict[LeftIndex]=Distance
+    return MaxDistanceDict
+
+# This function gives the best StrategyCount strategies that differ from each other in at least MinimumDistance
+# junctions (the size of the symmetric difference of their junction sets; moving one junction counts as 2). Partial
+# strategies are built from the N-terminus in order of the best score they can still reach (their score so far plus
+# the best completion from getNodeScoreBounds), so complete strategies come out in score order, and each is kept only
+# if it is far enough from every strategy kept so far. Diversity is enforced during the search: each partial strategy
+# carries its distance so far to every kept strategy it is still closer to than MinimumDistance (distances only grow as
+# segments are added, so this list only shrinks), and it is dropped before it is extended if even its most different
+# completion (getMaxJunctionDistances) would end too close to one of them. Strategies close to a kept one are therefore
+# not built. The search stops as soon as enough strategies are kept, when no partial strategy is left, or after
+# DiverseCandidateLimit partial strategies are extended.
+# Returns the kept strategies, the number of complete strategies suppressed for being too similar, the number of
+# partial strategies pruned, and whether the limit was reached.
+def getDiverseStrategies(StartPointDict,SegmentScoreDict,ProteinLength,StrategyCount,MinimumDistance,Constraints=None):
+    (PrefixDict,CompletionDict)=getNodeScoreBounds(StartPointDict,SegmentScoreDict,ProteinLength,Constraints)
+    DiverseStrategyList=[]
+    KeptList=[] # For each kept strategy, its junctions as bits of an integer and the distances of getMaxJunctionDistances
+    SuppressedCount=0
+    PrunedCount=0
+    ExtendedCount=0
+    if not 0 in CompletionDict:
+        return DiverseStrategyList,SuppressedCount,PrunedCount,False
+    # Partial strategies as (minus the best score they can reach, order added, strategy, score so far, junctions as bits,
+    # distances of the strategy it was extended from, number of strategies kept when it was added); ties are taken in the
+    # order added
+    StrategyHeap=[(-CompletionDict[0][0],0,(0,),0,0,{},0)]
+    AddedCount=1
+    while len(StrategyHeap)>0:
+        (NegativeBound,Order,Strategy,PrefixScore,JunctionMask,PrevDistanceDict,PrevKeptCount)=heapq.heappop(StrategyHeap)
+        LastAA=Strategy[-1]
+        # The distance to a kept strategy counts the junctions of either one up to the last junction of the partial
+        # strategy; strategies kept since it was added are compared in full
+        PrefixMask=(1<<(LastAA+1))-1
+        DistanceDict={}
+        for KeptIndex in itertools.chain(PrevDistanceDict,range(PrevKeptCount,len(KeptList))):
+            Distance=(JunctionMask^(KeptList[KeptIndex][0]&PrefixMask)).bit_count()
+            if Distance<MinimumDistance:
+                DistanceDict.update({KeptIndex:Distance})
+        if LastAA==ProteinLength:
+            if len(DistanceDict)>0:
+                SuppressedCount+=1
+                continue
+            DiverseStrategyList.append(Strategy)
+            if len(DiverseStrategyList)>=StrategyCount:
+                break
+            KeptList.append((JunctionMask,getMaxJunctionDistances(Strategy[1:-1],StartPointDict,CompletionDict,ProteinLength)))
+            continue
+        # Prune the partial strategy if every completion of it is too close to one kept strategy
+        if any(Distance+KeptList[KeptIndex][1][LastAA]<MinimumDistance for (KeptIndex,Distance) in DistanceDict.items()):
+            PrunedCount+=1
+            continue
+        ExtendedCount+=1
+        if ExtendedCount>DiverseCandidateLimit:
+            return DiverseStrategyList,SuppressedCount,PrunedCount,True
+        NumberOfSegments=len(Strategy)-1
+        for RightIndex in StartPointDict.get(LastAA,[]):
+            if not NumberOfSegments+1 in CompletionDict.get(RightIndex,{}):
+                continue
+            if not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LastAA,Constraints):
+                continue
+            Score=PrefixScore+SegmentScoreDict[(LastAA,RightIndex)]["total"]
+            ChildMask=JunctionMask if RightIndex==ProteinLength else JunctionMask|(1<<RightIndex)
+            heapq.heappush(StrategyHeap,(-(Score+CompletionDict[RightIndex][NumberOfSegments+1]),AddedCount,Strategy+(RightIndex,),Score,ChildMask,DistanceDict,len(KeptList)))
+            AddedCount+=1
+    return DiverseStrategyList,SuppressedCount,PrunedCount,False
+
+# This function finds, for every (junction, number of segments) node of the junction graph, the best partial score
+# into the node from the N-terminus (forward pass) and the best score to finish a strategy from the node, including
+# the ligation penalty (backward pass). Their sum is the best score of any strategy passing through the node.
+def getNodeScoreBounds(StartPointDict,SegmentScoreDict,ProteinLength,Constraints=None):
+    # Forward pass; each node keeps its best partial score and the previous junction on that best path
+    PrefixDict={0:{0:(0,None)}}
+    for LeftIndex in sorted(StartPointDict):
+        if not LeftIndex in PrefixDict:
+            continue
+        for NumberOfSegments in PrefixDict[LeftIndex]:
+            if Constraints!=None and Constraints["maxsegs"]!=None and NumberOfSegments>=Constraints["maxsegs"]:
+                continue
+            PrefixScore=PrefixDict[LeftIndex][NumberOfSegments][0]
+            for RightIndex in StartPointDict[LeftIndex]:
+                if not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                NewScore=PrefixScore+SegmentScoreDict[(LeftIndex,RightIndex)]["total"]
+                if not RightIndex in PrefixDict:
+                    PrefixDict.update({RightIndex:{}})
+                if not NumberOfSegments+1 in PrefixDict[RightIndex] or NewScore>PrefixDict[RightIndex][NumberOfSegments+1][0]:
+                    PrefixDict[RightIndex][NumberOfSegments+1]=(NewScore,LeftIndex)
+    # Backward pass; complete strategies are given their ligation penalty at the C-terminus
+    CompletionDict={}
+    if ProteinLength in PrefixDict:
+        CompletionDict[ProteinLength]={NumberOfSegments:getLigationPenalty(NumberOfSegments,ProteinLength)
+                                       for NumberOfSegments in PrefixDict[ProteinLength] if segmentCountMeetsConstraints(NumberOfSegments,Constraints)}
+    for LeftIndex in sorted(PrefixDict,reverse=True):
+        if LeftIndex==ProteinLength:
+            continue
+        for NumberOfSegments in PrefixDict[LeftIndex]:
+            for RightIndex in StartPointDict.get(LeftIndex,[]):
+                if not NumberOfSegments+1 in CompletionDict.get(RightIndex,{}):
+                    continue
+                if not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                CompletionScore=SegmentScoreDict[(LeftIndex,RightIndex)]["total"]+CompletionDict[RightIndex][NumberOfSegments+1]
+                if not LeftIndex in CompletionDict:
+                    CompletionDict.update({LeftIndex:{}})
+                if not NumberOfSegments in CompletionDict[LeftIndex] or CompletionScore>CompletionDict[LeftIndex][NumberOfSegments]:
+                    CompletionDict[LeftIndex][NumberOfSegments]=CompletionScore
+    return PrefixDict,CompletionDict
+
+# This function follows the forward pass of getNodeScoreBounds back from the C-terminus to give the single best strategy
+# Returns None if no strategy is possible
+def getBestStrategy(PrefixDict,CompletionDict,ProteinLength):
+    if not ProteinLength in CompletionDict or len(CompletionDict[ProteinLength])==0:
+        return None
+    BestCount=max(CompletionDict[ProteinLength],key=lambda n:PrefixDict[ProteinLength][n][0]+CompletionDict[ProteinLength][n])
+    Strategy=[ProteinLength]
+    (Junction,NumberOfSegments)=(ProteinLength,BestCount)
+    while NumberOfSegments>0:
+        Junction=PrefixDict[Junction][NumberOfSegments][1]
+        NumberOfSegments-=1
+        Strategy.append(Junction)
+    return tuple(reversed(Strategy))
+
+# This function checks whether the top OutputCount strategies built with a narrow beam are the true top strategies:
+# no strategy through a trimmed partial strategy (which all score at most TrimmedBound) can beat the last one listed
+def strategiesAreExact(StrategyList,TrimmedBound,OutputCount):
+    if TrimmedBound==None:
+        return True
+    ScoreList=sorted((scoreStrategy(Strategy)['total'] for Strategy in StrategyList),reverse=True)
+    return len(ScoreList)>=OutputCount and ScoreList[OutputCount-1]>=TrimmedBound
+
+# This function counts the complete strategies that can be built from every (junction, number of segments) node of the
+# junction graph, working backwards from the C-terminus, so that random strategies can be drawn in a single pass from
+# the N-terminus. With no temperature every valid strategy is equally likely and the counts are exact integers; with
+# a temperature T each strategy is weighted by exp(score/T), and the weights are kept as logarithms to avoid overflow.
+# Returns the weight of each node (the number of valid strategies for node (0,0) when uniform) and, for each node,
+# the cumulative weights of the segments that can follow it along with the node each segment leads to
+def getStrategyWeights(StartPointDict,SegmentScoreDict,ProteinLength,Constraints=None,Temperature=None):
+    # Forward pass - find the number of segments each junction can be reached with
+    NodeDict={0:set([0])}
+    for LeftIndex in sorted(StartPointDict):
+        if not LeftIndex in NodeDict:
+            continue
+        for NumberOfSegments in NodeDict[LeftIndex]:
+            if Constraints!=None and Constraints["maxsegs"]!=None and NumberOfSegments>=Constraints["maxsegs"]:
+                continue
+            for RightIndex in StartPointDict[LeftIndex]:
+                if segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    if not RightIndex in NodeDict:
+                        NodeDict.update({RightIndex:set()})
+                    NodeDict[RightIndex].add(NumberOfSegments+1)
+    # Complete strategies end at the C-terminus; weighted strategies get their ligation penalty here
+    WeightDict={}
+    ChoiceDict={}
+    for NumberOfSegments in NodeDict.get(ProteinLength,[]):
+        if segmentCountMeetsConstraints(NumberOfSegments,Constraints):
+            if Temperature==None:
+                WeightDict[(ProteinLength,NumberOfSegments)]=1
+            else:
+                WeightDict[(ProteinLength,NumberOfSegments)]=getLigationPenalty(NumberOfSegments,ProteinLength)/Temperature
+    # Backward pass
+    for LeftIndex in sorted(NodeDict,reverse=True):
+        if LeftIndex==ProteinLength:
+            continue
+        for NumberOfSegments in NodeDict[LeftIndex]:
+            NextNodeList=[]
+            TermList=[]
+            for RightIndex in StartPointDict.get(LeftIndex,[]):
+                NextNode=(RightIndex,NumberOfSegments+1)
+                if not NextNode in WeightDict or not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                NextNodeList.append(NextNode)
+                if Temperature==None:
+                    TermList.append(WeightDict[NextNode])
+                else:
+                    TermList.append(SegmentScoreDict[(LeftIndex,RightIndex)]["total"]/Temperature+WeightDict[NextNode])
+            if len(NextNodeList)==0:
+                continue
+            if Temperature==None:
+                NodeWeight=sum(TermList)
+                CumulativeList=list(itertools.accumulate(TermList))
+            else:
+                MaxTerm=max(TermList)
+                NodeWeight=MaxTerm+math.log(sum(math.exp(Term-MaxTerm) for Term in TermList))
+                CumulativeList=list(itertools.accumulate(math.exp(Term-NodeWeight) for Term in TermList))
+            WeightDict[(LeftIndex,NumberOfSegments)]=NodeWeight
+            ChoiceDict[(LeftIndex,NumberOfSegments)]=(CumulativeList,NextNodeList)
+    return WeightDict,ChoiceDict
+
+# This function counts, for every segment and junction, the valid strategies that use it, and gives its weighted usage:
+# the share of all strategies using it when each is weighted by exp(score/T). A forward pass from the N-terminus
+# gives the count and log weight of the partial strategies reaching each node, the backward passes of
+# getStrategyWeights give those of the completions from it, and a segment is used by every pairing of a partial
+# strategy ending at its first junction with a completion from its last one. Nothing is enumerated, so this takes one
+# pass over the segments for each number of segments a junction can be reached with.
+# Returns the number of valid strategies, and a (count, weighted usage) pair for each segment and junction
+def getUsageMarginals(StartPointDict,SegmentScoreDict,ProteinLength,Constraints=None,Temperature=1):
+    (CountDict,ChoiceDict)=getStrategyWeights(StartPointDict,SegmentScoreDict,ProteinLength,Constraints)
+    (LogWeightDict,ChoiceDict)=getStrategyWeights(StartPointDict,SegmentScoreDict,ProteinLength,Constraints,Temperature)
+    del ChoiceDict
+    SegmentUsageDict={}
+    JunctionUsageDict={}
+    if not (0,0) in CountDict:
+        return 0,SegmentUsageDict,JunctionUsageDict
+    LogTotal=LogWeightDict[(0,0)]
+    # Forward pass; only partial strategies that can still be completed are followed
+    ForwardDict={(0,0):(1,0)}
+    ForwardNodeDict={0:[0]} # Numbers of segments each junction is reached with
+    for LeftIndex in sorted(StartPointDict):
+        for NumberOfSegments in ForwardNodeDict.get(LeftIndex,[]):
+            (ForwardCount,ForwardLogWeight)=ForwardDict[(LeftIndex,NumberOfSegments)]
+            if LeftIndex>0:
+                JunctionCount=ForwardCount*CountDict[(LeftIndex,NumberOfSegments)]
+                JunctionWeight=math.exp(ForwardLogWeight+LogWeightDict[(LeftIndex,NumberOfSegments)]-LogTotal)
+                (Count,Weight)=JunctionUsageDict.get(LeftIndex,(0,0))
+                JunctionUsageDict[LeftIndex]=(Count+JunctionCount,Weight+JunctionWeight)
+            for RightIndex in StartPointDict.get(LeftIndex,[]):
+                NextNode=(RightIndex,NumberOfSegments+1)
+                if not NextNode in CountDict or not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                SegmentLogWeight=ForwardLogWeight+SegmentScoreDict[(LeftIndex,RightIndex)]["total"]/Temperature
+                (Count,Weight)=SegmentUsageDict.get((LeftIndex,RightIndex),(0,0))
+                SegmentUsageDict[(LeftIndex,RightIndex)]=(Count+ForwardCount*CountDict[NextNode],Weight+math.exp(SegmentLogWeight+LogWeightDict[NextNode]-LogTotal))
+                if RightIndex==ProteinLength:
+                    continue
+                if not NextNode in ForwardDict:
+                    ForwardDict[NextNode]=(ForwardCount,SegmentLogWeight)
+                    ForwardNodeDict.setdefault(RightIndex,[]).append(NumberOfSegments+1)
+                else:
+                    (Count,LogWeight)=ForwardDict[NextNode]
+                    ForwardDict[NextNode]=(Count+ForwardCount,max(LogWeight,SegmentLogWeight)+math.log1p(math.exp(-abs(LogWeight-SegmentLogWeight))))
+    return CountDict[(0,0)],SegmentUsageDict,JunctionUsageDict
+
+# This function finds, for every junction, the best total score of a strategy that ligates at the junction (forced) and
+# of one that does not (forbidden), from a single forward and backward pass (getNodeScoreBounds). A forced junction's
+# best score is that of its best node. Every strategy that avoids a junction has one segment spanning it, so the
+# forbidden score is the best strategy through any segment spanning the junction: the best partial score into the
+# segment's first junction, plus the segment, plus the best completion from its last junction.
+# Returns the best score of any strategy (None if no strategy is possible) and, for each junction, its forced and
+# forbidden scores (None if no strategy is possible with the junction forced or forbidden)
+def getJunctionSensitivity(StartPointDict,SegmentScoreDict,ProteinLength,JunctionList,Constraints=None):
+    (PrefixDict,CompletionDict)=getNodeScoreBounds(StartPointDict,SegmentScoreDict,ProteinLength,Constraints)
+    if not 0 in CompletionDict:
+        return None,[(Junction,None,None) for Junction in JunctionList]
+    BestScore=CompletionDict[0][0]
+    # Best complete strategy through each segment, over the numbers of segments before it
+    SegmentBestDict={}
+    for LeftIndex in CompletionDict:
+        for NumberOfSegments in CompletionDict[LeftIndex]:
+            PrefixScore=PrefixDict[LeftIndex][NumberOfSegments][0]
+            for RightIndex in StartPointDict.get(LeftIndex,[]):
+                if not NumberOfSegments+1 in CompletionDict.get(RightIndex,{}):
+                    continue
+                if not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                PathScore=PrefixScore+SegmentScoreDict[(LeftIndex,RightIndex)]["total"]+CompletionDict[RightIndex][NumberOfSegments+1]
+                if not (LeftIndex,RightIndex) in SegmentBestDict or PathScore>SegmentBestDict[(LeftIndex,RightIndex)]:
+                    SegmentBestDict[(LeftIndex,RightIndex)]=PathScore
+    ForbiddenDict={}
+    for ((LeftIndex,RightIndex),PathScore) in SegmentBestDict.items():
+        for Junction in JunctionList[bisect.bisect_right(JunctionList,LeftIndex):bisect.bisect_left(JunctionList,RightIndex)]:
+            if not Junction in ForbiddenDict or PathScore>ForbiddenDict[Junction]:
+                ForbiddenDict[Junction]=PathScore
+    SensitivityList=[]
+    for Junction in JunctionList:
+        ForcedScore=max((PrefixDict[Junction][NumberOfSegments][0]+CompletionScore for (NumberOfSegments,CompletionScore) in CompletionDict.get(Junction,{}).items()),default=None)
+        SensitivityList.append((Junction,ForcedScore,ForbiddenDict.get(Junction)))
+    return BestScore,SensitivityList
+
+# This function draws random complete strategies (with replacement) using the node weights from getStrategyWeights
+# Each draw only looks at the segments that can follow each junction on the way from the N- to the C-terminus
+def sampleStrategies(ChoiceDict,ProteinLength,SampleCount,Temperature=None):
+    SampleList=[]
+    for i in range(0,SampleCount):
+        Node=(0,0)
+        Strategy=[0]
+        while Node[0]!=ProteinLength:
+            (CumulativeList,NextNodeList)=ChoiceDict[Node]
+            if Temperature==None:
+                Choice=bisect.bisect_right(CumulativeList,random.randrange(CumulativeList[-1]))
+            else:
+                Choice=min(bisect.bisect_right(CumulativeList,random.random()*CumulativeList[-1]),len(NextNodeList)-1)
+            Node=NextNodeList[Choice]
+            Strategy.append(Node[0])
+        SampleList.append(tuple(Strategy))
+    return SampleList
+
+# This function keeps the labels (score vector, total score, strategy, number of tied strategies) that are not
+# dominated by another label in the list, i.e. no other label is at least as good in every score and better in one.
+# Scores are compared after rounding, so that sums which only differ by floating-point error count as ties, and the
+# labels with tied score vectors are merged into the one with the best total score, adding up their tied strategies
+def getNondominatedLabels(LabelList):
+    BestLabelDict={}
+    for (Vector,TotalScore,Strategy,TieCount) in LabelList:
+        RoundedVector=tuple(round(Score,9) for Score in Vector)
+        if not RoundedVector in BestLabelDict:
+            BestLabelDict[RoundedVector]=(Vector,TotalScore,Strategy,TieCount)
+        elif TotalScore>BestLabelDict[RoundedVector][1]:
+            BestLabelDict[RoundedVector]=(Vector,TotalScore,Strategy,TieCount+BestLabelDict[RoundedVector][3])
+        else:
+            BestLabelDict[RoundedVector]=BestLabelDict[RoundedVector][:3]+(TieCount+BestLabelDict[RoundedVector][3],)
+    KeptList=[]
+    # After sorting, a label can only be dominated by one that comes before it
+    for RoundedVector in sorted(BestLabelDict,reverse=True):
+        Dominated=False
+        for KeptVector in KeptList:
+            if all(KeptScore>=Score for (KeptScore,Score) in zip(KeptVector,RoundedVector)):
+                Dominated=True
+                break
+        if Dominated==False:
+            KeptList.append(RoundedVector)
+    return [BestLabelDict[RoundedVector] for RoundedVector in KeptList]
+
+# This function finds the Pareto front of complete strategies over the chosen sub-scores by label-setting over the
+# junction graph: partial strategies are extended one junction at a time from the N-terminus, and at each junction the
+# partial strategies dominated by another one ending there with the same number of segments are dropped, since any
+# completion of them would be dominated as well. One strategy is returned for each point of the front, with the number
+# of strategies that have the same chosen sub-scores (the one with the best total of them is given); partial
+# strategies with tied sub-scores have tied completions, so the ties are counted without listing the strategies
+def getParetoStrategies(StartPointDict,SegmentScoreDict,ProteinLength,ScoreList,Constraints=None):
+    SegmentScoreList=[Score for Score in ScoreList if Score!="ligations"]
+    LabelDict={0:{0:[((0,)*len(SegmentScoreList),0,(0,),1)]}}
+    CompleteList=[]
+    for LeftIndex in sorted(set(StartPointDict)|set([ProteinLength])):
+        if not LeftIndex in LabelDict:
+            continue
+        for NumberOfSegments in LabelDict[LeftIndex]:
+            LabelList=getNondominatedLabels(LabelDict[LeftIndex][NumberOfSegments])
+            # Complete strategies get their ligation penalty
+            if LeftIndex==ProteinLength:
+                if segmentCountMeetsConstraints(NumberOfSegments,Constraints):
+                    for (Vector,TotalScore,Strategy,TieCount) in LabelList:
+                        LigationPenalty=getLigationPenalty(len(Strategy)-1,ProteinLength)
+                        CompleteVector=tuple(Vector[SegmentScoreList.index(Score)] if Score!="ligations" else LigationPenalty for Score in ScoreList)
+                        CompleteList.append((CompleteVector,TotalScore+LigationPenalty,Strategy,TieCount))
+                continue
+            if Constraints!=None and Constraints["maxsegs"]!=None and NumberOfSegments>=Constraints["maxsegs"]:
+                continue
+            for RightIndex in StartPointDict[LeftIndex]:
+                if not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                    continue
+                SegmentEntry=SegmentScoreDict[(LeftIndex,RightIndex)]
+                if not RightIndex in LabelDict:
+                    LabelDict.update({RightIndex:{}})
+                if not NumberOfSegments+1 in LabelDict[RightIndex]:
+                    LabelDict[RightIndex].update({NumberOfSegments+1:[]})
+                for (Vector,TotalScore,Strategy,TieCount) in LabelList:
+                    NewVector=tuple(PartialScore+SegmentEntry[Score] for (PartialScore,Score) in zip(Vector,SegmentScoreList))
+                    LabelDict[RightIndex][NumberOfSegments+1].append((NewVector,TotalScore+SegmentEntry["total"],Strategy+(RightIndex,),TieCount))
+        # Partial strategies ending here have all been extended
+        del LabelDict[LeftIndex]
+    return [(Strategy,TieCount) for (Vector,TotalScore,Strategy,TieCount) in getNondominatedLabels(CompleteList)]
+
+# ASSEMBLY ORDER
+# With --assembly, the best order in which to ligate the segments of each output strategy is found with an interval
+# DP over the strategy's junctions. An assembly order is a binary tree in which each ligation joins two neighbouring
+# intermediates; it is scored with the AssemblyWeights over its number of sequential ligation steps (the depth of the
+# tree), its convergent ligations and the solubility of its intermediates. A run of neighbouring segments is keyed by
+# its junctions, so the runs shared by the strategies of a protein are only scored once.
+
+# This function starts the memo of one protein: the prefix sums for the solubility of its intermediates, and the best
+# orders of the runs of segments scored so far
+def startAssemblyMemo(ProteinSeq):
+    return {"length":len(ProteinSeq),"solubility":getResiduePrefixSums(ProteinSeq,getSolubilityWeights()),
+            "HH":getResiduePrefixSums(ProteinSeq,{Char:1 for Char in SolubilizingTagList}),"runs":{},"sequential":{}}
+
+# This function scores the ligation that joins the first LeftCount segments of a Run (a tuple of junctions) to the rest:
+# the solubility of the product, unless it is the full-length protein, and the convergent ligation penalty
+def scoreAssemblyLigation(AssemblyMemo,Run,LeftCount):
+    Score=0
+    (LeftIndex,RightIndex)=(Run[0],Run[-1])
+    if LeftIndex!=0 or RightIndex!=AssemblyMemo["length"]:
+        AverageSolubScore=float(AssemblyMemo["solubility"][RightIndex]-AssemblyMemo["solubility"][LeftIndex])/(RightIndex-LeftIndex)
+        HHSite=AssemblyMemo["HH"][RightIndex]-AssemblyMemo["HH"][LeftIndex]>0
+        Score+=AssemblyWeights["IntermediateSolubility"]*scoreAverageSolubility(AverageSolubScore,HHSite)
+    if LeftCount>1 and len(Run)-1-LeftCount>1:
+        Score+=AssemblyWeights["ConvergentLigation"]
+    return Score
+
+# This function gives the best assembly orders of a Run of segments: for each number of ligation steps, the best score
+# (without the ligation step weight) of an order taking at most that many steps, and the junction of its last ligation
+# (None if the run cannot be assembled in that many steps)
+def getRunOrders(AssemblyMemo,Run):
+    if Run in AssemblyMemo["runs"]:
+        return AssemblyMemo["runs"][Run]
+    SegmentCount=len(Run)-1
+    OrderList=[(0,None)]
+    if SegmentCount>1:
+        OrderList=[(None,None)]
+        SplitList=[(getRunOrders(AssemblyMemo,Run[:i+1]),getRunOrders(AssemblyMemo,Run[i:]),scoreAssemblyLigation(AssemblyMemo,Run,i)) for i in range(1,SegmentCount)]
+        for Steps in range(1,SegmentCount):
+            BestOrder=OrderList[-1]
+            for (i,(LeftOrders,RightOrders,LigationScore)) in enumerate(SplitList,start=1):
+                LeftScore=LeftOrders[min(Steps-1,len(LeftOrders)-1)][0]
+                RightScore=RightOrders[min(Steps-1,len(RightOrders)-1)][0]
+                if LeftScore==None or RightScore==None:
+                    continue
+                Score=LeftScore+RightScore+LigationScore
+                if BestOrder[0]==None or Score>BestOrder[0]:
+                    BestOrder=(Score,Run[i])
+            OrderList.append(BestOrder)
+    AssemblyMemo["runs"][Run]=OrderList
+    return OrderList
+
+# This function gives the best score (without the ligation step weight) of a sequential assembly order of a Run, in
+# which every ligation adds one segment to either end of the growing intermediate
+def getSequentialOrderScore(AssemblyMemo,Run):
+    if len(Run)==2:
+        return 0
+    if not Run in AssemblyMemo["sequential"]:
+        SegmentCount=len(Run)-1
+        AssemblyMemo["sequential"][Run]=max(getSequentialOrderScore(AssemblyMemo,Run[:-1])+scoreAssemblyLigation(AssemblyMemo,Run,SegmentCount-1),
+                                            getSequentialOrderScore(AssemblyMemo,Run[1:])+scoreAssemblyLigation(AssemblyMemo,Run,1))
+    return AssemblyMemo["sequential"][Run]
+
+# This function writes the assembly order of a Run of a Strategy taking at most Steps ligation steps in bracket
+# notation, numbering the segments from the N-terminus; returns the order, its number of steps and its convergent
+# ligations
+def formatAssemblyOrder(AssemblyMemo,Strategy,Run,Steps):
+    if len(Run)==2:
+        return str(Strategy.index(Run[0])+1),0,0
+    OrderList=getRunOrders(AssemblyMemo,Run)
+    i=Run.index(OrderList[min(Steps,len(OrderList)-1)][1])
+    (LeftText,LeftSteps,LeftConvergent)=formatAssemblyOrder(AssemblyMemo,Strategy,Run[:i+1],Steps-1)
+    (RightText,RightSteps,RightConvergent)=formatAssemblyOrder(AssemblyMemo,Strategy,Run[i:],Steps-1)
+    ConvergentCount=LeftConvergent+RightConvergent
+    if i>1 and len(Run)-1-i>1:
+        ConvergentCount+=1
+    return f'({LeftText}+{RightText})',max(LeftSteps,RightSteps)+1,ConvergentCount
+
+# This function finds the best assembly order of a Strategy, and the score of the best sequential order to compare
+def getAssemblyOrder(AssemblyMemo,Strategy):
+    OrderList=getRunOrders(AssemblyMemo,Strategy)
+    BestSteps=None
+    for Steps in range(0,len(OrderList)):
+        if OrderList[Steps][0]==None:
+            continue
+        if BestSteps==None or OrderList[Steps][0]+AssemblyWeights["LigationStep"]*Steps>OrderList[BestSteps][0]+AssemblyWeights["LigationStep"]*BestSteps:
+            BestSteps=Steps
+    (OrderText,Steps,ConvergentCount)=formatAssemblyOrder(AssemblyMemo,Strategy,Strategy,BestSteps)
+    SequentialScore=getSequentialOrderScore(AssemblyMemo,Strategy)+AssemblyWeights["LigationStep"]*(len(Strategy)-2)
+    return {"score":OrderList[BestSteps][0]+AssemblyWeights["LigationStep"]*Steps,"steps":Steps,"convergent":ConvergentCount,
+            "sequential":SequentialScore,"order":OrderText}
+
+# BOUNDARY SCAN
+# With --boundary-scan, the best strategy is also found for every construct of each protein that starts at a residue in
+# one range and ends at a residue in another. Segments inside a construct are the protein's own scored segments, so
+# only the segments at the ends of a construct are scored again (the N-terminal segment has no thiol, the C-terminal
+# segment no thioester), and each C-terminal segment is scored once for all starts. For each start, one forward pass
+# over the (junction, number of segments) nodes gives the best partial strategy into every junction, and every end is
+# then closed with its best last segment, so a single pass per start gives the best strategy of every construct from it.
+
+# This function finds the best strategy of every construct from a start in StartList to an end in EndList (indices,
+# cut to the protein); returns, for each construct, its start, end and best strategy with its scores (None if no
+# strategy is possible)
+def scanConstructBoundaries(ProteinSeq,SegmentBorderList,SegmentScoreDict,StartPointDict,StartList,EndList,Constraints=None):
+    SegmentContext=getSegmentContext(ProteinSeq)
+    StartList=[Start for Start in StartList if Start<len(ProteinSeq)]
+    EndList=[End for End in EndList if End<=len(ProteinSeq)]
+    JunctionList=SegmentBorderList[1:-1]
+    LastEnd=max(EndList,default=0)
+    CTermDict={} # C-terminal segments, the same for every start
+    def getTerminalSegment(LeftIndex,RightIndex,NTerminus,CTerminus):
+        if not MinSegLen<=RightIndex-LeftIndex<=MaxSegLen:
+            return None
+        if Constraints!=None and not segmentMeetsConstraints(LeftIndex,RightIndex,Constraints):
+            return None
+        return scoreSegment(ProteinSeq,LeftIndex,RightIndex,SegmentContext,NTerminus,CTerminus)
+    ConstructList=[]
+    for Start in StartList:
+        # Forward pass; each node keeps its best partial score and the previous junction on that best path
+        BestDict={}
+        NodeDict={} # Numbers of segments each junction is reached with
+        NTermDict={}
+        for RightIndex in JunctionList[bisect.bisect_right(JunctionList,Start):bisect.bisect_right(JunctionList,LastEnd-MinSegLen)]:
+            NTermSegment=getTerminalSegment(Start,RightIndex,Start,None)
+            if NTermSegment!=None and segmentFitsOrdinalWindow(1,RightIndex-Start,Constraints):
+                NTermDict[RightIndex]=NTermSegment
+                BestDict[(RightIndex,1)]=(NTermSegment["total"],Start)
+                NodeDict[RightIndex]=[1]
+        for LeftIndex in JunctionList:
+            for NumberOfSegments in NodeDict.get(LeftIndex,[]):
+                # Every construct needs a C-terminal segment after this one
+                if Constraints!=None and Constraints["maxsegs"]!=None and NumberOfSegments+2>Constraints["maxsegs"]:
+                    continue
+                PrefixScore=BestDict[(LeftIndex,NumberOfSegments)][0]
+                for RightIndex in StartPointDict.get(LeftIndex,[]):
+                    if RightIndex>LastEnd-MinSegLen or not segmentFitsOrdinalWindow(NumberOfSegments+1,RightIndex-LeftIndex,Constraints):
+                        continue
+                    NewScore=PrefixScore+SegmentScoreDict[(LeftIndex,RightIndex)]["total"]
+                    if not (RightIndex,NumberOfSegments+1) in BestDict:
+                        NodeDict.setdefault(RightIndex,[]).append(NumberOfSegments+1)
+                    elif NewScore<=BestDict[(RightIndex,NumberOfSegments+1)][0]:
+                        continue
+                    BestDict[(RightIndex,NumberOfSegments+1)]=(NewScore,LeftIndex)
+        # Close each construct with its best C-terminal segment; the ligation penalty depends on the construct length
+        for End in EndList:
+            if End-Start<MinSegLen:
+                continue
+            BestConstruct=None # (score, last junction, number of segments before the C-terminal segment)
+            SingleSegment=getTerminalSegment(Start,End,Start,End)
+            if SingleSegment!=None and segmentCountMeetsConstraints(1,Constraints) and segmentFitsOrdinalWindow(1,End-Start,Constraints):
+                BestConstruct=(SingleSegment["total"]+getLigationPenalty(1,End-Start),Start,0)
+            for LeftIndex in JunctionList[bisect.bisect_left(JunctionList,End-MaxSegLen):bisect.bisect_right(JunctionList,End-MinSegLen)]:
+                if not LeftIndex in NodeDict:
+                    continue
+                if not (LeftIndex,End) in CTermDict:
+                    CTermDict[(LeftIndex,End)]=getTerminalSegment(LeftIndex,End,0,End)
+                if CTermDict[(LeftIndex,End)]==None:
+                    continue
+                for NumberOfSegments in NodeDict[LeftIndex]:
+                    if not segmentCountMeetsConstraints(NumberOfSegments+1,Constraints) or not segmentFitsOrdinalWindow(NumberOfSegments+1,End-LeftIndex,Constraints):
+                        continue
+                    Score=BestDict[(LeftIndex,NumberOfSegments)][0]+CTermDict[(LeftIndex,End)]["total"]+getLigationPenalty(NumberOfSegments+1,End-Start)
+                    if BestConstruct==None or Score>BestConstruct[0]:
+                        BestConstruct=(Score,LeftIndex,NumberOfSegments)
+            ConstructEntry={"start":Start,"end":End,"strategy":None,"scores":None,"segments":None}
+            if BestConstruct!=None:
+                # Follow the forward pass back to the start, and score the strategy with the segments of this construct
+                (Score,Junction,NumberOfSegments)=BestConstruct
+                Strategy=[End]
+                while NumberOfSegments>0:
+                    Strategy.append(Junction)
+                    Junction=BestDict[(Junction,NumberOfSegments)][1]
+                    NumberOfSegments-=1
+                Strategy=tuple(reversed(Strategy+[Start]))
+                if len(Strategy)==2:
+                    ConstructSegments={(Start,End):SingleSegment}
+                else:
+                    ConstructSegments={(Strategy[i],Strategy[i+1]):SegmentScoreDict[(Strategy[i],Strategy[i+1])] for i in range(1,len(Strategy)-2)}
+                    ConstructSegments.update({(Start,Strategy[1]):NTermDict[Strategy[1]],(Strategy[-2],End):CTermDict[(Strategy[-2],End)]})
+                ConstructEntry.update({"strategy":Strategy,"scores":scoreStrategy(Strategy,ConstructSegments),
+                                       "segments":[ConstructSegments[(Strategy[i],Strategy[i+1])]["seq"] for i in range(0,len(Strategy)-1)]})
+            ConstructList.append(ConstructEntry)
+    return ConstructList
+
+# This function formats the constructs of a boundary scan as lines of its table, one construct per line
+def formatBoundaryLines(ProteinSeq,ConstructList):
+    ScoreKeyList=getStrategyScoreKeys()
+    LineList=['First AA,Last AA,Length (aa),'+','.join(StrategyScoreHeaderDict[Key] for Key in ScoreKeyList)+',Segments in Strategy,Junctions,Segments (from N- to C-terminus)...,\n']
+    for Construct in ConstructList:
+        ConstructText=f'{Construct["start"]+1},{Construct["end"]},{Construct["end"]-Construct["start"]},'
+        if Construct["strategy"]==None:
+            LineList.append(ConstructText+'n/a,'*len(ScoreKeyList)+'n/a,n/a,NO STRATEGIES\n')
+            continue
+        ScoreText=''.join(f'{Construct["scores"][Key]},' for Key in ScoreKeyList)
+        JunctionText=';'.join(f'{ProteinSeq[Junction]}{Junction+1}' for Junction in Construct["strategy"][1:-1])
+        LineList.append(f'{ConstructText}{ScoreText}{len(Construct["strategy"])-1},{JunctionText},'+''.join(f'{Segment},' for Segment in Construct["segments"])+'\n')
+    return LineList
+
+# This function saves the settings of the run to the run manifest, at the start of the run, and the summary of every
+# protein once the run is complete. The manifest is written to a temporary file and then renamed, so a reader never
+# sees a partly written manifest; while the run is going, the finished proteins are listed in the run journal instead
+def writeRunManifest(ManifestList,RunComplete=False):
+    Manifest={"folder":folder,"started":timestamp,"timebudget":TimeBudget,"complete":RunComplete,"settings":RunSettings,
+              "constraints":{ConstraintName:constraintsToJSON(StrategyConstraintDict[ConstraintName]) for ConstraintName in StrategyConstraintDict},
+              "proteins":ManifestList}
+    ManifestFilepath=f'{OutputFolder}/Aligator Run Manifest.json'
+    with open(ManifestFilepath+'.tmp','w') as f:
+        json.dump(Manifest,f,indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ManifestFilepath+'.tmp',ManifestFilepath)
+    if RunComplete==True and os.path.exists(f'{OutputFolder}/Aligator Run Journal.jsonl'):
+        os.remove(f'{OutputFolder}/Aligator Run Journal.jsonl')
+
+# These functions keep the run journal, which lists the summary of every finished protein, one JSON line each. Each
+# line is flushed to disk before the next protein is written, so the journal always lists exactly the proteins whose
+# output files are complete; an interrupted run can be finished from it with --resume. Adding a protein writes only
+# its own line, so the cost per protein does not grow with the size of the run.
+def startRunJournal(ManifestList):
+    JournalFilepath=f'{OutputFolder}/Aligator Run Journal.jsonl'
+    with open(JournalFilepath+'.tmp','w') as f:
+        for ManifestEntry in ManifestList:
+            f.write(json.dumps(ManifestEntry)+'\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(JournalFilepath+'.tmp',JournalFilepath)
+
+def addRunJournalEntry(ManifestEntry):
+    with open(f'{OutputFolder}/Aligator Run Journal.jsonl','a') as f:
+        f.write(json.dumps(ManifestEntry)+'\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+# These functions convert a protein's constraints to and from a form that can be saved as JSON
+def constraintsToJSON(Constraints):
+    if Constraints==None:
+        return None
+    return {"required":sorted(Constraints["required"].items()),"forbidden":sorted(Constraints["forbidden"].items()),
+            "forbiddensegs":sorted(Constraints["forbiddensegs"]),"minsegs":Constraints["minsegs"],"maxsegs":Constraints["maxsegs"],
+            "lenwindow":Constraints["lenwindow"],"ordinalwindows":sorted(Constraints["ordinalwindows"].items())}
+
+def constraintsFromJSON(ConstraintEntry):
+    if ConstraintEntry==None:
+        return None
+    return {"required":{Index:Letter for (Index,Letter) in ConstraintEntry["required"]},
+            "forbidden":{Index:Letter for (Index,Letter) in ConstraintEntry["forbidden"]},
+            "forbiddensegs":set(tuple(SegmentKey) for SegmentKey in ConstraintEntry["forbiddensegs"]),
+            "minsegs":ConstraintEntry["minsegs"],"maxsegs":ConstraintEntry["maxsegs"],
+            "lenwindow":tuple(ConstraintEntry["lenwindow"]) if ConstraintEntry["lenwindow"]!=None else None,
+            "ordinalwindows":{SegmentNumber:tuple(Window) for (SegmentNumber,Window) in ConstraintEntry["ordinalwindows"]}}
+
+# This function gives a hash of everything a protein's results depend on (its sequence, constraints, and the settings
+# and options of the run); a resumed run only skips a protein if this has not changed
+def getParameterHash(ProteinName,ProteinSeq):
+    HashInput={"sequence":ProteinSeq,"constraints":constraintsToJSON(getProteinConstraints(ProteinName)),"settings":RunSettings}
+    return hashlib.sha256(json.dumps(HashInput,sort_keys=True).encode("utf-8")).hexdigest()
+
+# This function saves the raw (unweighted) components of every segment for a protein as a cached segment table,
+# along with the settings needed to rebuild its strategies, so the run can be re-ranked later with new weights
+def writeSegmentTable(ProteinName,ProteinSeq,SegmentScoreDict,Constraints,StrategiesArePossible):
+    SegmentTable={
+        "protein":ProteinName,
+        "sequence":ProteinSeq,
+        "strategiespossible":StrategiesArePossible,
+        "HHFlag":HHFlag,
+        "SolubilizingTagList":SolubilizingTagList,
+        "MaxSegLen":MaxSegLen,
+        "ScoringWeights":ScoringWeights,
+        "ScoringTermList":ScoringTermList,
+        # Junction and segment constraints are already applied to the segment list; only count and length limits are kept
+        "constraints":None,
+        "segments":[[LeftIndex,RightIndex,SegmentScoreDict[(LeftIndex,RightIndex)]["tetype"],SegmentScoreDict[(LeftIndex,RightIndex)]["thioltype"],
+                     SegmentScoreDict[(LeftIndex,RightIndex)]["avgsolubility"],SegmentScoreDict[(LeftIndex,RightIndex)]["HH"]]
+                    for (LeftIndex,RightIndex) in sorted(SegmentScoreDict.keys())]
+        }
+    if Constraints!=None:
+        SegmentTable["constraints"]={"minsegs":Constraints["minsegs"],"maxsegs":Constraints["maxsegs"],
+                                     "ordinalwindows":[[n,WindowMin,WindowMax] for (n,(WindowMin,WindowMax)) in sorted(Constraints["ordinalwindows"].items())]}
+    os.makedirs(f'{OutputFolder}/{SegmentTablesFolder}',exist_ok=True)
+    with open(f'{OutputFolder}/{SegmentTablesFolder}/{ProteinName} Segment Table.json','w') as f:
+        json.dump(SegmentTable,f)
+
+# PROFILING
+# With --profile, each phase of every protein (segment scoring, strategy search, Pareto front, assembly orders and
+# writing its output files) runs under its own deterministic profiler, and so does the Excel merge at the end. Without
+# it, each phase only checks that profiling is off. Profilers only see the thread they were started on, so the output
+# files are profiled on the writer thread; the worker processes of a parallel search are not profiled. Newer versions
+# of Python run one profiler per process, so with --profile the computation waits for each protein's files to be
+# written before going on (see queueOutputJob); a phase that still finds another profiler running (such as a run under
+# "python -m cProfile") is only timed, and is listed as not profiled.
+ProfileTopCount = 25 # Number of functions in each table of the profile reports
+ProfileDict = {} # Seconds and profile statistics of each phase of each protein
+RunProfileDict = {} # Seconds and profile statistics of each phase of the whole run (the Excel merge)
+
+# This function starts profiling a phase on the current thread; it returns None when profiling is off
+def startProfilePhase():
+    if Args.profile==False:
+        return None
+    Profile=cProfile.Profile()
+    try:
+        Profile.enable()
+    except ValueError:
+        Profile=None
+    return (Profile,time.time())
+
+# This function stops profiling a phase, and keeps its time and statistics (None if it was not profiled) for the
+# profile reports; phases of the whole run are given no protein name
+def stopProfilePhase(ProfileEntry,ProteinName,Phase):
+    if ProfileEntry==None:
+        return
+    (Profile,StartTime)=ProfileEntry
+    Stats=None
+    if Profile!=None:
+        Profile.disable()
+        Stats=pstats.Stats(Profile)
+    PhaseDict=RunProfileDict
+    if ProteinName!=None:
+        if not ProteinName in ProfileDict:
+            ProfileDict.update({ProteinName:{}})
+        PhaseDict=ProfileDict[ProteinName]
+    PhaseDict[Phase]={"seconds":time.time()-StartTime,"stats":Stats}
+
+# This function turns profile statistics into collapsed stacks ("caller;callee;... microseconds", one stack per line)
+# for flame graph tools. The profiler only records who called whom, so the time of each function is shared out over
+# its callers in proportion to the time spent under each of them, walking down from the functions nobody called; stacks
+# through functions called from many places (such as list.sort) are therefore approximate.
+def getCollapsedStacks(Stats,RootName):
+    def getFunctionName(Function):
+        (Filename,Line,Name)=Function
+        if Filename=="~":
+            return Name # Built-in functions
+        return f'{Name} ({os.path.basename(Filename)}:{Line})'
+    CalleeDict={}
+    for (Function,(CallCount,PrimitiveCount,TotalTime,CumulativeTime,CallerDict)) in Stats.stats.items():
+        for (Caller,CallerEntry) in CallerDict.items():
+            if not Caller in CalleeDict:
+                CalleeDict.update({Caller:[]})
+            CalleeDict[Caller].append((Function,CallerEntry[3]))
+    StackDict={}
+    def addStacks(Function,Seconds,Stack):
+        (CallCount,PrimitiveCount,TotalTime,CumulativeTime,CallerDict)=Stats.stats[Function]
+        Stack=Stack+[getFunctionName(Function)]
+        Share=Seconds/CumulativeTime if CumulativeTime>0 else 0
+        StackText=';'.join(Stack)
+        StackDict[StackText]=StackDict.get(StackText,0)+TotalTime*Share
+        for (Callee,CalleeTime) in CalleeDict.get(Function,[]):
+            # Recursive calls are already counted in the time of the outer call
+            if getFunctionName(Callee) in Stack or CalleeTime*Share<1e-6:
+                continue
+            addStacks(Callee,CalleeTime*Share,Stack)
+    for (Function,(CallCount,PrimitiveCount,TotalTime,CumulativeTime,CallerDict)) in Stats.stats.items():
+        if len(CallerDict)==0:
+            addStacks(Function,CumulativeTime,[RootName])
+    return [f'{StackText} {round(Seconds*1000000)}\n' for (StackText,Seconds) in StackDict.items() if round(Seconds*1000000)>0]
+
+# This function writes the function tables of each phase (sorted by time spent in each function itself, and including
+# the functions it called) to a profile file named after Name, and a collapsed stack file with one root frame per phase
+def writePhaseProfiles(ProfileFolder,Name,PhaseDict):
+    LineList=[]
+    StackList=[]
+    for Phase in PhaseDict:
+        Stats=PhaseDict[Phase]["stats"]
+        if Stats==None:
+            LineList.append(f'{Name} - {Phase} ({PhaseDict[Phase]["seconds"]:.3f} s), not profiled (another profiler was running)\n\n')
+            continue
+        for SortKey in ("tottime","cumulative"):
+            Stream=io.StringIO()
+            Stats.stream=Stream
+            Stats.sort_stats(SortKey).print_stats(ProfileTopCount)
+            LineList.append(f'{Name} - {Phase} ({PhaseDict[Phase]["seconds"]:.3f} s), top {ProfileTopCount} functions by {SortKey}\n')
+            LineList.append(Stream.getvalue()+'\n')
+        StackList+=getCollapsedStacks(Stats,Phase)
+    with open(f'{ProfileFolder}/{Name} Profile.txt','w') as f:
+        f.write(''.join(LineList))
+    with open(f'{ProfileFolder}/{Name} Stacks.collapsed','w') as f:
+        f.write(''.join(StackList))
+
+# This function writes the profile reports: the profile and collapsed stack files of each protein and of the whole run,
+# and a summary ranking the proteins by the time spent in each phase, followed by the phases of the whole run. Phases
+# that were not profiled are only timed, and marked in the summary.
+def writeProfileReports(ProfileDict,RunProfileDict):
+    ProfileFolder=f'{OutputFolder}/Profiles'
+    os.makedirs(ProfileFolder,exist_ok=True)
+    PhaseList=[]
+    for ProteinName in ProfileDict:
+        for Phase in ProfileDict[ProteinName]:
+            if not Phase in PhaseList:
+                PhaseList.append(Phase)
+        writePhaseProfiles(ProfileFolder,ProteinName,ProfileDict[ProteinName])
+    if len(RunProfileDict)>0:
+        writePhaseProfiles(ProfileFolder,"Aligator Run",RunProfileDict)
+    getNote=lambda Stats: '' if Stats!=None else 'not profiled'
+    LineList=['Phase,Rank,Protein,Seconds,Share of Phase,Note\n']
+    for Phase in PhaseList:
+        PhaseTimeList=sorted(((ProfileDict[ProteinName][Phase]["seconds"],ProteinName) for ProteinName in ProfileDict if Phase in ProfileDict[ProteinName]),reverse=True)
+        PhaseTotal=sum(Seconds for (Seconds,ProteinName) in PhaseTimeList)
+        for (Rank,(Seconds,ProteinName)) in enumerate(PhaseTimeList,start=1):
+            LineList.append(f'{Phase},{Rank},{ProteinName},{Seconds:.3f},{Seconds/PhaseTotal if PhaseTotal>0 else 0:.3f},{getNote(ProfileDict[ProteinName][Phase]["stats"])}\n')
+    for Phase in RunProfileDict:
+        LineList.append(f'{Phase},,Whole run,{RunProfileDict[Phase]["seconds"]:.3f},,{getNote(RunProfileDict[Phase]["stats"])}\n')
+    with open(f'{ProfileFolder}/Profile Summary.csv','w') as f:
+        f.write(''.join(LineList))
+    return ProfileFolder
+
+# RESULTS DATABASE
+# With --database, the results of every protein are also saved to a SQLite database, either one per run (in the output
+# folder) or one shared by many runs, so results can be queried across proteins and batches without opening the Excel
+# files. The output writer adds each protein's rows in one transaction once its output files are written; a protein
+# that is written again (a resumed run) replaces its rows. Junctions are numbered by the first residue after them.
+ResultsDatabaseFilename = "Aligator Results.sqlite" # Name of the database of a single run
+ResultsDatabaseVersion = 1 # Version of the database tables, saved as its user_version
+ResultsDatabaseTables = """
+CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, folder TEXT, started TEXT, complete INTEGER, runtime REAL, UNIQUE (folder,started));
+CREATE TABLE IF NOT EXISTS parameters (run_id INTEGER REFERENCES runs ON DELETE CASCADE, name TEXT, value TEXT, PRIMARY KEY (run_id,name));
+CREATE TABLE IF NOT EXISTS proteins (protein_id INTEGER PRIMARY KEY, run_id INTEGER REFERENCES runs ON DELETE CASCADE, name TEXT, sequence TEXT,
+    length INTEGER, strategies_possible INTEGER, strategy_count INTEGER, best_score REAL, best_segments INTEGER, runtime REAL, parameter_hash TEXT);
+CREATE TABLE IF NOT EXISTS segments (protein_id INTEGER REFERENCES proteins ON DELETE CASCADE, first_aa INTEGER, last_aa INTEGER, sequence TEXT,
+    total REAL, thioester REAL, solubility REAL, length REAL, thiol REAL, terms REAL, avg_solubility REAL, tag_sites INTEGER);
+CREATE TABLE IF NOT EXISTS strategies (strategy_id INTEGER PRIMARY KEY, protein_id INTEGER REFERENCES proteins ON DELETE CASCADE, rank INTEGER,
+    total REAL, thioester REAL, solubility REAL, length REAL, thiol REAL, ligations REAL, terms REAL, segment_count INTEGER, junctions TEXT);
+CREATE TABLE IF NOT EXISTS junctions (strategy_id INTEGER REFERENCES strategies ON DELETE CASCADE, number INTEGER, position INTEGER, residue TEXT);
+CREATE INDEX IF NOT EXISTS proteins_by_name ON proteins (name);
+CREATE INDEX IF NOT EXISTS proteins_by_run ON proteins (run_id);
+CREATE INDEX IF NOT EXISTS proteins_by_segments ON proteins (best_segments);
+CREATE INDEX IF NOT EXISTS segments_by_protein ON segments (protein_id);
+CREATE INDEX IF NOT EXISTS segments_by_sequence ON segments (sequence);
+CREATE INDEX IF NOT EXISTS strategies_by_protein ON strategies (protein_id,rank);
+CREATE INDEX IF NOT EXISTS strategies_by_segments ON strategies (segment_count);
+CREATE INDEX IF NOT EXISTS junctions_by_strategy ON junctions (strategy_id);
+CREATE INDEX IF NOT EXISTS junctions_by_position ON junctions (position);
+"""
+
+# This function opens (or creates) a results database, refusing one made by a newer version of Aligator
+def openResultsDatabase(DatabaseFilepath):
+    Connection=sqlite3.connect(DatabaseFilepath,check_same_thread=False)
+    Version=Connection.execute("PRAGMA user_version").fetchone()[0]
+    if Version>ResultsDatabaseVersion:
+        Connection.close()
+        raise ValueError(f"The results database '{DatabaseFilepath}' was made by a newer version of Aligator")
+    Connection.execute("PRAGMA foreign_keys = ON")
+    Connection.execute("PRAGMA journal_mode = WAL")
+    Connection.execute("PRAGMA synchronous = NORMAL")
+    Connection.executescript(ResultsDatabaseTables)
+    Connection.execute(f"PRAGMA user_version = {ResultsDatabaseVersion}")
+    return Connection
+
+# This function adds this run to the results database (a resumed run keeps its entry), and saves its settings and
+# options as parameters, one row each; it gives the run_id of the run
+def startDatabaseRun(Connection):
+    with Connection:
+        Connection.execute("INSERT OR IGNORE INTO runs (folder,started,complete) VALUES (?,?,0)",(folder,timestamp))
+        RunId=Connection.execute("SELECT run_id FROM runs WHERE folder=? AND started=?",(folder,timestamp)).fetchone()[0]
+        ParameterList=[(RunId,SettingName,json.dumps(RunSettings[SettingName],sort_keys=True)) for SettingName in RunSettings if SettingName!="options"]
+        ParameterList+=[(RunId,f'--{Option.replace("_","-")}',json.dumps(RunSettings["options"][Option])) for Option in RunSettings["options"]]
+        Connection.execute("DELETE FROM parameters WHERE run_id=?",(RunId,))
+        Connection.executemany("INSERT INTO parameters (run_id,name,value) VALUES (?,?,?)",ParameterList)
+    return RunId
+
+# This function saves the segments and output strategies of one protein from a job handed to the output writer, with
+# the score breakdown of each, in one transaction
+def writeProteinRows(Connection,RunId,OutputJob):
+    ProteinName=OutputJob["protein"]
+    ProteinSeq=OutputJob["sequence"]
+    SegmentScores=OutputJob["segmentscores"]
+    ManifestEntry=OutputJob["manifest"]
+    with Connection:
+        Connection.execute("DELETE FROM proteins WHERE run_id=? AND name=?",(RunId,ProteinName))
+        ProteinId=Connection.execute("INSERT INTO proteins (run_id,name,sequence,length,strategies_possible,strategy_count,best_score,best_segments,runtime,parameter_hash) "
+                                     "VALUES (?,?,?,?,?,?,?,?,?,?)",
+                                     (RunId,ProteinName,ProteinSeq,len(ProteinSeq),int(OutputJob["strategiespossible"]),ManifestEntry["strategies"],
+                                      ManifestEntry["bestscore"],ManifestEntry["bestsegments"],ManifestEntry["runtime"],ManifestEntry["parameterhash"])).lastrowid
+        Connection.executemany("INSERT INTO segments (protein_id,first_aa,last_aa,sequence,total,thioester,solubility,length,thiol,terms,avg_solubility,tag_sites) "
+                               "VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                               ((ProteinId,FirstAA+1,LastAA,Segment["seq"],Segment["total"],Segment["thioester"],Segment["solubility"],Segment["length"],
+                                 Segment["thiol"],Segment["terms"],Segment["avgsolubility"],int(Segment["HH"]==True))
+                                for ((FirstAA,LastAA),Segment) in sorted(SegmentScores.items())))
+        JunctionList=[]
+        for (Rank,Strategy) in enumerate(OutputJob["strategies"],start=1):
+            Scores=scoreStrategy(Strategy,SegmentScores)
+            JunctionText=';'.join(f'{ProteinSeq[Junction]}{Junction+1}' for Junction in Strategy[1:-1])
+            StrategyId=Connection.execute("INSERT INTO strategies (protein_id,rank,total,thioester,solubility,length,thiol,ligations,terms,segment_count,junctions) "
+                                          "VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                                          (ProteinId,Rank,Scores["total"],Scores["thioester"],Scores["solubility"],Scores["length"],Scores["thiol"],
+                                           Scores["ligations"],Scores["terms"],len(Strategy)-1,JunctionText)).lastrowid
+            JunctionList+=[(StrategyId,Number,Junction+1,ProteinSeq[Junction]) for (Number,Junction) in enumerate(Strategy[1:-1],start=1)]
+        Connection.executemany("INSERT INTO junctions (strategy_id,number,position,residue) VALUES (?,?,?,?)",JunctionList)
+
+# This function marks the run as complete in the results database, with its run time
+def finishDatabaseRun(Connection,RunId,RunTime):
+    with Connection:
+        Connection.execute("UPDATE runs SET complete=1, runtime=? WHERE run_id=?",(RunTime,RunId))
+
+# This function writes an Excel view of a results database (--export-database): every run, the proteins of every run,
+# and the strategies of the latest run, with their segments rebuilt from the sequence and the junctions
+def exportResultsDatabase(DatabaseFilepath):
+    Connection=sqlite3.connect(f'file:{DatabaseFilepath}?mode=ro',uri=True)
+    ExportFilepath=os.path.splitext(DatabaseFilepath)[0]+" Export.xlsx"
+    ExcelFileExport=Workbook()
+    SheetRowDict={
+        "Runs":(["Run","Folder","Started","Complete","Run Time (s)","Proteins"],
+                Connection.execute("SELECT runs.run_id,folder,started,complete,runs.runtime,COUNT(protein_id) FROM runs LEFT JOIN proteins USING (run_id) "
+                                   "GROUP BY runs.run_id ORDER BY runs.run_id").fetchall()),
+        "Proteins":(["Run","Started","Protein","Length","Strategies","Best Score","Segments in Best Strategy","Run Time (s)"],
+                    Connection.execute("SELECT run_id,started,name,length,strategy_count,best_score,best_segments,proteins.runtime FROM proteins JOIN runs USING (run_id) "
+                                       "ORDER BY run_id,protein_id").fetchall())}
+    StrategyRowList=[]
+    LatestRun=Connection.execute("SELECT MAX(run_id) FROM runs").fetchone()[0]
+    for (ProteinName,ProteinSeq,ProteinId) in Connection.execute("SELECT name,sequence,protein_id FROM proteins WHERE run_id=? ORDER BY protein_id",(LatestRun,)).fetchall():
+        for Row in Connection.execute("SELECT strategy_id,rank,total,thioester,solubility,length,thiol,ligations,terms FROM strategies WHERE protein_id=? ORDER BY rank",(ProteinId,)):
+            Strategy=[0]+[Position-1 for (Position,) in Connection.execute("SELECT position FROM junctions WHERE strategy_id=? ORDER BY number",(Row[0],))]+[len(ProteinSeq)]
+            StrategyRowList.append([ProteinName]+list(Row[1:])+[ProteinSeq[Strategy[i]:Strategy[i+1]] for i in range(0,len(Strategy)-1)])
+    SheetRowDict["Strategies"]=(["Protein","Rank","TOTAL SCORE","Thioester Score","Solubility Score","Segment Length Score","Thiol Penalty","#Ligations Penalty",
+                                 "Scoring Terms Score","Segments (from N- to C-terminus)..."],StrategyRowList)
+    Connection.close()
+    for SheetName in SheetRowDict:
+        (HeaderList,RowList)=SheetRowDict[SheetName]
+        ExcelSheet=ExcelFileExport.create_sheet(SheetName)
+        ExcelSheet.append(HeaderList)
+        for Row in RowList:
+            ExcelSheet.append(list(Row))
+        for Cell in ExcelSheet[1]:
+            Cell.font=Font(bold=True)
+        ExcelSheet.freeze_panes="A2"
+    ExcelFileExport.remove(ExcelFileExport["Sheet"])
+    ExcelFileExport.save(ExportFilepath)
+    return (ExportFilepath,LatestRun,len(StrategyRowList))
+
+# OUTPUT PIPELINE
+# Each protein is scored and its strategies searched in the main thread, then handed through a bounded queue to a
+# background writer, which formats and writes the output files of one protein while the next one is computed.
+# Each file is formatted as a list of lines and written in one call.
+
+# Score columns of the Aligator Analysis file; the scoring terms column is only added when terms are used
+StrategyScoreHeaderDict = {"total":"TOTAL SCORE","thioester":"Thioester Score","solubility":"Solubility Score","length":"Segment Length Score",
+                           "thiol":"Thiol Penalty","ligations":"#Ligations Penalty","terms":"Scoring Terms Score"}
+def getStrategyScoreKeys():
+    if len(ScoringTermList)>0:
+        return ["total","thioester","solubility","length","thiol","ligations","terms"]
+    return ["total","thioester","solubility","length","thiol","ligations"]
+
+# This function gives the header line of the Aligator Analysis file (and the Pareto sheet, if RowPrefix is given), and
+# the start of a line for a protein without strategies
+def getStrategyHeaderLine(RowPrefix=''):
+    return RowPrefix+','.join(StrategyScoreHeaderDict[Key] for Key in getStrategyScoreKeys())+',Segments (from N- to C-terminus)...,\n'
+def getEmptyStrategyLine(RowPrefix=''):
+    return RowPrefix+'n/a,'*len(getStrategyScoreKeys())
+
+# This function formats the segments and sub-scores of a list of strategies as Aligator Analysis lines; RowPrefix
+# starts each line (the protein name and number of tied strategies in the merged Pareto sheet)
+def formatStrategyLines(StrategyList,ProteinSeq,SegmentScores,RowPrefix=''):
+    LineList=[]
+    ScoreKeyList=getStrategyScoreKeys()
+    for Strategy in StrategyList:
+        Scores=scoreStrategy(Strategy,SegmentScores)
+        ScoreText=''.join(f'{Scores[Key]},' for Key in ScoreKeyList)
+        SegmentText=''.join(ProteinSeq[Strategy[i]:Strategy[i+1]]+',' for i in range(0,len(Strategy)-1))
+        LineList.append(f'{RowPrefix}{ScoreText}{SegmentText}\n')
+    return LineList
+
+# This function writes all output files of one protein from a job handed to the output writer
+def writeProteinFiles(OutputJob):
+    ProteinName=OutputJob["protein"]
+    ProteinSeq=OutputJob["sequence"]
+    SegmentScores=OutputJob["segmentscores"]
+    FinalStrategyList=OutputJob["strategies"]
+    StrategiesArePossible=OutputJob["strategiespossible"]
+
+    # Write segment solubility scores to output file
+    # Each extra scoring term gets its own column, followed by the usage of each segment and of the junction before it
+    TermHeaderText=''.join(f',{Term["name"]} Score' for Term in ScoringTermList)
+    UsageTemperatureText=Temperature if Temperature!=None else UsageTemperature
+    UsageHeaderText=f',Strategies Using Segment,Weighted Usage (T={UsageTemperatureText}),Strategies With Junction Before First AA,Weighted Junction Usage (T={UsageTemperatureText})'
+    (SegmentUsageDict,JunctionUsageDict)=({},{})
+    if OutputJob["usage"]!=None:
+        (StrategyCount,SegmentUsageDict,JunctionUsageDict)=OutputJob["usage"]
+    LineList=[f'First AA,Last AA,Sequence,Average AA Solubility,Final Solubility Score,Solubility Tag Sites ({"/".join(SolubilizingTagList)})?{TermHeaderText}{UsageHeaderText}\n']
+    # If no viable segments, write n/a in relevant fields
+    if len(SegmentScores)==0:
+        LineList.append('n/a,n/a,NO VIABLE SEGMENTS')
+    for (FirstAA,LastAA) in sorted(SegmentScores.keys()):
+        Segment=SegmentScores[(FirstAA,LastAA)]
+        # Get text to report for true/false value for helping hand sites
+        HHReportText=""
+        if Segment["HH"]==True:
+            HHReportText="Yes"
+        TermText=''.join(f',{Segment["termscores"][Term["name"]]}' for Term in ScoringTermList)
+        # The first segment of a strategy has no junction before it
+        (SegmentCount,SegmentWeight)=SegmentUsageDict.get((FirstAA,LastAA),(0,0))
+        UsageText=f',{SegmentCount},{SegmentWeight},,'
+        if FirstAA>0:
+            (JunctionCount,JunctionWeight)=JunctionUsageDict.get(FirstAA,(0,0))
+            UsageText=f',{SegmentCount},{SegmentWeight},{JunctionCount},{JunctionWeight}'
+        LineList.append(f'{str(FirstAA+1)},{str(LastAA)},{Segment["seq"]},{Segment["avgsolubility"]},{Segment["solubility"]},{HHReportText}{TermText}{UsageText}\n')
+    with open(OutputJob["files"]["segments"],'w') as f:
+        f.write(''.join(LineList))
+
+    # JUNCTION SENSITIVITY - the best score with each junction forced and forbidden, and its change from the best score
+    # Scores are rounded to 9 places, so that sums which only differ by floating-point error (such as a junction of the
+    # best strategy, whose forced score is summed in a different order) are written as the best score; each change is
+    # the difference of the scores as written
+    LineList=['Protein,Junction,Best Score With Junction Forced,Change When Forced,Best Score With Junction Forbidden,Change When Forbidden\n']
+    if OutputJob["sensitivity"]==None or OutputJob["sensitivity"][0]==None:
+        LineList.append(f'{ProteinName},NO STRATEGIES,n/a,n/a,n/a,n/a\n')
+    else:
+        BestScore=round(OutputJob["sensitivity"][0],9)
+        for (Junction,ForcedScore,ForbiddenScore) in OutputJob["sensitivity"][1]:
+            ScoreText=''.join(f',{round(Score,9)},{round(round(Score,9)-BestScore,9)}' if Score!=None else ',n/a,n/a' for Score in (ForcedScore,ForbiddenScore))
+            LineList.append(f'{ProteinName},{ProteinSeq[Junction]}{Junction+1}{ScoreText}\n')
+    with open(OutputJob["files"]["sensitivity"],'w') as f:
+        f.write(''.join(LineList))
+
+    # Save the raw segment components, so this run can be re-ranked later with new scoring weights
+    if output_segment_tables==True:
+        writeSegmentTable(ProteinName,ProteinSeq,SegmentScores,OutputJob["constraints"],StrategiesArePossible)
+
+    # OUTPUT TOTAL SCORES CSV FILE
+    # Will be converted to .xlsx later
+    LineList=[getStrategyHeaderLine()]
+    # If strategies were not possible, write N/A in relevant columns
+    if StrategiesArePossible==False:
+        LineList.append(getEmptyStrategyLine()+'NO STRATEGIES')
+    elif len(FinalStrategyList)==0:
+        LineList.append(getEmptyStrategyLine()+'NO STRATEGIES MEET THE CONSTRAINTS')
+    else:
+        LineList+=formatStrategyLines(FinalStrategyList,ProteinSeq,SegmentScores)
+    # Flag proteins that reached the time budget
+    if OutputJob["timebudget"]!=None:
+        LineList.append(f'TIME BUDGET REACHED ({TimeBudget} s),Score bound for strategies not built = {OutputJob["timebudget"]["scorebound"]},'
+                        f'Optimality gap = {OutputJob["timebudget"]["optimalitygap"]},Exact ranks = {OutputJob["timebudget"]["exactranks"]}\n')
+    # Flag strategies from a beam too narrow to prove them exact
+    if OutputJob["beam"]!=None and "optimalitygap" in OutputJob["beam"]:
+        LineList.append(f'BEAM WIDTH {OutputJob["beam"]["beam"]} NOT PROVEN EXACT,Score bound for strategies trimmed = {OutputJob["beam"]["trimmedbound"]},'
+                        f'Optimality gap = {OutputJob["beam"]["optimalitygap"]},Exact ranks = {OutputJob["beam"]["exactranks"]}\n')
+    # Flag diverse strategies, since they are not the top-ranked strategies
+    if OutputJob["diverse"]!=None:
+        LineList.append(f'DIVERSE STRATEGIES,Minimum junction distance = {DiverseDistance},Strategies suppressed as too similar = {OutputJob["diverse"]["suppressed"]},'
+                        f'Partial strategies pruned as too similar = {OutputJob["diverse"]["pruned"]}'
+                        +(f',Stopped after {DiverseCandidateLimit} partial strategies' if OutputJob["diverse"]["limitreached"]==True else '')+'\n')
+    # Flag sampled strategies, since they are not the top-ranked strategies
+    if OutputJob["sample"]!=None:
+        if Temperature==None:
+            LineList.append(f'RANDOM SAMPLE,{SampleCount} strategies drawn uniformly from {OutputJob["sample"]["validstrategies"]} valid strategies\n')
+        else:
+            LineList.append(f'RANDOM SAMPLE,{SampleCount} strategies drawn with probability proportional to exp(score/{Temperature})\n')
+    with open(OutputJob["files"]["analysis"],'w') as f:
+        f.write(''.join(LineList))
+
+    # OUTPUT ALL STRATEGIES TEXT FILE
+    # Simpler output containing only the Total score and list of segments; ideal for passing to BracketMaker (github.com/Kay-Lab/BracketMaker)
+    if output_all_strategies_text==True and StrategiesArePossible==True:
+        # Name the folder and create the new directory (only first time)
+        AllStrategiesFolder="Ligation Strategies Text Files"
+        os.makedirs(f'{OutputFolder}/{AllStrategiesFolder}',exist_ok=True)
+        LineList=["Strategy Score\tSegments\n"]
+        for Strategy in FinalStrategyList:
+            SegmentText=''.join(SegmentScores[(Strategy[i],Strategy[i+1])]['seq']+'\t' for i in range(0,len(Strategy)-1))
+            LineList.append(f'{scoreStrategy(Strategy,SegmentScores)["total"]}\t{SegmentText}\n')
+        with open(f'{OutputFolder}/{AllStrategiesFolder}/{ProteinName} All Strategies.txt','w') as f:
+            f.write(''.join(LineList))
+
+    # PARETO FRONT
+    # Each point of the front is listed with the number of strategies that reach it
+    if OutputJob["pareto"]!=None:
+        LineList=[getStrategyHeaderLine('Protein,Tied Strategies,')]
+        if len(OutputJob["pareto"])==0:
+            LineList.append(getEmptyStrategyLine(f'{ProteinName},n/a,')+'NO STRATEGIES\n')
+        for (Strategy,TieCount) in OutputJob["pareto"]:
+            LineList+=formatStrategyLines([Strategy],ProteinSeq,SegmentScores,f'{ProteinName},{TieCount},')
+        with open(OutputJob["files"]["pareto"],'w') as f:
+            f.write(''.join(LineList))
+
+    # ASSEMBLY ORDERS
+    if OutputJob["assembly"]!=None:
+        LineList=['Protein,Rank,TOTAL SCORE,Assembly Score,Ligation Steps,Convergent Ligations,Best Sequential Assembly Score,Assembly Order (segments numbered from the N-terminus)\n']
+        if len(OutputJob["assembly"])==0:
+            LineList.append(f'{ProteinName},n/a,n/a,n/a,n/a,n/a,n/a,NO STRATEGIES\n')
+        LineList+=formatAssemblyLines(ProteinName,FinalStrategyList,OutputJob["assembly"],SegmentScores)
+        with open(OutputJob["files"]["assembly"],'w') as f:
+            f.write(''.join(LineList))
+
+    # BOUNDARY SCAN
+    if OutputJob["boundary"]!=None:
+        with open(OutputJob["files"]["boundary"],'w') as f:
+            f.write(''.join(formatBoundaryLines(ProteinSeq,OutputJob["boundary"])))
+
+# This function formats the assembly orders of a protein's strategies as lines of the Assembly Orders sheet
+def formatAssemblyLines(ProteinName,StrategyList,AssemblyList,SegmentScores):
+    LineList=[]
+    for (Rank,(Strategy,Assembly)) in enumerate(zip(StrategyList,AssemblyList),start=1):
+        LineList.append(f'{ProteinName},{Rank},{scoreStrategy(Strategy,SegmentScores)["total"]},{Assembly["score"]},{Assembly["steps"]},'
+                        f'{Assembly["convergent"]},{Assembly["sequential"]},{Assembly["order"]}\n')
+    return LineList
+
+# This function runs the background output writer. Jobs are taken from the queue in order until None is received;
+# after a protein's files (and its rows of the results database) are written, its manifest entry is saved. The time spent waiting for jobs (the writer is
+# ahead of the computation) and writing them is added to PipelineStats. If writing fails, the error is kept in
+# PipelineStats for the main thread, and later jobs are only taken from the queue so it can never stay full.
+def runOutputWriter(OutputQueue,PipelineStats):
+    while True:
+        WaitStart=time.time()
+        OutputJob=OutputQueue.get()
+        PipelineStats["writerwait"]+=time.time()-WaitStart
+        if OutputJob==None:
+            OutputQueue.task_done()
+            return
+        if PipelineStats["error"]!=None:
+            OutputQueue.task_done()
+            continue
+        WriteStart=time.time()
+        try:
+            if "files" in OutputJob:
+                ProfileEntry=startProfilePhase()
+                writeProteinFiles(OutputJob)
+                if ResultsDatabase!=None:
+                    writeProteinRows(ResultsDatabase,DatabaseRunId,OutputJob)
+                stopProfilePhase(ProfileEntry,OutputJob["protein"],"Output files")
+            # Once its journal line is saved, this protein's output files are final and a resumed run will not redo them
+            # (proteins skipped by a resumed run have no files to write and are already in the journal)
+            ManifestList.append(OutputJob["manifest"])
+            if "files" in OutputJob:
+                addRunJournalEntry(OutputJob["manifest"])
+        except Exception as Error:
+            PipelineStats["error"]=Error
+        PipelineStats["write"]+=time.time()-WriteStart
+        OutputQueue.task_done()
+        del OutputJob
+
+# This function hands a job to the output writer, waiting while the queue is full; the time spent waiting (the
+# computation is ahead of the writer) is added to PipelineStats. A failed writer stops the run. With --profile, it also
+# waits until the job is written, so phases profiled on the two threads never overlap.
+def queueOutputJob(OutputQueue,PipelineStats,OutputJob):
+    if PipelineStats["error"]!=None:
+        raise PipelineStats["error"]
+    WaitStart=time.time()
+    OutputQueue.put(OutputJob)
+    if Args.profile==True:
+        OutputQueue.join()
+    PipelineStats["computewait"]+=time.time()-WaitStart
+
+# This function rebuilds the segment dictionaries of a protein from its cached segment table, rescoring each segment
+# from its raw components with the current scoring weights
+def loadSegmentTable(SegmentTable):
+    ProteinSeq=SegmentTable["sequence"]
+    SegmentScoreDict={}
+    StartPointDict={}
+    TermKernelList=compileScoringTerms(ProteinSeq)
+    for (LeftIndex,RightIndex,TEType,ThiolType,AverageSolubScore,HHSite) in SegmentTable["segments"]:
+        SegmentKey=(LeftIndex,RightIndex)
+        if not LeftIndex in StartPointDict:
+            StartPointDict.update({LeftIndex:[]})
+        StartPointDict[LeftIndex].append(RightIndex)
+        SegmentScoreDict.update({SegmentKey:{'seq':ProteinSeq[LeftIndex:RightIndex],'tetype':TEType,'HH':HHSite,
+                                             'avgsolubility':AverageSolubScore,'len':RightIndex-LeftIndex,'thioltype':ThiolType,
+                                             'termtotals':getTermTotals(TermKernelList,LeftIndex,RightIndex)}})
+        applySegmentWeights(SegmentScoreDict[SegmentKey])
+    Constraints=None
+    if SegmentTable["constraints"]!=None:
+        Constraints={"required":{},"forbidden":{},"forbiddensegs":set(),"minsegs":SegmentTable["constraints"]["minsegs"],
+                     "maxsegs":SegmentTable["constraints"]["maxsegs"],"lenwindow":None,
+                     "ordinalwindows":{n:(WindowMin,WindowMax) for (n,WindowMin,WindowMax) in SegmentTable["constraints"]["ordinalwindows"]}}
+    return Constraints,SegmentScoreDict,StartPointDict,SegmentTable["strategiespossible"]
+
+# This function reads new scoring weights from the "Scoring Weights" sheet of the Custom Parameters Input file
+# Returns the dictionary of weights and a list of error messages (empty if the sheet was filled in correctly)
+def parseScoringWeights(sheet):
+    NewWeights=dict(ScoringWeights)
+    ErrorList=[]
+    for (Key,Cell) in ScoringWeightCells:
+        try:
+            NewWeights[Key]=float(sheet[Cell].value)
+            if NewWeights[Key]==int(NewWeights[Key]):
+                NewWeights[Key]=int(NewWeights[Key])
+        except (TypeError,ValueError):
+            ErrorList.append(f'{sheet[Cell.replace("B","A")].value} ({Cell}) is not a number.')
+    if len(ErrorList)==0:
+        if not NewWeights["meanSolLimit"]>NewWeights["oneStdDev"]>NewWeights["twoStdDev"]>NewWeights["threeStdDev"]:
+            ErrorList.append("The solubility breakpoints must decrease from the mean to three standard deviations.")
+        for Key in ("bestSegmentLen","autoPenaltySegLength","HHDivisor"):
+            if NewWeights[Key]<=0:
+                ErrorList.append(f'{Key} must be larger than 0.')
+    return NewWeights,ErrorList
+
+# Per-residue scores are summed over each segment from prefix sums over the protein, so each segment takes the same
+# time to score however long it is: solubility (+1 for positive, -1 for problematic residues), helping hand sites,
+# and the extra scoring terms. This function gives these prefix sums for scoreSegment
+def getSegmentContext(ProteinSeq):
+    SolubilityPrefixSums=getResiduePrefixSums(ProteinSeq,getSolubilityWeights())
+    HHPrefixSums=getResiduePrefixSums(ProteinSeq,{Char:1 for Char in SolubilizingTagList})
+    TermKernelList=compileScoringTerms(ProteinSeq)
+    return SolubilityPrefixSums,HHPrefixSums,TermKernelList
+
+# This function scores the segment from LeftIndex to RightIndex of a protein, or of a construct of it running from
+# NTerminus to CTerminus: the N-terminal segment has no thiol, and the C-terminal segment no thioester
+def scoreSegment(ProteinSeq,LeftIndex,RightIndex,SegmentContext,NTerminus=0,CTerminus=None):
+    (SolubilityPrefixSums,HHPrefixSums,TermKernelList)=SegmentContext
+    if CTerminus==None:
+        CTerminus=len(ProteinSeq)
+    Segment=ProteinSeq[LeftIndex:RightIndex]
+    SegmentEntry={'seq':Segment} # Add segment sequence
+
+    #Characterize the thioester of each segment (scored in applySegmentWeights).
+    TEType = ""
+    if RightIndex != CTerminus: #This causes the C-terminal protein segments to not be counted.
+        if ProteinSeq[RightIndex-1] in PreferredTEList:
+            TEType = "preferred"
+        elif ProteinSeq[RightIndex-1] in AcceptedTEList:
+            TEType = "accepted"
+    SegmentEntry.update({'tetype':TEType})
+
+    #Creates an average solubility score for each segment.
+    SolubScore = SolubilityPrefixSums[RightIndex] - SolubilityPrefixSums[LeftIndex]
+    HHSite = HHFlag == True and HHPrefixSums[RightIndex] > HHPrefixSums[LeftIndex]
+    SegmentEntry.update({'HH':HHSite})
+    #Divide by length to get average
+    AverageSolubScore = (float(SolubScore) / len(Segment))
+    SegmentEntry.update({'avgsolubility':AverageSolubScore}) # Reported in Segment Scores output file
+
+    # Save length of segment
+    SegmentEntry.update({'len':len(Segment)})
+
+    # Characterize the thiol of each segment - desulfurization (e.g., Ala), or poor kinetics w/desulfurization (e.g., Val)
+    # May be changed in Custom Parameters Input file
+    ThiolType = ""
+    if LeftIndex!=NTerminus: # This causes the leftmost segment to not be counted
+        if Segment[0] in OKThiolList:
+            ThiolType = "ok"
+        elif Segment[0] in PoorThiolList:
+            ThiolType = "poor"
+    SegmentEntry.update({'thioltype':ThiolType})
+
+    # Sum of the residue values of each extra scoring term
+    SegmentEntry.update({'termtotals':getTermTotals(TermKernelList,LeftIndex,RightIndex)})
+
+    # Convert the raw components above into scores, using the current scoring weights
+    applySegmentWeights(SegmentEntry)
+    return SegmentEntry
+
+# This function finds every valid segment within a protein and scores it. Returns the list of valid ligation
+# junctions, the dictionary of scored segments, the dictionary of segments grouped by starting point, and
+# whether any strategies will be possible
+def buildSegments(ProteinSeq,Constraints):
+    # Determine the index of all valid ligation junctions (i.e., not forbidden thioesters, and more than MinSegLen away from either end)
+    # These will be used to generate all possible segments within the protein
+    SegmentBorderList=[0] # Beginning of protein counts as a segment border
+    ThiolList=GoodThiolList+OKThiolList+PoorThiolList
+    for i,Char in enumerate(ProteinSeq):
+        if Char in ThiolList and MinSegLen<=i<=(len(ProteinSeq)-MinSegLen) and not ProteinSeq[i-1] in ForbidTEList:
+            # Junctions forbidden by the user are never used
+            if Constraints!=None and i in Constraints["forbidden"]:
+                continue
+            SegmentBorderList.append(i)
+    # Add a marker for the end of the protein as well
+    SegmentBorderList.append(len(ProteinSeq))
+
+    # Every required junction must be a valid ligation junction, or no strategies can meet the constraints
+    RequiredJunctionsAreValid=True
+    if Constraints!=None:
+        for Index in sorted(Constraints["required"]):
+            if not Index in SegmentBorderList:
+                RequiredJunctionsAreValid=False
+                print(f'NO POSSIBLE STRATEGIES - Required junction {ProteinSeq[Index:Index+1]}{Index+1} is not a valid ligation junction')
+
+    # Determine from this list if any strategies will be possible; if there is a long stretch in between ligation junctions with no valid segments, we cannot make strategies
+    StrategiesArePossible=True
+    LastPosition=0
+    for n in SegmentBorderList:
+        if LastPosition+MaxSegLen<n:
+            StrategiesArePossible=False
+            print(f'NO POSSIBLE STRATEGIES - Large gap between junctions {LastPosition} and {n} ({n-LastPosition}-aa segment)')
+        if LastPosition+MinSegLen<n:
+            LastPosition=n
+    if RequiredJunctionsAreValid==False:
+        StrategiesArePossible=False
+
+    if report_to_screen==True:
+        gettime('Scoring all possible segments')
+
+    SegmentContext=getSegmentContext(ProteinSeq)
+
+    # Define all possible segments for the protein, discarding those too small to be considered. If not too large, score and add to dictionary.
+    SegmentScoreDict={} # Only includes valid segments between minimum and maximum length
+    StartPointDict={} # Contains all segments grouped by starting point
+    for i,LeftIndex in enumerate(SegmentBorderList):
+        for RightIndex in SegmentBorderList[i+1:]:
+            Segment=ProteinSeq[LeftIndex:RightIndex]
+            # If segment is an acceptable size, score and add to segment dictionary for later reference
+            if MinSegLen<=len(Segment)<=MaxSegLen:
+                # Segments that break the user's constraints are never scored or used
+                if Constraints!=None and not segmentMeetsConstraints(LeftIndex,RightIndex,Constraints):
+                    continue
+                SegmentKey=(LeftIndex,RightIndex)
+                # This is a valid start point; keep track of all segments sharing this start point
+                if not LeftIndex in StartPointDict:
+                    StartPointDict.update({LeftIndex:[]})
+                StartPointDict[LeftIndex].append(RightIndex) # List of right indices of valid segments
+                SegmentScoreDict.update({SegmentKey:scoreSegment(ProteinSeq,LeftIndex,RightIndex,SegmentContext)}) # Key is index borders of segment; value is a sub-dictionary detailing all scores
+
+    return SegmentBorderList,SegmentScoreDict,StartPointDict,StrategiesArePossible
+
+# SEGMENT INDEX
+# Segments are shared verbatim between the proteins of homolog and variant panels. The batch-wide segment index is
+# keyed by everything a segment's score and its N-terminal junction depend on: the residue before the segment (empty
+# for the N-terminal segment), the segment sequence (starting with its thiol residue), and whether it is the
+# C-terminal segment (which has no thioester). Each entry holds only the solubility scores of the segment (which the
+# reusable segment report lists) and the list of its uses, so the index stays small however large the batch. Scoring a
+# segment from the prefix sums of its protein takes constant time, so each protein scores its own segments.
+
+# This function gives the segment index key of a segment
+def getSegmentIndexKey(ProteinSeq,LeftIndex,RightIndex):
+    return (ProteinSeq[LeftIndex-1:LeftIndex] if LeftIndex>0 else "",ProteinSeq[LeftIndex:RightIndex],RightIndex==len(ProteinSeq))
+
+# This function records the use of a segment in the segment index
+def addSegmentUse(SegmentIndex,ProteinName,ProteinSeq,LeftIndex,RightIndex,AverageSolubScore,FinalSolubScore):
+    IndexKey=getSegmentIndexKey(ProteinSeq,LeftIndex,RightIndex)
+    if not IndexKey in SegmentIndex:
+        SegmentIndex.update({IndexKey:{"avgsolubility":AverageSolubScore,"solubility":FinalSolubScore,"uses":[]}})
+    SegmentIndex[IndexKey]["uses"].append((ProteinName,LeftIndex,RightIndex))
+
+# These functions record the uses of a protein's valid segments in the segment index, from its scored segments or from
+# its segment table (for the proteins a resumed run skips, whose segments are not scored again)
+def indexSegmentUses(SegmentIndex,ProteinName,ProteinSeq,SegmentScoreDict):
+    for (LeftIndex,RightIndex) in sorted(SegmentScoreDict.keys()):
+        SegmentEntry=SegmentScoreDict[(LeftIndex,RightIndex)]
+        addSegmentUse(SegmentIndex,ProteinName,ProteinSeq,LeftIndex,RightIndex,SegmentEntry["avgsolubility"],SegmentEntry["solubility"])
+
+def indexSegmentTableUses(SegmentIndex,ProteinName,SegmentTable):
+    for (LeftIndex,RightIndex,TEType,ThiolType,AverageSolubScore,HHSite) in SegmentTable["segments"]:
+        addSegmentUse(SegmentIndex,ProteinName,SegmentTable["sequence"],LeftIndex,RightIndex,AverageSolubScore,scoreAverageSolubility(AverageSolubScore,HHSite))
+
+# This function writes the segments of the index that are valid in more than one protein, so each can be synthesized
+# once for the whole panel; the most widely shared (then longest) segments are listed first. Returns the number of
+# reusable segments
+def writeReusableSegments(SegmentIndex,OutputFilepath):
+    ReusableList=[]
+    for (IndexKey,IndexEntry) in SegmentIndex.items():
+        ProteinCount=len(set(ProteinName for (ProteinName,LeftIndex,RightIndex) in IndexEntry["uses"]))
+        if ProteinCount>1:
+            ReusableList.append((ProteinCount,IndexKey,IndexEntry))
+    ReusableList.sort(key=lambda Reusable:(-Reusable[0],-len(Reusable[1][1]),Reusable[1]))
+    LineList=['Sequence,Preceding AA,C-terminal Segment?,Average AA Solubility,Final Solubility Score,Proteins,Used In (protein: first AA-last AA)...,\n']
+    if len(ReusableList)==0:
+        LineList.append('NO SEGMENTS ARE SHARED BETWEEN PROTEINS')
+    for (ProteinCount,(PrecedingAA,Sequence,IsCTerminal),IndexEntry) in ReusableList:
+        CTerminalText=""
+        if IsCTerminal==True:
+            CTerminalText="Yes"
+        UseText=''.join(f'{ProteinName}: {LeftIndex+1}-{RightIndex},' for (ProteinName,LeftIndex,RightIndex) in IndexEntry["uses"])
+        LineList.append(f'{Sequence},{PrecedingAA},{CTerminalText},{IndexEntry["avgsolubility"]},{IndexEntry["solubility"]},{ProteinCount},{UseText}\n')
+    with open(OutputFilepath,'w') as f:
+        f.write(''.join(LineList))
+    return len(ReusableList)
+
+# EXCEL OUTPUT
+# The CSV files of each protein are merged into one Viable Segment Lists workbook and one Aligator Analysis workbook,
+# with a sheet per protein. With --shard, the proteins are split over several pairs of workbooks instead (by number of
+# proteins, or by the size of their CSV files), which are built at the same time on worker processes, and an index
+# workbook lists the workbook and sheet of every protein along with the batch-wide Reusable Segments sheet.
+ExcelReservedTitles = ["Sheet","Index","Junction Sensitivity","Reusable Segments","Pareto Front","Assembly Orders"] # Sheet names not used for proteins
+ExcelTitleLength = 31 # Longest sheet name Excel allows
+
+# This function gives each protein a sheet name Excel accepts: characters Excel does not allow are replaced, long names
+# are cut to 31 characters, and names that are then the same (Excel ignores case) are numbered
+def getSheetTitles(ProteinNameList):
+    TitleDict={}
+    UsedTitleSet=set(Title.lower() for Title in ExcelReservedTitles)
+    for ProteinName in ProteinNameList:
+        BaseTitle=re.sub(r"[\[\]:*?/\\]","_",ProteinName).strip("'")
+        if BaseTitle=="":
+            BaseTitle="_"
+        Title=BaseTitle[0:ExcelTitleLength]
+        TitleNumber=1
+        while Title.lower() in UsedTitleSet:
+            TitleNumber+=1
+            Title=BaseTitle[0:ExcelTitleLength-len(f' ({TitleNumber})')]+f' ({TitleNumber})'
+        UsedTitleSet.add(Title.lower())
+        TitleDict[ProteinName]=Title
+    return TitleDict
+
+# This function splits the proteins into shards of at most ShardProteins proteins, or of at most ShardBytes of CSV
+# files; a protein larger than ShardBytes gets a shard of its own
+def getExcelShards(ProteinNameList,ShardProteins=None,ShardBytes=None):
+    ShardList=[]
+    ShardSize=0
+    for ProteinName in ProteinNameList:
+        ProteinSize=sum(os.path.getsize(FileDict[ProteinName]) for FileDict in (SegFileDict,SensitivityFileDict,LigFileDict,ParetoFileDict,AssemblyFileDict) if ProteinName in FileDict)
+        if len(ShardList)==0 or (ShardProteins!=None and len(ShardList[-1])>=ShardProteins) or (ShardBytes!=None and ShardSize+ProteinSize>ShardBytes):
+            ShardList.append([])
+            ShardSize=0
+        ShardList[-1].append(ProteinName)
+        ShardSize+=ProteinSize
+    return ShardList
+
+# This function adds the segments shared between proteins to a workbook, as one extra sheet
+def addReusableSegmentsSheet(ExcelFile,ReusableSegmentsFilepath):
+    sheet=ExcelFile.create_sheet(title="Reusable Segments")
+    with open(ReusableSegmentsFilepath,'r') as f:
+        reader=csv.reader(f, delimiter=',')
+        for row in reader:
+            sheet.append(row)
+    for cell in ("A1","B1","C1","D1","E1","F1","G1"):
+        sheet[cell].alignment = center
+        sheet[cell].font = Font(size = 12, bold = True)
+    sheet["A1"].fill=aquaFill
+    sheet["F1"].fill=greenFill
+
+# This function writes a Viable Segment Lists workbook for a list of proteins, with the Reusable Segments sheet if its
+# file is given. It runs on a worker process when the workbooks are sharded, so it only takes and returns plain values
+def writeSegmentWorkbook(Task):
+    (WorkbookFilepath,ProteinNameList,TitleDict,ReusableSegmentsFilepath)=Task
+    ExcelFileSeg=openpyxl.Workbook()
+
+    # From recorded list of relevant files, create a new Excel sheet for each and transfer all of the data
+    for ProteinName in ProteinNameList:
+        sheet=ExcelFileSeg.create_sheet(index=-1,title=TitleDict[ProteinName])
+        filepath=SegFileDict[ProteinName]
+        with open(filepath,'r') as f:
+            reader=csv.reader(f, delimiter=',')
+            for row in reader:
+                sheet.append(row)
+
+        # Apply formatting to header row
+        for cell in ("A1","B1","C1","D1","E1","F1"):
+            sheet[cell].alignment = center
+            sheet[cell].font = Font(size = 12, bold = True)
+        sheet["C1"].fill=aquaFill
+        sheet["E1"].fill=redFill
+        for Column in range(7,7+len(ScoringTermList)):
+            sheet.cell(row=1,column=Column).alignment = center
+            sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+            sheet.cell(row=1,column=Column).fill=redFill
+        for Column in range(7+len(ScoringTermList),11+len(ScoringTermList)):
+            sheet.cell(row=1,column=Column).alignment = center
+            sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+            sheet.cell(row=1,column=Column).fill=greenFill
+
+    # The junction sensitivity of every protein goes on one extra sheet
+    sheet=ExcelFileSeg.create_sheet(index=-1,title="Junction Sensitivity")
+    for (i,ProteinName) in enumerate(ProteinNameList):
+        with open(SensitivityFileDict[ProteinName],'r') as f:
+            reader=csv.reader(f, delimiter=',')
+            # Only the first file's header row is kept
+            if i>0:
+                next(reader)
+            for row in reader:
+                sheet.append(row)
+    for cell in ("A1","B1","C1","D1","E1","F1"):
+        sheet[cell].alignment = center
+        sheet[cell].font = Font(size = 12, bold = True)
+    sheet["B1"].fill=aquaFill
+    sheet["C1"].fill=greenFill
+    sheet["E1"].fill=redFill
+
+    # Segments shared between proteins go on one extra sheet
+    if ReusableSegmentsFilepath!=None:
+        addReusableSegmentsSheet(ExcelFileSeg,ReusableSegmentsFilepath)
+
+    # Remove initial blank sheet
+    ExcelFileSeg.remove(ExcelFileSeg["Sheet"])
+
+    # Save output file
+    ExcelFileSeg.save(WorkbookFilepath)
+    return WorkbookFilepath
+
+# This function writes an Aligator Analysis workbook for a list of proteins, with the Pareto Front and Assembly Orders
+# sheets of these proteins if they were found. Like writeSegmentWorkbook, it can run on a worker process
+def writeAnalysisWorkbook(Task):
+    (WorkbookFilepath,ProteinNameList,TitleDict)=Task
+    ExcelFileLig=openpyxl.Workbook()
+    # Segments start in the column after the scores (G, or H if the scoring terms column is used)
+    SegmentColumn=len(getStrategyScoreKeys())+1
+
+    # From recorded list of relevant files, create a new Excel sheet for each and transfer all of the data
+    for ProteinName in ProteinNameList:
+        sheet=ExcelFileLig.create_sheet(index=-1,title=TitleDict[ProteinName])
+        # Flag proteins that reached the time budget with a red sheet tab
+        if ProteinName in TimeBudgetDict:
+            sheet.sheet_properties.tabColor="FF0000"
+        filepath=LigFileDict[ProteinName]
+        with open(filepath,'r') as f:
+            reader=csv.reader(f, delimiter=',')
+            for row in reader:
+                sheet.append(row)
+
+        # Apply formatting to header row
+        for Column in range(1,SegmentColumn+1):
+            sheet.cell(row=1,column=Column).alignment = center
+            sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+            sheet.cell(row=1,column=Column).fill=redFill
+        sheet["A1"].fill=greenFill
+        sheet.cell(row=1,column=SegmentColumn).fill=aquaFill
+
+        # Merge "Segments N to C" header to span entire row, from width recorded during processing
+        if MaxWidthDict[ProteinName]>1:
+            extracells=MaxWidthDict[ProteinName]-1
+            sheet.merge_cells(start_row=1, start_column=SegmentColumn, end_row=1, end_column=SegmentColumn+extracells)
+
+    # Pareto-optimal strategies of every protein go on one extra sheet, with the chosen sub-scores highlighted
+    if ParetoScoreList!=None:
+        sheet=ExcelFileLig.create_sheet(index=-1,title="Pareto Front")
+        for (i,ProteinName) in enumerate(ProteinNameList):
+            with open(ParetoFileDict[ProteinName],'r') as f:
+                reader=csv.reader(f, delimiter=',')
+                # Only the first file's header row is kept
+                if i>0:
+                    next(reader)
+                for row in reader:
+                    sheet.append(row)
+        for Column in range(1,SegmentColumn+3):
+            sheet.cell(row=1,column=Column).alignment = center
+            sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+        sheet["C1"].fill=greenFill
+        sheet.cell(row=1,column=SegmentColumn+2).fill=aquaFill
+        for (Column,Score) in enumerate(getStrategyScoreKeys(),start=3):
+            if Score in ParetoScoreList:
+                sheet.cell(row=1,column=Column).fill=redFill
+        if ParetoMaxWidth>1:
+            sheet.merge_cells(start_row=1, start_column=SegmentColumn+2, end_row=1, end_column=SegmentColumn+1+ParetoMaxWidth)
+
+    # Assembly orders of every protein's strategies go on one extra sheet
+    if Args.assembly==True:
+        sheet=ExcelFileLig.create_sheet(index=-1,title="Assembly Orders")
+        for (i,ProteinName) in enumerate(ProteinNameList):
+            with open(AssemblyFileDict[ProteinName],'r') as f:
+                reader=csv.reader(f, delimiter=',')
+                # Only the first file's header row is kept
+                if i>0:
+                    next(reader)
+                for row in reader:
+                    sheet.append(row)
+        for Column in range(1,9):
+            sheet.cell(row=1,column=Column).alignment = center
+            sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+        sheet["C1"].fill=greenFill
+        sheet["D1"].fill=redFill
+        sheet["H1"].fill=aquaFill
+
+    # Remove initial blank sheet
+    ExcelFileLig.remove(ExcelFileLig["Sheet"])
+
+    # Save output file
+    ExcelFileLig.save(WorkbookFilepath)
+    return WorkbookFilepath
+
+# This function writes the Aligator Boundary Scan workbook: for each protein, a heatmap of the best score of every
+# construct (first residues down, last residues across) above its table of constructs
+def writeBoundaryWorkbook(WorkbookFilepath,ProteinNameList,TitleDict):
+    ExcelFileBoundary=openpyxl.Workbook()
+    for ProteinName in ProteinNameList:
+        sheet=ExcelFileBoundary.create_sheet(index=-1,title=TitleDict[ProteinName])
+        with open(BoundaryFileDict[ProteinName],'r') as f:
+            RowList=list(csv.reader(f, delimiter=','))
+        StartList=sorted(set(int(Row[0]) for Row in RowList[1:]))
+        EndList=sorted(set(int(Row[1]) for Row in RowList[1:]))
+        ScoreDict={(int(Row[0]),int(Row[1])):float(Row[3]) for Row in RowList[1:] if Row[3]!="n/a"}
+        sheet.append(["First AA \\ Last AA"]+EndList)
+        for Start in StartList:
+            sheet.append([Start]+[ScoreDict.get((Start,End)) for End in EndList])
+        if len(ScoreDict)>0:
+            sheet.conditional_formatting.add(f'B2:{get_column_letter(len(EndList)+1)}{len(StartList)+1}',
+                                             ColorScaleRule(start_type='min',start_color='F8696B',mid_type='percentile',mid_value=50,mid_color='FFEB84',end_type='max',end_color='63BE7B'))
+        for Column in range(1,len(EndList)+2):
+            sheet.cell(row=1,column=Column).font = Font(bold = True)
+        for Row in range(2,len(StartList)+2):
+            sheet.cell(row=Row,column=1).font = Font(bold = True)
+        sheet["A1"].fill=aquaFill
+
+        # The table of constructs starts below the heatmap, after a blank row
+        TableRow=len(StartList)+3
+        sheet.append([])
+        for Row in RowList:
+            sheet.append(Row)
+        SegmentColumn=len(getStrategyScoreKeys())+6
+        for Column in range(1,SegmentColumn+1):
+            sheet.cell(row=TableRow,column=Column).alignment = center
+            sheet.cell(row=TableRow,column=Column).font = Font(size = 12, bold = True)
+        sheet.cell(row=TableRow,column=4).fill=greenFill
+        sheet.cell(row=TableRow,column=SegmentColumn).fill=aquaFill
+    ExcelFileBoundary.remove(ExcelFileBoundary["Sheet"])
+    ExcelFileBoundary.save(WorkbookFilepath)
+
+# This function writes the index workbook of a sharded run: the workbooks and sheet of every protein, linked to the
+# sheet, and the Reusable Segments sheet if its file is given
+def writeExcelIndex(IndexFilepath,ShardList,ShardFileList,TitleDict,ReusableSegmentsFilepath):
+    ExcelFileIndex=openpyxl.Workbook()
+    sheet=ExcelFileIndex.active
+    sheet.title="Index"
+    sheet.append(["Protein","Sheet","Viable Segment Lists","Aligator Analysis"])
+    for (ShardProteinList,(SegmentFilepath,AnalysisFilepath)) in zip(ShardList,ShardFileList):
+        for ProteinName in ShardProteinList:
+            sheet.append([ProteinName,TitleDict[ProteinName],os.path.basename(SegmentFilepath),os.path.basename(AnalysisFilepath)])
+            for (Column,Filepath) in ((3,SegmentFilepath),(4,AnalysisFilepath)):
+                sheet.cell(row=sheet.max_row,column=Column).hyperlink=f"{os.path.basename(Filepath)}#'{TitleDict[ProteinName]}'!A1"
+    for Column in range(1,5):
+        sheet.cell(row=1,column=Column).alignment = center
+        sheet.cell(row=1,column=Column).font = Font(size = 12, bold = True)
+    sheet["A1"].fill=aquaFill
+    if ReusableSegmentsFilepath!=None:
+        addReusableSegmentsSheet(ExcelFileIndex,ReusableSegmentsFilepath)
+    ExcelFileIndex.save(IndexFilepath)
+
+# PARALLEL STRATEGY SEARCH
+# The partial strategies of each endpoint are ranked and trimmed independently of the other endpoints, so a large loop
+# of buildStrategies is shared out as ranges of endpoints: each worker expands the partial strategies that reach its
+# endpoints and trims them, and the trimmed lists are put back together in the order the single-process loop would
+# have made them, so that the strategies found (and the order of tied strategies) do not depend on the number of
+# workers. The workers are forked once, before the output writer thread starts (a process with running threads cannot
+# be forked safely), and are reused for every protein: the search context of a protein (its segment scores, segments
+# and bounds) is sent to each worker once, at the first loop large enough to share out, instead of with every task.
+# Both are pickled. Since the workers are forked before the protein is read, they cannot share its context
+# copy-on-write, and multiprocessing.shared_memory would not save the pickling: the context is nested dictionaries that
+# each worker needs as Python objects. For a 420-aa protein, the context is about 55 kB and takes under 10 ms to send
+# to each worker, while the partial strategies sent with the tasks add up to about 33 MB (0.6 s of pickling) over a
+# 50 s search; --benchmark measures the speedup this leaves on a given machine.
+SearchParallelMinimum = 5000 # Smallest number of partial strategies in a loop that is shared out between workers
+SearchTasksPerWorker = 4 # Endpoint ranges per worker in each loop, so that workers with light ranges pick up more
+SearchContext = {} # Search context of the current protein, on each worker
+SearchPoolDict = {} # Worker pools by number of workers (one for each number benchmarked)
+SearchPoolStack = contextlib.ExitStack() # Shuts the worker pools down, at the end of the run or when it stops early
+SearchBarrier = None # Set on each worker, so that every worker of a pool takes exactly one copy of the search context
+
+# This function ranks the partial strategies ending at one EndPoint and trims them to the top StrategyLimit, using the
+# CompletionDict and ScoreThreshold as in buildStrategies. Returns the trimmed list, and the best score any strategy
+# through a trimmed partial strategy could reach (None if nothing that could still be completed was trimmed)
+def trimEndPointStrategies(EndPoint,StrategyList,StrategyLimit,CompletionDict=None,ScoreThreshold=None):
+    # All strategies of a loop have the same number of segments, so at this endpoint they share the same ligation
+    # penalty so far and the same best completion (None if they can no longer be completed)
+    NumberOfSegments=len(StrategyList[0])-1
+    BestCompletion=None
+    if CompletionDict!=None and NumberOfSegments in CompletionDict.get(EndPoint,{}):
+        BestCompletion=CompletionDict[EndPoint][NumberOfSegments]-getLigationPenalty(NumberOfSegments,EndPoint)
+    # Branch and bound - drop partial strategies that cannot reach the score threshold with any completion
+    if ScoreThreshold!=None and BestCompletion==None:
+        return [],None
+    # If this list is greater than 1000, sort and trim to the top 1000
+    NodeBound=None
+    if len(StrategyList)>StrategyLimit or ScoreThreshold!=None:
+        ScoredList=[(scoreStrategy(Strategy)["total"],Strategy) for Strategy in StrategyList]
+        ScoredList.sort(key=lambda ScoredStrategy:ScoredStrategy[0],reverse=True) # Reverse order = higher scores first
+        if ScoreThreshold!=None:
+            while len(ScoredList)>0 and ScoredList[-1][0]+BestCompletion<ScoreThreshold:
+                ScoredList.pop()
+        # The best trimmed strategy bounds all trimmed strategies at this endpoint, since they share the same completions
+        if len(ScoredList)>StrategyLimit and BestCompletion!=None:
+            NodeBound=ScoredList[StrategyLimit][0]+BestCompletion
+        StrategyList=[Strategy for (Score,Strategy) in ScoredList[0:StrategyLimit]]
+    return StrategyList,NodeBound
+
+# This function starts the worker pools of the run, one for each number of workers in WorkerList; all workers are
+# forked here, before any other thread is started, and the pools are shut down by SearchPoolStack
+def startSearchPools(WorkerList):
+    for Workers in WorkerList:
+        Barrier=multiprocessing.get_context("fork").Barrier(Workers)
+        SearchPool=SearchPoolStack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=Workers,mp_context=multiprocessing.get_context("fork"),
+                                                                                        initializer=initSearchWorker,initargs=(Barrier,)))
+        # The first task makes the pool fork all of its workers
+        SearchPool.submit(os.getpid).result()
+        SearchPoolDict[Workers]=SearchPool
+    atexit.register(SearchPoolStack.close)
+
+# This function sets up a worker process of a search pool: Ctrl+C is left to the main process
+def initSearchWorker(Barrier):
+    global SearchBarrier
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+    SearchBarrier=Barrier
+
+# This function runs on a worker: it keeps the search context of a protein, then waits for the other workers of the
+# pool, so that no worker takes two copies while another takes none
+def setSearchContext(Context):
+    global SegmentScoreDict
+    SearchContext.clear()
+    SearchContext.update(Context)
+    SegmentScoreDict=Context["segmentscores"]
+    SearchBarrier.wait()
+
+# This function sends the search context of a protein to every worker of a pool
+def shareSearchContext(SearchPool,Workers,StartPointDict,Constraints,SegsToEndDict,StrategyLimit,CompletionDict,ScoreThreshold):
+    Context={"startpoints":StartPointDict,"constraints":Constraints,"segstoend":SegsToEndDict,"limit":StrategyLimit,
+             "completion":CompletionDict,"threshold":ScoreThreshold,"segmentscores":SegmentScoreDict}
+    list(SearchPool.map(setSearchContext,[Context]*Workers))
+
+# This function runs on a worker: it adds one segment to each (QueueIndex, Strategy) of the task wherever that ends in
+# the task's range of endpoints, and trims the strategies of each endpoint. Returns, for each endpoint, the position
+# its first strategy would have had in the single-process queue, the endpoint, the trimmed list and its bound
+def expandEndPointRange(Task):
+    (FirstEndPoint,LastEndPoint,IndexedStrategyList)=Task
+    Constraints=SearchContext["constraints"]
+    PartialStrategiesByEndPoint={}
+    FirstPositionDict={}
+    for (QueueIndex,Strategy) in IndexedStrategyList:
+        for (Position,EndPoint) in enumerate(SearchContext["startpoints"][Strategy[-1]]):
+            if EndPoint<FirstEndPoint or EndPoint>LastEndPoint:
+                continue
+            NextStrategy=Strategy+(EndPoint,)
+            if Constraints!=None and not strategyMeetsConstraints(NextStrategy,Constraints,SearchContext["segstoend"]):
+                continue
+            if not EndPoint in PartialStrategiesByEndPoint:
+                PartialStrategiesByEndPoint.update({EndPoint:[]})
+                FirstPositionDict.update({EndPoint:(QueueIndex,Position)})
+            PartialStrategiesByEndPoint[EndPoint].append(NextStrategy)
+    ResultList=[]
+    for EndPoint in PartialStrategiesByEndPoint:
+        (StrategyList,NodeBound)=trimEndPointStrategies(EndPoint,PartialStrategiesByEndPoint[EndPoint],SearchContext["limit"],
+                                                        SearchContext["completion"],SearchContext["threshold"])
+        ResultList.append((FirstPositionDict[EndPoint],EndPoint,StrategyList,NodeBound))
+    return ResultList
+
+# This function expands and trims one loop of partial strategies (PrevQueue, without its complete strategies) on the
+# worker pool. Endpoints are split into contiguous ranges that are reached by about the same number of partial
+# strategies; a partial strategy is sent to each range it can reach. Returns the trimmed queue of the next loop, the
+# best bound of the trimmed strategies (or None) and the number of endpoints reached, or None if the Deadline (a
+# time.time() value, or None) was reached before every range was done; the ranges not yet started are then cancelled
+def expandStrategiesInParallel(SearchPool,Workers,PrevQueue,StartPointDict,Deadline=None):
+    LastCountDict=collections.Counter(Strategy[-1] for Strategy in PrevQueue if Strategy[-1] in StartPointDict)
+    LoadDict={}
+    for LastAA in LastCountDict:
+        for EndPoint in StartPointDict[LastAA]:
+            LoadDict[EndPoint]=LoadDict.get(EndPoint,0)+LastCountDict[LastAA]
+    TaskCount=min(len(LoadDict),Workers*SearchTasksPerWorker)
+    TotalLoad=sum(LoadDict.values())
+    TaskRangeList=[]
+    Load=0
+    for EndPoint in sorted(LoadDict):
+        if len(TaskRangeList)==0 or (Load>=TotalLoad*len(TaskRangeList)/TaskCount and len(TaskRangeList)<TaskCount):
+            TaskRangeList.append([EndPoint,EndPoint])
+        TaskRangeList[-1][1]=EndPoint
+        Load+=LoadDict[EndPoint]
+    TaskList=[(FirstEndPoint,LastEndPoint,[]) for (FirstEndPoint,LastEndPoint) in TaskRangeList]
+    TaskStartList=[FirstEndPoint for (FirstEndPoint,LastEndPoint) in TaskRangeList]
+    TaskIndexDict={}
+    for LastAA in LastCountDict:
+        NextEndPoints=StartPointDict[LastAA]
+        TaskIndexDict[LastAA]=range(bisect.bisect_right(TaskStartList,min(NextEndPoints))-1,bisect.bisect_right(TaskStartList,max(NextEndPoints)))
+    for (QueueIndex,Strategy) in enumerate(PrevQueue):
+        for TaskIndex in TaskIndexDict.get(Strategy[-1],()):
+            TaskList[TaskIndex][2].append((QueueIndex,Strategy))
+    # Put the endpoints back in the order in which the single-process loop first reaches them
+    FutureList=[SearchPool.submit(expandEndPointRange,Task) for Task in TaskList]
+    EndPointResultList=[]
+    for Future in FutureList:
+        try:
+            EndPointResultList+=Future.result(timeout=None if Deadline==None else max(Deadline-time.time(),0))
+        except concurrent.futures.TimeoutError:
+            for PendingFuture in FutureList:
+                PendingFuture.cancel()
+            return None
+    EndPointResultList.sort(key=lambda EndPointResult:EndPointResult[0])
+    StrategyQueue=[]
+    TrimmedBound=None
+    for (FirstPosition,EndPoint,StrategyList,NodeBound) in EndPointResultList:
+        StrategyQueue+=StrategyList
+        if NodeBound!=None and (TrimmedBound==None or NodeBound>TrimmedBound):
+            TrimmedBound=NodeBound
+    return StrategyQueue,TrimmedBound,len(EndPointResultList)
+
+# This function builds strategies one segment at a time from the N-terminus, keeping only the top StrategyLimit
+# partial strategies for each endpoint (dead-end elimination). Returns the list of complete strategies (unsorted), and
+# if the Deadline (a time.time() value, or None) was reached first, the set of (junction, number of segments) nodes
+# of the partial strategies that were left unfinished (otherwise None). If the CompletionDict of getNodeScoreBounds is
+# given, the best score any strategy through a trimmed partial strategy could reach is also returned (otherwise, or if
+# nothing that could still be completed was trimmed, None); listed strategies scoring at least this bound are exact.
+# With a ScoreThreshold (which needs the CompletionDict), partial strategies that cannot reach it are dropped as well.
+# With more than one Workers, large loops are expanded and trimmed on the worker pool of that size (where processes can
+# be forked, see startSearchPools)
+def buildStrategies(ProteinName,ProteinSeq,StartPointDict,Constraints,SegsToEndDict,StrategyLimit,Deadline=None,CompletionDict=None,ScoreThreshold=None,Workers=1):
+    print('Now creating strategies....')
+    if not Workers in SearchPoolDict:
+        Workers=1
+
+    # Create the starting list of segments to begin processing all possible strategies
+    StrategyQueue = []
+    FinalStrategyList = []
+    for r in StartPointDict[0]:
+        Strategy = (0,r) # Single-segment strategy looks the same as a single segment
+        if Constraints!=None and not strategyMeetsConstraints(Strategy,Constraints,SegsToEndDict):
+            continue
+        StrategyQueue.append(Strategy)
+
+    if report_to_screen==True:
+        print(f'Found {len(StrategyQueue)} starting segments')
+
+    # For printing to screen
+    loopcount=0
+
+    # Anytime mode - strategies that are still being built when the time budget runs out
+    UnfinishedList=None
+
+    # Best score reachable through any trimmed partial strategy
+    TrimmedBound=None
+
+    # Worker pool, given the search context of this protein at the first loop large enough to share out
+    SearchPool=None
+
+    # MAIN LOOP OF BUILDING STRATEGIES
+    while len(StrategyQueue)>0:
+        loopcount+=1
+        if report_to_screen==True:
+            gettime(f'-------\nRanking {loopcount+1}-segment strategies...\n')
+        # Copy and clear queue
+        PrevQueue=StrategyQueue[:]
+        report_inputstrats=len(PrevQueue)
+        StrategyQueue=[]
+        NextQueue=[]
+        report_finalstrats=0
+        # Large loops are expanded and trimmed on the worker pool instead; when the time budget runs out during the loop,
+        # all of its partial strategies are left unfinished
+        if SearchPool!=None or (Workers>1 and len(PrevQueue)>=SearchParallelMinimum):
+            if Deadline!=None and time.time()>Deadline:
+                UnfinishedList=PrevQueue
+                break
+            if SearchPool==None:
+                SearchPool=SearchPoolDict[Workers]
+                shareSearchContext(SearchPool,Workers,StartPointDict,Constraints,SegsToEndDict,StrategyLimit,CompletionDict,ScoreThreshold)
+            for Strategy in PrevQueue:
+                if Strategy[-1]==len(ProteinSeq):
+                    FinalStrategyList.append(Strategy)
+            report_finalstrats=len(FinalStrategyList)
+            ParallelResult=expandStrategiesInParallel(SearchPool,Workers,PrevQueue,StartPointDict,Deadline)
+            if ParallelResult==None:
+                UnfinishedList=[Strategy for Strategy in PrevQueue if Strategy[-1]!=len(ProteinSeq)]
+                break
+            (StrategyQueue,NodeBound,EndPointCount)=ParallelResult
+            if NodeBound!=None and (TrimmedBound==None or NodeBound>TrimmedBound):
+                TrimmedBound=NodeBound
+            if report_to_screen==True:
+                if EndPointCount>0:
+                    print(f'End of loop: {report_finalstrats} complete strategies for {ProteinName}\n{len(StrategyQueue)} remaining {loopcount+1}-segment strategies')
+                else:
+                    print(f'No partial strategies left - this is the final loop.')
+            continue
+        # Loop through copied list to generate all strategies with 1 additional segment
+        for (QueueIndex,Strategy) in enumerate(PrevQueue):
+            # Stop as soon as the time budget runs out
+            if Deadline!=None and time.time()>Deadline:
+                UnfinishedList=PrevQueue[QueueIndex:]+NextQueue
+                break
+            LastAA=Strategy[-1]
+            # If this strategy is complete (ends at the final AA), add it to our final output list
+            if LastAA==len(ProteinSeq):
+                FinalStrategyList.append(Strategy)
+                report_finalstrats=len(FinalStrategyList)
+            # If the strategy is incomplete, generate the list of next strategies by adding 1 additional segment
+            elif LastAA in StartPointDict:
+                NextEndPoints=StartPointDict[LastAA]
+                for EndPoint in NextEndPoints:
+                    NextStrategy=list(Strategy)+[EndPoint] # Convert to list of numbers and add next number
+                    NextStrategy=tuple(NextStrategy) # Convert back to tuple
+                    # Skip strategies that can no longer meet the constraints
+                    if Constraints!=None and not strategyMeetsConstraints(NextStrategy,Constraints,SegsToEndDict):
+                        continue
+                    NextQueue.append(NextStrategy)
+        if UnfinishedList!=None:
+            break
+
+        # Done adding strategies to queue; verbose printout for debugging
+        # if report_to_screen==True:
+            # print(f'Detected {report_finalstrats} complete strategies (total {len(FinalStrategyList)} so far), {report_inputstrats-report_finalstrats} partial')
+            # print(f'Partial list expanded to {len(NextQueue)} next strategies')
+        report_newstratsfound=len(NextQueue)
+
+
+        # SORT AND TRIM PARTIAL STRATEGIES
+        # Verbose printout for debugging
+        # if report_to_screen==True:
+        #         print(f'Performing dead-end elimination... (<={StrategyLimit} strategies per endpoint)')
+        # Partial strategy scores can only be directly compared if they represent the same slice of the protein; in other words, if they share a start and endpoint
+        # Since all partial strategies share the same start point (0), group these by endpoint
+        PartialStrategiesByEndPoint={}
+        for Strategy in NextQueue:
+            EndPoint=Strategy[-1]
+            if not EndPoint in PartialStrategiesByEndPoint:
+                PartialStrategiesByEndPoint.update({EndPoint:[]}) # First time we encounter a number, add a blank entry
+            PartialStrategiesByEndPoint[EndPoint].append(Strategy) # Save each strategy with its endpoint
+
+        # Dead-end elimination; trim each sub-list to the top 1000
+        for EndPoint in PartialStrategiesByEndPoint:
+            # Stop as soon as the time budget runs out
+            if Deadline!=None and time.time()>Deadline:
+                UnfinishedList=NextQueue
+                break
+            (StrategyList,NodeBound)=trimEndPointStrategies(EndPoint,PartialStrategiesByEndPoint[EndPoint],StrategyLimit,CompletionDict,ScoreThreshold)
+            if NodeBound!=None and (TrimmedBound==None or NodeBound>TrimmedBound):
+                TrimmedBound=NodeBound
+
+            # Pass group of strategies back to queue after trimming (or not trimming)
+            for Strategy in StrategyList:
+                StrategyQueue.append(Strategy)
+        if UnfinishedList!=None:
+            break
+
+        # Report some info to screen at the end of each loop
+        if report_to_screen==True:
+            if len(PartialStrategiesByEndPoint)>0:
+                # Verbose printout for debugging
+                # print(f'Total number of endpoints = {len(PartialStrategiesByEndPoint)}, ranging from {min(PartialStrategiesByEndPoint.keys())} to {max(PartialStrategiesByEndPoint.keys())}')
+                # print(f'List of {len(NextQueue)} partial strategies trimmed to {len(StrategyQueue)}')
+                # User printout
+                report_trimmedstrategies=len(StrategyQueue)
+                print(f'End of loop: {report_finalstrats} complete strategies for {ProteinName}\n{report_trimmedstrategies} remaining {loopcount+1}-segment strategies')
+            else:
+                print(f'No partial strategies left - this is the final loop.')
+
+    # Time budget reached - keep the complete strategies built so far, and list the nodes of the unfinished ones
+    FrontierNodeSet=None
+    if UnfinishedList!=None:
+        print(f'TIME BUDGET REACHED while ranking {loopcount+1}-segment strategies')
+        FrontierNodeSet=set()
+        for Strategy in UnfinishedList:
+            if Strategy[-1]==len(ProteinSeq):
+                FinalStrategyList.append(Strategy)
+            else:
+                FrontierNodeSet.add((Strategy[-1],len(Strategy)-1))
+
+    # Finished with strategy-building loop
+    if report_to_screen==True:
+        gettime(f'--------\nDone with protein {ProteinName}...found {len(FinalStrategyList)} total strategies')
+
+    return FinalStrategyList,FrontierNodeSet,TrimmedBound
+
+
+# This function lists the numbers of workers the strategy search is benchmarked with: 1, 2, 4, ... and WorkerCount
+def getBenchmarkWorkerList(WorkerCount):
+    WorkerList=[1]
+    while 2*WorkerList[-1]<WorkerCount:
+        WorkerList.append(2*WorkerList[-1])
+    if WorkerCount>1:
+        WorkerList.append(WorkerCount)
+    return WorkerList
+
+# This function builds the strategies of a protein (buildStrategies with BuildArgs) once with each number of workers of
+# the benchmark, adding the time each took to the BenchmarkDict. Returns the result of the last build, after checking
+# that every build found the same strategies in the same order
+def benchmarkStrategySearch(BuildArgs,BenchmarkDict):
+    ProteinName=BuildArgs[0]
+    if not ProteinName in BenchmarkDict:
+        BenchmarkDict.update({ProteinName:{}})
+    FirstResult=None
+    for Workers in getBenchmarkWorkerList(SearchWorkerCount):
+        print(f'Benchmark: building strategies with {Workers} worker{"s" if Workers>1 else ""}')
+        BuildStartTime=time.time()
+        Result=buildStrategies(*BuildArgs,Workers=Workers)
+        BenchmarkDict[ProteinName][Workers]=BenchmarkDict[ProteinName].get(Workers,0)+time.time()-BuildStartTime
+        if FirstResult==None:
+            FirstResult=Result
+        elif Result[0]!=FirstResult[0] or Result[2]!=FirstResult[2]:
+            raise RuntimeError(f'the strategies of {ProteinName} built with {Workers} workers differ from those built with 1 worker')
+    return Result
+
+# This function lists the lines of the benchmark report: the strategy search time of each protein with each number of
+# workers, and the speedup over 1 worker
+def getBenchmarkReport(BenchmarkDict):
+    WorkerList=getBenchmarkWorkerList(SearchWorkerCount)
+    TotalDict={Workers:sum(BenchmarkDict[ProteinName][Workers] for ProteinName in BenchmarkDict) for Workers in WorkerList}
+    LineList=[f'CPUs available: {os.cpu_count()}',
+              'Protein,'+','.join(f'{Workers} worker{"s" if Workers>1 else ""} (s),speedup' for Workers in WorkerList)]
+    for (ProteinName,TimeDict) in list(BenchmarkDict.items())+[("All proteins",TotalDict)]:
+        LineList.append(ProteinName+','+','.join(f'{TimeDict[Workers]:.2f},{TimeDict[1]/max(TimeDict[Workers],1e-9):.2f}' for Workers in WorkerList))
+    return LineList
+
+
+# TRIAGE MODE
+# With --triage, each protein only gets the quantities needed to decide whether a full run is worthwhile, all from
+# single passes over its junction graph: whether any strategy is possible, the best total score and the number of
+# segments of that strategy, and the number of valid strategies. Nothing is enumerated and no per-protein files are
+# written; proteins are shared out between forked worker processes, and the results go into one summary table.
+TriageTasksPerWorker = 16 # Proteins handed to a worker at a time
+
+# This function triages one (ProteinName, ProteinSeq) pair on a worker. The messages of segment scoring are kept as
+# notes instead of being printed, so that the workers do not write over each other
+def triageProtein(ProteinEntry):
+    (ProteinName,ProteinSeq)=ProteinEntry
+    TriageStartTime=time.time()
+    Constraints=getProteinConstraints(ProteinName)
+    MessageStream=io.StringIO()
+    with contextlib.redirect_stdout(MessageStream):
+        (SegmentBorderList,SegmentScoreDict,StartPointDict,StrategiesArePossible)=buildSegments(ProteinSeq,Constraints)
+        (SegsToEndDict,StrategiesArePossible)=pruneToConstraints(StartPointDict,len(ProteinSeq),Constraints,StrategiesArePossible)
+    TriageEntry={"protein":ProteinName,"length":len(ProteinSeq),"segments":len(SegmentScoreDict),"strategiespossible":StrategiesArePossible,
+                 "bestscore":None,"bestsegments":None,"bestjunctions":None,"strategies":0,
+                 "notes":[Line for Line in MessageStream.getvalue().splitlines() if Line.startswith(("NO POSSIBLE STRATEGIES","WARNING"))]}
+    if StrategiesArePossible==True:
+        (PrefixDict,CompletionDict)=getNodeScoreBounds(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints)
+        BestStrategy=getBestStrategy(PrefixDict,CompletionDict,len(ProteinSeq))
+        if BestStrategy!=None:
+            TriageEntry.update({"bestscore":scoreStrategy(BestStrategy,SegmentScoreDict)["total"],"bestsegments":len(BestStrategy)-1,
+                                "bestjunctions":';'.join(f'{ProteinSeq[Junction]}{Junction+1}' for Junction in BestStrategy[1:-1])})
+        TriageEntry["strategies"]=getStrategyWeights(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints)[0].get((0,0),0)
+    TriageEntry["runtime"]=time.time()-TriageStartTime
+    return TriageEntry
+
+# This function gives the lines of the triage summary table
+def formatTriageLines(TriageList):
+    LineList=['Protein,Length (aa),Valid Segments,Strategies Possible?,Best Score,Segments in Best Strategy,Valid Strategies,Junctions of Best Strategy,Seconds,Notes\n']
+    for TriageEntry in TriageList:
+        PossibleText="Yes" if TriageEntry["strategiespossible"]==True and TriageEntry["strategies"]>0 else "No"
+        BestText="n/a,n/a" if TriageEntry["bestscore"]==None else f'{TriageEntry["bestscore"]},{TriageEntry["bestsegments"]}'
+        NoteText=' / '.join(TriageEntry["notes"]).replace(',',';')
+        LineList.append(f'{TriageEntry["protein"]},{TriageEntry["length"]},{TriageEntry["segments"]},{PossibleText},{BestText},{TriageEntry["strategies"]},'
+                        f'{TriageEntry["bestjunctions"] or ""},{TriageEntry["runtime"]:.3f},{NoteText}\n')
+    return LineList
+
+
+# SERVICE MODE
+# With --serve and/or --watch, Aligator keeps running and takes one protein per job, so that Python startup, imports and
+# segment scoring are not paid for on every submission. Jobs are queued and run on a pool of worker processes forked
+# from the service, which keep the segment tables of recent sequences warm between jobs.
+ServiceCacheSize = 256 # Number of segment tables each worker keeps warm
+ServiceJobHistory = 1000 # Number of finished jobs (and latencies) kept for status requests and metrics
+ServiceWatchInterval = 2 # Seconds between checks of the watch folder
+ServiceResultsFolder = "Service Results"
+ServiceParameterKeys = ("maxstrategies","maxseglen","hhflag","weights","constraints")
+ServiceConstraintKeys = ("required","forbidden","forbiddensegs","minsegs","maxsegs","windows") # Same order as the Strategy Constraints sheet
+ServiceSegmentCache = {} # (sequence, segment settings) : (SegmentScoreDict, StartPointDict, StrategiesArePossible)
+ServiceBaseSettings = {} # Settings the service was started with; every job starts from these
+
+# This function reads a single FASTA record from text
+# Returns the first word of the description line, the sequence, and an error message (None if the record is valid)
+def parseFastaText(FastaText):
+    LineList=FastaText.strip().splitlines()
+    if len(LineList)<2 or not LineList[0].startswith(">"):
+        return "","","not in proper fasta format (a single > description line, followed by the amino acid sequence)"
+    Description=LineList[0][1:].split()
+    ProteinSeq="".join(LineList[1:]).replace(" ","").replace("\t","").replace("\r","").upper()
+    if ">" in ProteinSeq:
+        return "","","more than 1 fasta sequence was found"
+    if Description==[]:
+        Description=[""]
+    return Description[0],ProteinSeq,None
+
+# This function checks a job request (a dictionary read from JSON) and converts it into a job for the worker pool
+# Returns the job and a list of error messages (empty if the request is valid)
+def validateServiceJob(Request,DefaultName):
+    ErrorList=[]
+    if not isinstance(Request,dict):
+        return None,["the job must be a JSON object"]
+    ProteinName=Request.get("name")
+    ProteinSeq=Request.get("sequence")
+    if "fasta" in Request:
+        (FastaName,ProteinSeq,FastaError)=parseFastaText(str(Request["fasta"]))
+        if FastaError!=None:
+            ErrorList.append(FastaError)
+        if ProteinName==None and FastaName!="":
+            ProteinName=FastaName
+    if not isinstance(ProteinSeq,str) or ProteinSeq=="":
+        if not "fasta" in Request:
+            ErrorList.append('the job needs a "sequence" or "fasta" entry')
+    else:
+        ProteinSeq=ProteinSeq.replace(" ","").replace("\n","").replace("\r","").replace("\t","").upper()
+        if not ProteinSeq.isalpha():
+            ErrorList.append("the sequence may only contain amino acid letters")
+    if ProteinName==None or str(ProteinName).strip()=="":
+        ProteinName=DefaultName
+    ProteinName=str(ProteinName).strip()
+    Parameters=Request.get("parameters",{})
+    if not isinstance(Parameters,dict):
+        return None,ErrorList+['"parameters" must be a JSON object']
+    for Key in Parameters:
+        if not Key in ServiceParameterKeys:
+            ErrorList.append(f'"{Key}" is not a parameter (choose from {", ".join(ServiceParameterKeys)})')
+    Job={"name":ProteinName,"sequence":ProteinSeq,"maxstrategies":MaxStrategies,"maxseglen":ServiceBaseSettings["MaxSegLen"],"hhflag":ServiceBaseSettings["HHFlag"],
+         "weights":{},"constraints":None,"write":Request.get("write",False)==True}
+    for (Key,Minimum) in (("maxstrategies",1),("maxseglen",MinSegLen)):
+        if Key in Parameters:
+            if type(Parameters[Key])!=int or Parameters[Key]<Minimum:
+                ErrorList.append(f'"{Key}" must be a whole number of at least {Minimum}')
+            else:
+                Job[Key]=Parameters[Key]
+    if "hhflag" in Parameters:
+        if type(Parameters["hhflag"])!=bool:
+            ErrorList.append('"hhflag" must be true or false')
+        else:
+            Job["hhflag"]=Parameters["hhflag"]
+    Weights=Parameters.get("weights",{})
+    if not isinstance(Weights,dict):
+        ErrorList.append('"weights" must be a JSON object')
+        Weights={}
+    for Key in Weights:
+        if not Key in ServiceBaseSettings["ScoringWeights"]:
+            ErrorList.append(f'"{Key}" is not a scoring weight (choose from {", ".join(ServiceBaseSettings["ScoringWeights"])})')
+        elif type(Weights[Key]) not in (int,float):
+            ErrorList.append(f'the scoring weight "{Key}" must be a number')
+        else:
+            Job["weights"][Key]=Weights[Key]
+    # Constraints use the same text entries as the Strategy Constraints sheet
+    ConstraintRequest=Parameters.get("constraints",{})
+    if not isinstance(ConstraintRequest,dict):
+        ErrorList.append('"constraints" must be a JSON object')
+        ConstraintRequest={}
+    for Key in ConstraintRequest:
+        if not Key in ServiceConstraintKeys:
+            ErrorList.append(f'"{Key}" is not a constraint (choose from {", ".join(ServiceConstraintKeys)})')
+    if len(ConstraintRequest)>0:
+        Row=[ProteinName]+[ConstraintRequest.get(Key) for Key in ServiceConstraintKeys]
+        (ConstraintDict,ConstraintErrorList)=parseConstraintRows([Row])
+        ErrorList+=ConstraintErrorList
+        if isinstance(ProteinSeq,str):
+            ErrorList+=getConstraintResidueErrors(ProteinName,ProteinSeq,ConstraintDict[ProteinName])
+        if len(describeConstraints(ConstraintDict[ProteinName]))>0:
+            Job["constraints"]=ConstraintDict[ProteinName]
+    return Job,ErrorList
+
+# This function runs one job in a worker process, giving the exact top strategies and the segment table of the protein
+def runServiceJob(Job):
+    global ScoringWeights,MaxSegLen,HHFlag,SegmentScoreDict
+    JobStartTime=time.time()
+    # Every job starts from the settings the service was started with
+    ScoringWeights=dict(ServiceBaseSettings["ScoringWeights"])
+    ScoringWeights.update(Job["weights"])
+    MaxSegLen=Job["maxseglen"]
+    HHFlag=Job["hhflag"]
+    ProteinSeq=Job["sequence"]
+    Constraints=Job["constraints"]
+
+    # Segments only depend on the sequence, the segment settings and the junction/segment constraints; cached segments
+    # are rescored with this job's weights
+    CacheKey=(ProteinSeq,MaxSegLen,HHFlag)
+    if Constraints!=None:
+        CacheKey+=(tuple(sorted(Constraints["required"])),tuple(sorted(Constraints["forbidden"])),tuple(sorted(Constraints["forbiddensegs"])),Constraints["lenwindow"])
+    if CacheKey in ServiceSegmentCache:
+        CacheStatus="hit"
+        (SegmentScoreDict,CachedStartPointDict,StrategiesArePossible)=ServiceSegmentCache.pop(CacheKey)
+        for SegmentKey in SegmentScoreDict:
+            applySegmentWeights(SegmentScoreDict[SegmentKey])
+    else:
+        CacheStatus="miss"
+        (SegmentBorderList,SegmentScoreDict,CachedStartPointDict,StrategiesArePossible)=buildSegments(ProteinSeq,Constraints)
+        if len(ServiceSegmentCache)>=ServiceCacheSize:
+            del ServiceSegmentCache[next(iter(ServiceSegmentCache))]
+    # Most recently used tables are kept last, so the oldest are dropped first
+    ServiceSegmentCache[CacheKey]=(SegmentScoreDict,CachedStartPointDict,StrategiesArePossible)
+
+    StartPointDict={LeftIndex:list(CachedStartPointDict[LeftIndex]) for LeftIndex in CachedStartPointDict}
+    (SegsToEndDict,StrategiesArePossible)=pruneToConstraints(StartPointDict,len(ProteinSeq),Constraints,StrategiesArePossible)
+    TopStrategyList=[]
+    if StrategiesArePossible==True:
+        TopStrategyList=getTopStrategies(StartPointDict,SegmentScoreDict,len(ProteinSeq),Job["maxstrategies"],Constraints)
+
+    StrategyList=[]
+    for (Rank,Strategy) in enumerate(TopStrategyList,start=1):
+        Scores=scoreStrategy(Strategy)
+        StrategyList.append({"rank":Rank,"total":Scores["total"],"thioester":Scores["thioester"],"solubility":Scores["solubility"],
+                             "length":Scores["length"],"thiol":Scores["thiol"],"ligations":Scores["ligations"],
+                             "junctions":[Junction+1 for Junction in Strategy[1:-1]], # Residue numbers of the thiols
+                             "segments":[ProteinSeq[Strategy[i]:Strategy[i+1]] for i in range(0,len(Strategy)-1)]})
+        # Extra scoring terms are only reported when the service uses them
+        if len(ScoringTermList)>0:
+            StrategyList[-1]["terms"]=Scores["terms"]
+    SegmentList=[]
+    for (FirstAA,LastAA) in sorted(SegmentScoreDict):
+        SegmentEntry=SegmentScoreDict[(FirstAA,LastAA)]
+        SegmentList.append({"first":FirstAA+1,"last":LastAA,"sequence":SegmentEntry["seq"],"averagesolubility":SegmentEntry["avgsolubility"],
+                            "solubility":SegmentEntry["solubility"],"helpinghand":SegmentEntry["HH"],"thioester":SegmentEntry["thioester"],
+                            "length":SegmentEntry["length"],"thiol":SegmentEntry["thiol"],"total":SegmentEntry["total"]})
+        if len(ScoringTermList)>0:
+            SegmentList[-1]["terms"]=SegmentEntry["termscores"]
+    ConstraintList=[]
+    if Constraints!=None:
+        ConstraintList=describeConstraints(Constraints)
+    return {"protein":Job["name"],"length":len(ProteinSeq),"strategiespossible":StrategiesArePossible,"constraints":ConstraintList,
+            "strategies":StrategyList,"segments":SegmentList,"segmentcache":CacheStatus,"worker":os.getpid(),
+            "runtime":time.time()-JobStartTime}
+
+# This function gives the count, mean, median, 95th percentile and maximum of a list of latencies (in seconds)
+def summarizeLatencies(LatencyList):
+    if len(LatencyList)==0:
+        return None
+    SortedList=sorted(LatencyList)
+    return {"count":len(SortedList),"mean":sum(SortedList)/len(SortedList),"p50":SortedList[len(SortedList)//2],
+            "p95":SortedList[min(len(SortedList)-1,int(len(SortedList)*0.95))],"max":SortedList[-1]}
+
+# This function gives the queue depth, job counts and latencies of the service
+def getServiceMetrics(Service):
+    return {"queuedepth":Service["queue"].qsize(),"running":Service["running"],"completed":Service["completed"],"failed":Service["failed"],
+            "workers":Service["workers"],"pool":"broken" if isServicePoolBroken(Service)==True else "running","poolrestarts":Service["poolrestarts"],
+            "uptime":time.time()-Service["started"],
+            "segmentcache":{"hits":Service["cachehits"],"misses":Service["cachemisses"]},
+            "latency":{"queuewait":summarizeLatencies(Service["queuewait"]),"run":summarizeLatencies(Service["runtime"]),
+                       "total":summarizeLatencies(Service["totaltime"])}}
+
+# This function queues a job, returning its entry in the job list (the entry's future gives the result when done)
+def submitServiceJob(Service,Job):
+    JobID=str(Service["nextid"])
+    Service["nextid"]+=1
+    JobEntry={"id":JobID,"job":Job,"status":"queued","submitted":time.time(),"result":None,
+              "future":asyncio.get_running_loop().create_future()}
+    Service["jobs"][JobID]=JobEntry
+    # Forget the oldest finished jobs
+    while len(Service["jobs"])>ServiceJobHistory:
+        OldestID=next((ID for ID in Service["jobs"] if Service["jobs"][ID]["status"] in ("done","failed")),None)
+        if OldestID==None:
+            break
+        del Service["jobs"][OldestID]
+    Service["queue"].put_nowait(JobEntry)
+    return JobEntry
+
+# This function sets up the signals of a service worker process. Workers are forked from the running service, so they
+# would otherwise share its signal handlers, and a worker stopped by the pool would stop the service as well
+def initServiceWorker():
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM,signal.SIG_DFL)
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+
+# This function starts the worker pool of the service. Workers are forked so that they share the settings loaded so far;
+# where forking is not available, jobs run one at a time on a thread of this process instead
+def startServicePool(Service):
+    if "fork" in multiprocessing.get_all_start_methods():
+        Service["pool"]=concurrent.futures.ProcessPoolExecutor(max_workers=Service["workers"],mp_context=multiprocessing.get_context("fork"),
+                                                               initializer=initServiceWorker)
+    else:
+        Service["workers"]=1
+        Service["pool"]=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+# This function checks whether the worker pool is broken: a worker process that dies (killed, or out of memory) breaks
+# the whole pool, which is only started again when the next job finds it broken
+def isServicePoolBroken(Service):
+    return getattr(Service["pool"],"_broken",False)!=False
+
+# This function runs a job on the worker pool. If the pool is broken, or breaks while the job runs, a new pool is started
+# and the job is tried once more; a job that breaks the new pool as well (such as one that runs out of memory by itself)
+# fails on its own, and the pool is started again for the next job
+async def runPoolJob(Service,Job):
+    for Attempt in range(0,2):
+        Pool=Service["pool"]
+        try:
+            return await asyncio.get_running_loop().run_in_executor(Pool,runServiceJob,Job)
+        except concurrent.futures.BrokenExecutor:
+            # Only the first job to find this pool broken starts a new one
+            if Service["pool"] is Pool:
+                print("A worker process stopped unexpectedly; starting a new worker pool")
+                Pool.shutdown(wait=False,cancel_futures=True)
+                startServicePool(Service)
+                Service["poolrestarts"]+=1
+            if Attempt==1:
+                raise
+
+# This function takes jobs from the queue one at a time and runs them on the worker pool
+async def serviceWorker(Service):
+    while True:
+        JobEntry=await Service["queue"].get()
+        JobEntry["status"]="running"
+        StartTime=time.time()
+        Service["running"]+=1
+        try:
+            Result=await runPoolJob(Service,JobEntry["job"])
+            JobEntry["status"]="done"
+            Service["completed"]+=1
+            if Result["segmentcache"]=="hit":
+                Service["cachehits"]+=1
+            else:
+                Service["cachemisses"]+=1
+        except Exception as Error:
+            Result={"protein":JobEntry["job"]["name"],"error":f'{type(Error).__name__}: {Error}'}
+            JobEntry["status"]="failed"
+            Service["failed"]+=1
+        Service["running"]-=1
+        FinishTime=time.time()
+        Service["queuewait"].append(StartTime-JobEntry["submitted"])
+        Service["runtime"].append(FinishTime-StartTime)
+        Service["totaltime"].append(FinishTime-JobEntry["submitted"])
+        Result.update({"job":JobEntry["id"],"status":JobEntry["status"],
+                       "timing":{"queuewait":StartTime-JobEntry["submitted"],"run":FinishTime-StartTime,"total":FinishTime-JobEntry["submitted"]}})
+        # Save the result to the output folder if asked to (always for jobs from the watch folder); a result that cannot
+        # be saved fails the job, and the job is always finished so that this worker goes on to the next one
+        try:
+            if JobEntry["job"]["write"]==True:
+                SafeName=re.sub(r'[^\w\-. ]','_',JobEntry["job"]["name"])
+                ResultFilepath=f'{OutputFolder}/{ServiceResultsFolder}/{JobEntry["id"]} {SafeName}.json'
+                Result.update({"file":ResultFilepath})
+                with open(ResultFilepath,'w') as f:
+                    json.dump(Result,f,indent=1)
+        except (OSError,TypeError,ValueError) as Error:
+            if JobEntry["status"]=="done":
+                Service["completed"]-=1
+                Service["failed"]+=1
+            JobEntry["status"]="failed"
+            Result.pop("file",None)
+            Result.update({"status":"failed","error":f'could not save the result ({type(Error).__name__}: {Error})'})
+        finally:
+            print(f'Job {JobEntry["id"]} ({JobEntry["job"]["name"]}) {JobEntry["status"]} in {round(FinishTime-JobEntry["submitted"],3)} seconds; {Service["queue"].qsize()} jobs waiting')
+            JobEntry["result"]=Result
+            JobEntry["future"].set_result(Result)
+
+# This function answers one HTTP request:
+#   POST /jobs          submit a job (JSON); waits for the result unless ?wait=0 is added, in which case the job number is returned
+#   GET  /jobs/<number> status (and result, when finished) of a job
+#   GET  /metrics       queue depth, job counts and latencies
+#   GET  /health        checks that the service is running, and that its worker pool is not broken
+async def routeServiceRequest(Service,Method,Target,Body):
+    (Path,Separator,Query)=Target.partition("?")
+    Path=Path.rstrip("/")
+    if Method=="GET" and Path=="/health":
+        if isServicePoolBroken(Service)==True:
+            return 503,{"status":"broken","error":"a worker process stopped; the worker pool is started again with the next job","poolrestarts":Service["poolrestarts"]}
+        return 200,{"status":"ok","poolrestarts":Service["poolrestarts"]}
+    if Method=="GET" and Path=="/metrics":
+        return 200,getServiceMetrics(Service)
+    if Method=="GET" and Path.startswith("/jobs/"):
+        JobID=Path[len("/jobs/"):]
+        if not JobID in Service["jobs"]:
+            return 404,{"error":f'job {JobID} was not found'}
+        JobEntry=Service["jobs"][JobID]
+        if JobEntry["result"]!=None:
+            return 200,JobEntry["result"]
+        return 200,{"job":JobID,"status":JobEntry["status"],"queuedepth":Service["queue"].qsize()}
+    if Method=="POST" and Path=="/jobs":
+        try:
+            Request=json.loads(Body.decode("utf-8"))
+        except (UnicodeDecodeError,ValueError):
+            return 400,{"error":"the job is not valid JSON"}
+        (Job,ErrorList)=validateServiceJob(Request,f'Job {Service["nextid"]}')
+        if len(ErrorList)>0:
+            return 400,{"error":"; ".join(ErrorList)}
+        JobEntry=submitServiceJob(Service,Job)
+        if "wait=0" in Query.split("&"):
+            return 202,{"job":JobEntry["id"],"status":JobEntry["status"],"queuedepth":Service["queue"].qsize()}
+        Result=await JobEntry["future"]
+        if JobEntry["status"]=="failed":
+            return 500,Result
+        return 200,Result
+    return 404,{"error":f'{Method} {Path} is not available (use POST /jobs, GET /jobs/<number>, GET /metrics or GET /health)'}
+
+# This function reads one HTTP request from a connection and writes the JSON response
+async def handleServiceConnection(Service,reader,writer):
+    try:
+        RequestLine=(await reader.readline()).decode("latin-1").split()
+        HeaderDict={}
+        while True:
+            HeaderLine=(await reader.readline()).decode("latin-1").strip()
+            if HeaderLine=="":
+                break
+            (Key,Separator,Value)=HeaderLine.partition(":")
+            HeaderDict[Key.strip().lower()]=Value.strip()
+        Body=b""
+        if "content-length" in HeaderDict:
+            Body=await reader.readexactly(int(HeaderDict["content-length"]))
+        if len(RequestLine)<2:
+            raise ValueError("no request line")
+        (Status,Response)=await routeServiceRequest(Service,RequestLine[0].upper(),RequestLine[1],Body)
+    except (ValueError,asyncio.IncompleteReadError):
+        (Status,Response)=(400,{"error":"malformed HTTP request"})
+    ResponseBody=json.dumps(Response).encode("utf-8")
+    Reason={200:"OK",202:"Accepted",400:"Bad Request",404:"Not Found",500:"Internal Server Error",503:"Service Unavailable"}[Status]
+    try:
+        writer.write(f'HTTP/1.1 {Status} {Reason}\r\nContent-Type: application/json\r\nContent-Length: {len(ResponseBody)}\r\nConnection: close\r\n\r\n'.encode("latin-1")+ResponseBody)
+        await writer.drain()
+        writer.close()
+    except ConnectionError:
+        pass
+
+# This function moves a watch-folder file to its "Done" or "Failed" sub-folder once its job is finished
+async def finishWatchedFile(JobEntry,Filepath):
+    await JobEntry["future"]
+    SubFolder="Done"
+    if JobEntry["status"]=="failed":
+        SubFolder="Failed"
+    try:
+        os.replace(Filepath,os.path.join(os.path.dirname(os.path.dirname(Filepath)),SubFolder,os.path.basename(Filepath)))
+    except OSError as Error:
+        print(f'Could not move {os.path.basename(Filepath)} to the {SubFolder} folder: {Error}')
+
+# This function moves a watch-folder file that could not be queued to the "Failed" sub-folder, next to a file giving the
+# error; the file is moved from wherever it still is, and a file that cannot be moved is left for the user
+def failWatchedFile(WatchFolder,FilepathList,ErrorText):
+    FileName=os.path.basename(FilepathList[0])
+    print(f'Could not queue {FileName}: {ErrorText}')
+    try:
+        for Filepath in FilepathList:
+            if os.path.isfile(Filepath):
+                os.replace(Filepath,os.path.join(WatchFolder,"Failed",FileName))
+                break
+        with open(os.path.join(WatchFolder,"Failed",f'{FileName} Error.json'),'w') as f:
+            json.dump({"file":FileName,"error":ErrorText},f,indent=1)
+    except OSError as Error:
+        print(f'Could not move {FileName} to the Failed folder: {Error}')
+
+# This function checks the watch folder for new FASTA (.txt/.fasta) or job (.json) files and queues a job for each
+# Files are moved to a "Processing" sub-folder while queued, then to "Done" or "Failed"; results go to the output folder
+# A file that cannot be read or moved fails on its own, so the folder keeps being watched
+async def watchServiceFolder(Service,WatchFolder):
+    for SubFolder in ("Processing","Done","Failed"):
+        os.makedirs(os.path.join(WatchFolder,SubFolder),exist_ok=True)
+    while True:
+        for Filepath in sorted(glob.iglob(os.path.join(glob.escape(WatchFolder),"*")),key=numericalSort):
+            (BaseName,Extension)=os.path.splitext(os.path.basename(Filepath))
+            ProcessingFilepath=os.path.join(WatchFolder,"Processing",os.path.basename(Filepath))
+            try:
+                if not os.path.isfile(Filepath) or not Extension.lower() in (".txt",".fasta",".json"):
+                    continue
+                # Skip files that may still be being written
+                if time.time()-os.path.getmtime(Filepath)<ServiceWatchInterval:
+                    continue
+                if BaseName.lower().endswith(".fasta"):
+                    BaseName=BaseName[:-len(".fasta")]
+                os.replace(Filepath,ProcessingFilepath)
+                with open(ProcessingFilepath,'r') as f:
+                    FileText=f.read()
+                if Extension.lower()==".json":
+                    try:
+                        Request=json.loads(FileText)
+                    except ValueError:
+                        Request=None
+                else:
+                    # FASTA files are named after the file, as in a normal run
+                    Request={"fasta":FileText,"name":BaseName}
+                (Job,ErrorList)=validateServiceJob(Request,BaseName)
+                if Request==None:
+                    ErrorList=["the job file is not valid JSON"]
+            except Exception as Error:
+                # The file may have been removed by another program in the meantime
+                if os.path.isfile(Filepath) or os.path.isfile(ProcessingFilepath):
+                    failWatchedFile(WatchFolder,[ProcessingFilepath,Filepath],f'{type(Error).__name__}: {Error}')
+                continue
+            if len(ErrorList)>0:
+                failWatchedFile(WatchFolder,[ProcessingFilepath],"; ".join(ErrorList))
+                continue
+            Job["write"]=True
+            JobEntry=submitServiceJob(Service,Job)
+            asyncio.get_running_loop().create_task(finishWatchedFile(JobEntry,ProcessingFilepath))
+        await asyncio.sleep(ServiceWatchInterval)
+
+# This function starts the worker pool, the HTTP server and/or the watch folder, and runs until stopped with Ctrl+C
+async def runService():
+    Service={"queue":asyncio.Queue(),"jobs":{},"nextid":1,"running":0,"completed":0,"failed":0,"started":time.time(),
+             "cachehits":0,"cachemisses":0,"workers":WorkerCount,"pool":None,"poolrestarts":0,
+             "queuewait":collections.deque(maxlen=ServiceJobHistory),"runtime":collections.deque(maxlen=ServiceJobHistory),
+             "totaltime":collections.deque(maxlen=ServiceJobHistory)}
+    os.makedirs(f'{OutputFolder}/{ServiceResultsFolder}',exist_ok=True)
+    startServicePool(Service)
+    for i in range(0,Service["workers"]):
+        asyncio.get_running_loop().create_task(serviceWorker(Service))
+    Server=None
+    if ServeSocketPath!=None:
+        Server=await asyncio.start_unix_server(lambda reader,writer:handleServiceConnection(Service,reader,writer),path=ServeSocketPath)
+        print(f'Aligator service listening on Unix socket {ServeSocketPath} with {Service["workers"]} workers')
+    elif ServePort!=None:
+        Server=await asyncio.start_server(lambda reader,writer:handleServiceConnection(Service,reader,writer),host=ServeHost,port=ServePort)
+        print(f'Aligator service listening on http://{ServeHost}:{ServePort} with {Service["workers"]} workers')
+    if WatchFolder!=None:
+        asyncio.get_running_loop().create_task(watchServiceFolder(Service,WatchFolder))
+        print(f'Aligator service watching the "{WatchFolder}" folder with {Service["workers"]} workers')
+    print("Press Ctrl+C to stop the service.")
+    print("")
+    # Ctrl+C (or a termination signal) stops the service; where signal handlers are not available, Ctrl+C is caught
+    # as a KeyboardInterrupt instead
+    StopEvent=asyncio.Event()
+    for Signal in (signal.SIGINT,signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(Signal,StopEvent.set)
+        except (NotImplementedError,RuntimeError):
+            pass
+    try:
+        await StopEvent.wait()
+    finally:
+        if Server!=None:
+            Server.close()
+        Service["pool"].shutdown(wait=False,cancel_futures=True)
+
+
+# EXPORT MODE
+# Writes the Excel view of a results database, without running Aligator
+if ExportDatabasePath!=None:
+    (ExportFilepath,LatestRun,ExportStrategyCount)=exportResultsDatabase(ExportDatabasePath)
+    print(f'Exported "{ExportDatabasePath}" ({ExportStrategyCount} strategies of run {LatestRun}) to "{ExportFilepath}".')
+    sys.exit()
 
 # CREATE RUN INFO FILE
 # Info about the run will periodically be written to this file; do not open or edit this file
 # while Aligator is actively running.
 # To avoid issues with file permissions, if user prompts are enabled then this file is instead
-# opened after all inputs have been accepted.
-if prompt_for_user_inputs==False:
+# opened after all inputs have been accepted (re-rank and resumed runs have no prompts).
+# A resumed run adds to the file of the interrupted run.
+if ResumeFolder!=None:
+    RunInfoFile = open(f"{OutputFolder}/Aligator Run Information.doc", "a")
+elif prompt_for_user_inputs==False or RerankFolder!=None:
     RunInfoFile = open(f"{OutputFolder}/Aligator Run Information.doc", "w")
 
 #USER INPUT PROMPTS
@@ -205,7 +3529,7 @@ if prompt_for_user_inputs==False:
 #strategy predictions, allowing the user to change entries if they were entered
 #incorrectly.
 userInputInfo = False
-while userInputInfo == False and prompt_for_user_inputs == True:
+while userInputInfo == False and prompt_for_user_inputs == True and RerankFolder == None and ResumeFolder == None:
     #The following allows users to characterize thioesters differently than Aligator's default.
     #These statements explain the default thioester characterizations to the user.
     print ("Aligator's default thioester characterization is mainly based on Fmoc hydrazide")
@@ -600,6 +3924,116 @@ while userInputInfo == False and prompt_for_user_inputs == True:
             print ("ERROR! That is not a valid entry. Please enter only numbers!")
             print ("")
 
+    #The following allows the user to restrict the search to strategies that use or avoid
+    #specific ligation junctions, or that have a certain number of segments.
+    print ("Aligator can restrict its search to strategies that use (or avoid) specific")
+    print ("ligation junctions, avoid specific segments, have a minimum or maximum number of")
+    print ("segments, or have segments within a certain length window. The top strategies")
+    print ("reported will then be the best strategies that meet these constraints.")
+    print ("")
+    print ("Would you like to apply strategy constraints? If so, fill in the 'Strategy")
+    print ("Constraints' sheet of the 'Custom Parameters Input' Excel file, and place this")
+    print ("file into the folder containing your FASTA text files.")
+    print ("")
+
+    customConstraintAns = input("Enter 'yes' to apply constraints, or enter 'no' to search all strategies: ")
+    print ("")
+
+    #Searches all strategies, if the user wishes to do so (no constraints if nothing entered).
+    if customConstraintAns == "" or customConstraintAns[0].lower() != "y":
+        StrategyConstraintDict = {}
+
+    #Everything in this 'else' statement attempts to load the constraints in the input file,
+    #and if problems are detected, the user is told about the problem and given a chance to
+    #change the input file appropriately.
+    else:
+        customConstraintEntryCheck = False
+        while customConstraintEntryCheck == False:
+            #Reads every protein's constraints and checks the entries for mistakes (the residues
+            #entered for junctions are checked against the sequences once these are read).
+            StrategyConstraintDict, ConstraintErrorList = readStrategyConstraintsFile()
+            for ConstraintError in ConstraintErrorList:
+                print ("ERROR! " + ConstraintError)
+
+            #Continues the user input options if no errors in the Custom Parameters Input
+            #file have been detected, or allows the user to fix them before continuing.
+            if len(ConstraintErrorList) == 0:
+                customConstraintEntryCheck = True
+            else:
+                print ("Please fix this error in the input file and try again.")
+                print ("")
+                checkpoint = input("Press 'enter' when you have corrected and saved the input file:")
+                print ("")
+
+        print ("Strategy constraints - file successfully read!")
+        print ("")
+
+    #The following allows the user to add extra per-residue scoring terms (such as a
+    #hydrophobicity or aggregation scale) to the score of every segment.
+    print ("Aligator can add extra scoring terms to every segment, each based on a value for")
+    print ("every amino acid (such as the Kyte-Doolittle hydrophobicity scale, or your own")
+    print ("values) and on sequence motifs (such as aspartimide-prone DG). Would you like to")
+    print ("add scoring terms? If so, fill in the 'Scoring Terms' and 'Sequence Motifs' sheets")
+    print ("of the 'Custom Parameters Input' Excel file (terms with a weight of 0 are not used),")
+    print ("and place this file into the folder containing your FASTA text files.")
+    print ("")
+
+    customTermAns = input("Enter 'yes' to add scoring terms, or enter 'no' to use the standard scores: ")
+    print ("")
+
+    #Uses the standard scores only, if the user wishes to do so (no terms if nothing entered).
+    if customTermAns == "" or customTermAns[0].lower() != "y":
+        ScoringTermList = []
+
+    #Everything in this 'else' statement attempts to load the scoring terms in the input file,
+    #and if problems are detected, the user is told about the problem and given a chance to
+    #change the input file appropriately.
+    else:
+        customTermEntryCheck = False
+        while customTermEntryCheck == False:
+            #Checks to make sure the input file is in the working directory.
+            fileExistCheck = False
+            while fileExistCheck == False:
+                try:
+                    customParametersFile = load_workbook(filename = 'Custom Parameters Input.xlsx',
+                    data_only=True)
+                    fileExistCheck = True
+                except IOError:
+                    print ("The 'Custom Parameters Input.xlsx' file is not in the current working")
+                    print ("directory! Please put this file into the folder containing your FASTA")
+                    print ("files and try again!")
+                    print ("")
+                    checkpoint = input("Press 'enter' when the input file is in the folder:")
+                    print ("")
+
+            #Reads every scoring term and checks the entries for mistakes.
+            if "Scoring Terms" in customParametersFile.sheetnames:
+                ScoringTermList, TermErrorList = parseScoringTerms(customParametersFile["Scoring Terms"])
+                #Motifs of the scoring terms are optional.
+                if "Sequence Motifs" in customParametersFile.sheetnames:
+                    TermErrorList += parseSequenceMotifs(customParametersFile["Sequence Motifs"],ScoringTermList,customParametersFile["Scoring Terms"])
+            else:
+                ScoringTermList = []
+                TermErrorList = ["The input file does not have a 'Scoring Terms' sheet."]
+            for TermError in TermErrorList:
+                print ("ERROR! " + TermError)
+            if len(TermErrorList) == 0 and len(ScoringTermList) == 0:
+                print ("ERROR! No scoring terms with a weight other than 0 were found in the 'Scoring Terms' sheet.")
+                TermErrorList.append("Empty sheet")
+
+            #Continues the user input options if no errors in the Custom Parameters Input
+            #file have been detected, or allows the user to fix them before continuing.
+            if len(TermErrorList) == 0:
+                customTermEntryCheck = True
+            else:
+                print ("Please fix this error in the input file and try again.")
+                print ("")
+                checkpoint = input("Press 'enter' when you have corrected and saved the input file:")
+                print ("")
+
+        print ("Scoring terms - file successfully read!")
+        print ("")
+
     #Shows the user what they have chosen and allows them to loop back through the inputs
     #to change any mistakes.
     print ("Here are the inputs that you have entered:")
@@ -646,6 +4080,24 @@ while userInputInfo == False and prompt_for_user_inputs == True:
     print (str(MaxSegLen) + " residues")
     print ("")
 
+    #Prints the strategy constraints for each protein.
+    print ("STRATEGY CONSTRAINTS")
+    if len(StrategyConstraintDict) == 0:
+        print ("None")
+    for ConstraintName in StrategyConstraintDict:
+        print (ConstraintName + ":")
+        for ConstraintLine in describeConstraints(StrategyConstraintDict[ConstraintName]):
+            print ("    " + ConstraintLine)
+    print ("")
+
+    #Prints the extra scoring terms.
+    print ("SCORING TERMS")
+    if len(ScoringTermList) == 0:
+        print ("None")
+    for Term in ScoringTermList:
+        print (describeScoringTerm(Term))
+    print ("")
+
 
     #Allows the user to go back and change their inputs, if desired (goes on if nothing entered).
     continueAns = input("Enter 'yes' to continue with these parameters. Enter 'no' to re-enter them: ")
@@ -681,6 +4133,20 @@ while userInputInfo == False and prompt_for_user_inputs == True:
         RunInfoFile.write("MAXIMUM SEGMENT LENGTH ALLOWED:\n")
         RunInfoFile.write(str(MaxSegLen)+" residues\n")
         RunInfoFile.write("\n")
+        RunInfoFile.write("STRATEGY CONSTRAINTS:\n")
+        if len(StrategyConstraintDict) == 0:
+            RunInfoFile.write("None\n")
+        for ConstraintName in StrategyConstraintDict:
+            RunInfoFile.write(ConstraintName+":\n")
+            for ConstraintLine in describeConstraints(StrategyConstraintDict[ConstraintName]):
+                RunInfoFile.write("    "+ConstraintLine+"\n")
+        RunInfoFile.write("\n")
+        RunInfoFile.write("SCORING TERMS:\n")
+        if len(ScoringTermList) == 0:
+            RunInfoFile.write("None\n")
+        for Term in ScoringTermList:
+            RunInfoFile.write(describeScoringTerm(Term)+"\n")
+        RunInfoFile.write("\n")
 
     else:
         userInputInfo = False
@@ -688,7 +4154,7 @@ while userInputInfo == False and prompt_for_user_inputs == True:
 
 # Developer mode only; if this toggle is False, the prompts above will be ignored
 # and instead the following default values will be used:
-if not prompt_for_user_inputs:
+if not prompt_for_user_inputs and RerankFolder==None and ResumeFolder==None:
     PreferredTEList = ["A", "C", "F", "G", "H", "M", "R", "S", "W", "Y"]
     AcceptedTEList = ["I", "K", "L", "T", "V"]
     ForbidTEList = ["D", "E", "N", "P", "Q"]
@@ -698,6 +4164,11 @@ if not prompt_for_user_inputs:
     MaxSegLen=60
     HHFlag=True
     SolubilizingTagList=['K','E']
+    StrategyConstraintDict={}
+    # Extra scoring terms can be added here, e.g. a penalty for segments with an average hydrophobicity above 0:
+    # addScoringTerm("Kyte-Doolittle hydrophobicity",KyteDoolittleScale,"excess",-2,0)
+    # or a penalty for synthesis hazards found by motif:
+    # addScoringTerm("Synthesis hazards",{},"sum",1,0,{"DG":-2,"DS":-1,"DN":-1,"[VIT][VIT][VIT]":-1})
     # Write to Run Info file; it's not as nicely formatted, but that's what you get
     # for being a developer.
     RunInfoFile.write('NO USER INPUTS, DEFAULT VALUES USED\n')
@@ -710,8 +4181,124 @@ if not prompt_for_user_inputs:
     RunInfoFile.write(f'MaxSegLen = {MaxSegLen}\n')
     RunInfoFile.write(f'HHFlag = {HHFlag}\n')
     RunInfoFile.write(f'SolubilizingTagList = {SolubilizingTagList}\n')
+    RunInfoFile.write(f'StrategyConstraintDict = {StrategyConstraintDict}\n')
+    RunInfoFile.write(f'ScoringTermList = {[describeScoringTerm(Term) for Term in ScoringTermList]}\n')
     RunInfoFile.write(f'\n')
 
+# RE-RANK MODE
+# The settings of the previous run come from its cached segment tables, so the prompts above are skipped; only
+# the new scoring weights are read, from the "Scoring Weights" sheet of the Custom Parameters Input file.
+SegmentTableDict={}
+if RerankFolder!=None:
+    SegmentTableFileList=sorted(glob.iglob(f'{glob.escape(RerankFolder)}/{SegmentTablesFolder}/* Segment Table.json'), key=numericalSort)
+    if len(SegmentTableFileList)==0:
+        print(f'ERROR! No segment tables were found in the "{RerankFolder}/{SegmentTablesFolder}" folder.')
+        print("Please check that this is the output folder of a previous Aligator run.")
+        print("Aligator terminated!")
+        print("")
+        sys.exit()
+
+    #Loads the new weights, and if problems are detected, the user is told about the problem and
+    #given a chance to change the input file appropriately. A resumed run keeps the weights it was
+    #started with instead.
+    NewScoringWeights = ScoringWeights
+    customWeightEntryCheck = ResumeFolder!=None
+    while customWeightEntryCheck == False:
+        #Checks to make sure the input file is in the working directory.
+        fileExistCheck = False
+        while fileExistCheck == False:
+            try:
+                customParametersFile = load_workbook(filename = 'Custom Parameters Input.xlsx',
+                data_only=True)
+                fileExistCheck = True
+            except IOError:
+                print ("The 'Custom Parameters Input.xlsx' file is not in the current working")
+                print ("directory! Please put this file into the current folder and try again!")
+                print ("")
+                checkpoint = input("Press 'enter' when the input file is in the folder:")
+                print ("")
+
+        if "Scoring Weights" in customParametersFile.sheetnames:
+            NewScoringWeights, WeightErrorList = parseScoringWeights(customParametersFile["Scoring Weights"])
+        else:
+            WeightErrorList = ["The input file does not have a 'Scoring Weights' sheet."]
+        for WeightError in WeightErrorList:
+            print ("ERROR! " + WeightError)
+
+        #Continues if no errors in the Custom Parameters Input file have been detected, or allows
+        #the user to fix them before continuing.
+        if len(WeightErrorList) == 0:
+            customWeightEntryCheck = True
+        else:
+            print ("Please fix this error in the input file and try again.")
+            print ("")
+            checkpoint = input("Press 'enter' when you have corrected and saved the input file:")
+            print ("")
+    ScoringWeights = NewScoringWeights
+
+    #Loads the cached segment table of each protein.
+    for Filename in SegmentTableFileList:
+        with open(Filename,'r') as f:
+            SegmentTable = json.load(f)
+        SegmentTableDict[SegmentTable["protein"]] = SegmentTable
+
+    #Settings used by the previous run.
+    FirstSegmentTable = SegmentTableDict[list(SegmentTableDict)[0]]
+    HHFlag = FirstSegmentTable["HHFlag"]
+    SolubilizingTagList = FirstSegmentTable["SolubilizingTagList"]
+    ScoringTermList = FirstSegmentTable.get("ScoringTermList",[])
+    MaxSegLen = FirstSegmentTable["MaxSegLen"]
+    StrategyConstraintDict = {}
+
+    print ("Re-ranking the strategies of " + RerankFolder + " with these scoring weights:")
+    for (Key,Cell) in ScoringWeightCells:
+        print (f'{Key} = {ScoringWeights[Key]} (previously {FirstSegmentTable["ScoringWeights"][Key]})')
+    print ("")
+
+    if ResumeFolder==None:
+        RunInfoFile.write("Aligator Run Information for "+folder+"\n")
+        RunInfoFile.write("\n")
+        RunInfoFile.write("Aligator Initiated on "+timestamp+"\n")
+        RunInfoFile.write("\n")
+        RunInfoFile.write("RE-RANK OF PREVIOUS RUN:\n")
+        RunInfoFile.write(RerankFolder+"\n")
+        RunInfoFile.write("\n")
+        RunInfoFile.write("SCORING WEIGHTS:\n")
+        for (Key,Cell) in ScoringWeightCells:
+            RunInfoFile.write(f'{Key} = {ScoringWeights[Key]}\n')
+        RunInfoFile.write("\n")
+        if len(ScoringTermList)>0:
+            RunInfoFile.write("SCORING TERMS:\n")
+            for Term in ScoringTermList:
+                RunInfoFile.write(describeScoringTerm(Term)+"\n")
+            RunInfoFile.write("\n")
+
+# RESUME MODE
+# A resumed run uses the settings of the interrupted run, as saved in its manifest (constants included, so that its
+# results match the proteins that were already completed)
+ResumeSettingList = ["PreferredTEList","AcceptedTEList","ForbidTEList","GoodThiolList","OKThiolList","PoorThiolList",
+                     "MaxSegLen","HHFlag","SolubilizingTagList","ScoringWeights","ScoringTermList","MinSegLen","MaxStrategies","unrestrained_mode"]
+if ResumeFolder!=None:
+    for SettingName in ResumeSettingList:
+        # Settings added after the interrupted run was made keep their defaults
+        if SettingName in ResumeManifest["settings"]:
+            globals()[SettingName] = ResumeManifest["settings"][SettingName]
+    StrategyConstraintDict = {ConstraintName:constraintsFromJSON(ResumeManifest["constraints"][ConstraintName]) for ConstraintName in ResumeManifest["constraints"]}
+    print ("Resuming the interrupted run in " + ResumeFolder + "; " + str(len(ResumeManifest["proteins"])) + " proteins were already completed.")
+    print ("")
+    RunInfoFile.write("\n")
+    RunInfoFile.write("RUN RESUMED ON " + str(datetime.datetime.now().strftime("%B %d, %Y %I_%M_%S %p")) + "\n")
+    RunInfoFile.write("\n")
+
+# Settings and options of this run, saved in the run manifest (settings that do not apply to this run are None)
+RunSettings = {SettingName:globals().get(SettingName) for SettingName in ResumeSettingList}
+RunSettings["options"] = {Option:getattr(Args,Option) for Option in ResumeOptionList+ResumeFlagList}
+
+# The manifest is saved with the settings before any protein is run, so the run can be resumed from its first protein;
+# a resumed run starts its journal again from the proteins already completed, leaving out any line cut short
+writeRunManifest([])
+startRunJournal(ResumeManifest["proteins"] if ResumeFolder!=None else [])
+
 #The rest of the script actually executes everything!
 #Lets user know that segment predictions have started.
 print ("Aligator will now predict ideal synthesis strategies!")
@@ -720,10 +4307,43 @@ print ("")
 #Records starting time.
 start_time = time.time()
 
+# SERVICE MODE
+# Runs jobs as they are submitted until stopped, instead of the FASTA files in the current folder
+if ServiceMode:
+    ServiceBaseSettings.update({"ScoringWeights":dict(ScoringWeights),"MaxSegLen":MaxSegLen,"HHFlag":HHFlag})
+    report_to_screen=False # Each job is reported in one line instead
+    RunInfoFile.write("SERVICE MODE:\n")
+    if ServeSocketPath!=None:
+        RunInfoFile.write(f"Unix socket {ServeSocketPath}\n")
+    elif ServePort!=None:
+        RunInfoFile.write(f"http://{ServeHost}:{ServePort}\n")
+    if WatchFolder!=None:
+        RunInfoFile.write(f"Watch folder {WatchFolder}\n")
+    RunInfoFile.write("\n")
+    try:
+        asyncio.run(runService())
+    except KeyboardInterrupt:
+        print("")
+    if ServeSocketPath!=None and os.path.exists(ServeSocketPath):
+        os.remove(ServeSocketPath)
+    RunTime = round((time.time() - start_time), 2)
+    RunInfoFile.write("Aligator service ran for "+str(RunTime)+" seconds.")
+    RunInfoFile.close()
+    print ("Aligator service stopped. Saved job results are in the "+timestamp+" folder.")
+    sys.exit()
+
 
 #Loop through each FASTA text file to get a list of valid sequences (with protein names)
+#In re-rank mode, the proteins come from the cached segment tables of the previous run instead
+IngestStartTime = time.time()
 ProteinNameAndSeqList = []
-for Filename in sorted(glob.iglob("*.txt"), key=numericalSort):
+FastaFileList = []
+if RerankFolder==None:
+    FastaFileList = sorted(glob.iglob("*.txt"), key=numericalSort)
+else:
+    for ProteinName in SegmentTableDict:
+        ProteinNameAndSeqList.append((ProteinName,SegmentTableDict[ProteinName]["sequence"]))
+for Filename in FastaFileList:
     # Get protein name
     ProteinName = Filename.rstrip(".txt") #Saves the name of the protein.
     if ProteinName.endswith("fasta"): #Cuts off 'fasta' from the file name, if there.
@@ -775,16 +4395,189 @@ for (ProteinName,ProteinSeq) in ProteinNameAndSeqList:
     print(ProteinName)
 print("")
 
+# Warn the user about any constraints that do not match a protein name
+for ConstraintName in StrategyConstraintDict:
+    if ConstraintName!="ALL" and not ConstraintName in [ProteinName for (ProteinName,ProteinSeq) in ProteinNameAndSeqList]:
+        print(f'WARNING: Strategy constraints were given for "{ConstraintName}", but no FASTA file has this name; these constraints will be ignored.')
+        print("")
+
+# Check the residue entered for each constrained junction against the sequence. Constraints read from the input file
+# can be corrected and read again, as for the other errors in the file; constraints set in the script or restored by
+# --resume stop the run instead.
+ConstraintErrorList = [ConstraintError for (ProteinName,ProteinSeq) in ProteinNameAndSeqList
+                       for ConstraintError in getConstraintResidueErrors(ProteinName,ProteinSeq,getProteinConstraints(ProteinName))]
+while len(ConstraintErrorList) > 0:
+    for ConstraintError in ConstraintErrorList:
+        print ("ERROR! " + ConstraintError)
+    if prompt_for_user_inputs == False or ResumeFolder != None:
+        print ("Aligator terminated!")
+        print ("")
+        sys.exit()
+    print ("Please fix this error in the 'Strategy Constraints' sheet of the input file and try again.")
+    print ("")
+    checkpoint = input("Press 'enter' when you have corrected and saved the input file:")
+    print ("")
+    StrategyConstraintDict, ConstraintErrorList = readStrategyConstraintsFile()
+    if len(ConstraintErrorList) == 0:
+        ConstraintErrorList = [ConstraintError for (ProteinName,ProteinSeq) in ProteinNameAndSeqList
+                               for ConstraintError in getConstraintResidueErrors(ProteinName,ProteinSeq,getProteinConstraints(ProteinName))]
+        # The run info file already lists the constraints as first entered
+        if len(ConstraintErrorList) == 0:
+            print ("Strategy constraints - file successfully read!")
+            print ("")
+            RunInfoFile.write("STRATEGY CONSTRAINTS (CORRECTED):\n")
+            for ConstraintName in StrategyConstraintDict:
+                RunInfoFile.write(ConstraintName+":\n")
+                for ConstraintLine in describeConstraints(StrategyConstraintDict[ConstraintName]):
+                    RunInfoFile.write("    "+ConstraintLine+"\n")
+            RunInfoFile.write("\n")
+
+# TRIAGE MODE
+# Writes one summary table for all proteins instead of running Aligator on each
+if Args.triage==True:
+    TriageWorkers=min(WorkerCount,len(ProteinNameAndSeqList))
+    if not "fork" in multiprocessing.get_all_start_methods():
+        TriageWorkers=1
+    print(f'Triaging {len(ProteinNameAndSeqList)} proteins on {TriageWorkers} worker processes...')
+    TriageList=[]
+    if TriageWorkers>1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=TriageWorkers,mp_context=multiprocessing.get_context("fork"),
+                                                    initializer=signal.signal,initargs=(signal.SIGINT,signal.SIG_IGN)) as TriagePool:
+            ChunkSize=max(1,len(ProteinNameAndSeqList)//(TriageWorkers*TriageTasksPerWorker))
+            for TriageEntry in TriagePool.map(triageProtein,ProteinNameAndSeqList,chunksize=ChunkSize):
+                TriageList.append(TriageEntry)
+    else:
+        for ProteinEntry in ProteinNameAndSeqList:
+            TriageList.append(triageProtein(ProteinEntry))
+    if report_to_screen==True:
+        for TriageEntry in TriageList:
+            print(f'{TriageEntry["protein"]}: '+(f'best score {TriageEntry["bestscore"]} with {TriageEntry["bestsegments"]} segments, {TriageEntry["strategies"]} valid strategies'
+                                                 if TriageEntry["bestscore"]!=None else 'no possible strategies'))
+        print("")
+    TriageFilepath=f'{OutputFolder}/Aligator Triage for {folder}.csv'
+    with open(TriageFilepath,'w') as f:
+        f.write(''.join(formatTriageLines(TriageList)))
+    FeasibleCount=len([TriageEntry for TriageEntry in TriageList if TriageEntry["bestscore"]!=None])
+    RunTime = round((time.time() - start_time), 2)
+    RunInfoFile.write(f"TRIAGE MODE: {FeasibleCount} of {len(TriageList)} proteins have possible strategies (Aligator Triage file)\n")
+    RunInfoFile.write("\n")
+    RunInfoFile.write("Aligator took "+str(RunTime)+" seconds to run.")
+    RunInfoFile.close()
+    print(f'{FeasibleCount} of {len(TriageList)} proteins have possible strategies.')
+    print ("Aligator triage complete! The summary table is in the "+timestamp+" folder.")
+    print ("")
+    print ("Aligator took %s seconds to run." % RunTime)
+    sys.exit()
 
 # Keep track of output csv files made for each protein
 SegFileDict={}
+SensitivityFileDict={}
 LigFileDict={}
 MaxWidthDict={} # Tracks the largest # segments in any output strategy, for Excel formatting
+TimeBudgetDict={} # Proteins that reached the time budget, with the score bound for strategies that were not built
+SampleDict={} # Proteins whose strategies were randomly sampled, with the number of valid strategies sampled from
+ParetoCountDict={} # Number of strategies tied at each point of the Pareto front of each protein
+ParetoFileDict={}
+ParetoMaxWidth=1 # Tracks the largest # segments in any Pareto-optimal strategy, for Excel formatting
+AssemblyFileDict={}
+AssemblyStatsDict={} # Number of strategies of each protein best assembled convergently, and of runs of segments scored
+BoundaryFileDict={}
+BoundaryStatsDict={} # Number of constructs of each protein with strategies, and the best of them (--boundary-scan)
+ManifestList=[] # Summary of each finished protein, saved to the run manifest by the output writer
+SegmentIndex={} # Every segment of the batch, with its solubility scores and its uses in each protein
+BeamDict={} # Beam width used for each protein, and whether its output strategies are proven exact
+DiverseDict={} # Numbers of strategies suppressed and partial strategies pruned as too similar for each protein (--diverse)
+BenchmarkDict={} # Strategy search time of each protein with each number of workers (--benchmark)
+
+# Open the results database (--database); the output writer adds the rows of each protein
+ResultsDatabase=None
+DatabaseRunId=None
+if Args.database!=None:
+    ResultsDatabasePath=Args.database
+    if ResultsDatabasePath=="":
+        ResultsDatabasePath=f'{OutputFolder}/{ResultsDatabaseFilename}'
+    try:
+        ResultsDatabase=openResultsDatabase(ResultsDatabasePath)
+        DatabaseRunId=startDatabaseRun(ResultsDatabase)
+    except (sqlite3.Error,ValueError) as Error:
+        print(f'ERROR: the results database "{ResultsDatabasePath}" cannot be used: {Error}')
+        print ("Aligator terminated!")
+        print ("")
+        sys.exit()
+
+# Start the worker pools of the parallel strategy search; workers are forked before the output writer thread starts
+if SearchWorkerCount>1 and "fork" in multiprocessing.get_all_start_methods():
+    if Args.benchmark==True:
+        startSearchPools(getBenchmarkWorkerList(SearchWorkerCount)[1:])
+    else:
+        startSearchPools([SearchWorkerCount])
+
+# Start the background output writer
+PipelineStats={"ingest":time.time()-IngestStartTime,"scoring":0,"search":0,"pareto":0,"assembly":0,"boundary":0,"computewait":0,"writerwait":0,"write":0,"error":None}
+OutputQueue=queue.Queue(maxsize=output_queue_size)
+OutputWriter=threading.Thread(target=runOutputWriter,args=(OutputQueue,PipelineStats),daemon=True)
+OutputWriter.start()
+
+# Proteins already completed by the interrupted run (resume mode)
+CompletedDict={}
+if ResumeFolder!=None:
+    CompletedDict={ManifestEntry["protein"]:ManifestEntry for ManifestEntry in ResumeManifest["proteins"]}
 
 # Loop through each sequence to generate the required output files: Valid Segments (.csv), Aligator Analysis (.csv), and All Strategies (.txt)
 # After all loops are complete, CSV files of the same type will be merged into a single Excel document and formatted
 for (ProteinName,ProteinSeq) in ProteinNameAndSeqList:
+    # Resume mode - skip proteins the interrupted run completed with the same sequence, constraints and settings
+    ParameterHash=getParameterHash(ProteinName,ProteinSeq)
+    ProteinFileDict={"segments":f'{OutputFolder}/Viable Segment List for {ProteinName}.csv',
+                     "sensitivity":f'{OutputFolder}/Junction Sensitivity for {ProteinName}.csv',
+                     "analysis":f'{OutputFolder}/Aligator Analysis for {ProteinName}.csv'}
+    if ParetoScoreList!=None:
+        ProteinFileDict.update({"pareto":f'{OutputFolder}/Pareto Front for {ProteinName}.csv'})
+    if Args.assembly==True:
+        ProteinFileDict.update({"assembly":f'{OutputFolder}/Assembly Orders for {ProteinName}.csv'})
+    if BoundaryRanges!=None:
+        ProteinFileDict.update({"boundary":f'{OutputFolder}/Boundary Scan for {ProteinName}.csv'})
+    if ProteinName in CompletedDict and CompletedDict[ProteinName]["parameterhash"]==ParameterHash and all(os.path.exists(Filepath) for Filepath in ProteinFileDict.values()):
+        ManifestEntry=CompletedDict[ProteinName]
+        SegFileDict[ProteinName]=ProteinFileDict["segments"]
+        SensitivityFileDict[ProteinName]=ProteinFileDict["sensitivity"]
+        LigFileDict[ProteinName]=ProteinFileDict["analysis"]
+        MaxWidthDict[ProteinName]=ManifestEntry["maxwidth"]
+        if ManifestEntry["timebudgetreached"]==True:
+            TimeBudgetDict[ProteinName]={Key:ManifestEntry[Key] for Key in ("scorebound","optimalitygap","exactranks")}
+        if "validstrategies" in ManifestEntry or "temperature" in ManifestEntry:
+            SampleDict[ProteinName]={Key:ManifestEntry[Key] for Key in ("validstrategies","temperature") if Key in ManifestEntry}
+        if "beam" in ManifestEntry:
+            BeamDict[ProteinName]=ManifestEntry["beam"]
+        if "diverse" in ManifestEntry:
+            DiverseDict[ProteinName]=ManifestEntry["diverse"]
+        if ParetoScoreList!=None:
+            ParetoFileDict[ProteinName]=ProteinFileDict["pareto"]
+            ParetoCountDict[ProteinName]=ManifestEntry["paretoties"]
+            ParetoMaxWidth=max(ParetoMaxWidth,ManifestEntry["paretowidth"])
+        if Args.assembly==True:
+            AssemblyFileDict[ProteinName]=ProteinFileDict["assembly"]
+            AssemblyStatsDict[ProteinName]=ManifestEntry["assembly"]
+        if BoundaryRanges!=None:
+            BoundaryFileDict[ProteinName]=ProteinFileDict["boundary"]
+            BoundaryStatsDict[ProteinName]=ManifestEntry["boundary"]
+        # The segments of skipped proteins are still needed for the reusable segment report; they are read from the
+        # segment table the interrupted run saved (or, without segment tables, scored again)
+        SkippedTableFilepath=f'{OutputFolder}/{SegmentTablesFolder}/{ProteinName} Segment Table.json'
+        if os.path.exists(SkippedTableFilepath):
+            with open(SkippedTableFilepath,'r') as f:
+                indexSegmentTableUses(SegmentIndex,ProteinName,json.load(f))
+        elif RerankFolder==None:
+            indexSegmentUses(SegmentIndex,ProteinName,ProteinSeq,buildSegments(ProteinSeq,getProteinConstraints(ProteinName))[1])
+        else:
+            indexSegmentTableUses(SegmentIndex,ProteinName,SegmentTableDict[ProteinName])
+        queueOutputJob(OutputQueue,PipelineStats,{"manifest":ManifestEntry})
+        print(f'{ProteinName} was already completed by the interrupted run; skipping')
+        print("")
+        continue
     print(f'Now running {ProteinName} ({len(ProteinSeq)} aa)...')
+    ProteinStartTime=time.time()
+    ProfileEntry=startProfilePhase()
 
     # Remember the longest strategy for Excel formatting later; by default this is 1 segment
     MaxWidthSoFar=1
@@ -794,251 +4587,183 @@ for (ProteinName,ProteinSeq) in ProteinNameAndSeqList:
     # Calculate 'ideal' number of segments in a strategy; strategies with more segments than this will be penalized
     # As an example, if this ends up being 6.5 (e.g., a 260-aa protein with ideal segment length of 40), 6-segment and below strategies will be fine, 7+ will be penalized
     # Save as an integer (cutting off the decimal and rounding down) for easier math later
-    IdealSegmentCount = int(len(ProteinSeq)/autoPenaltySegLength)
+    IdealSegmentCount = int(len(ProteinSeq)/ScoringWeights["autoPenaltySegLength"])
 
-    # Determine the index of all valid ligation junctions (i.e., not forbidden thioesters, and more than MinSegLen away from either end)
-    # These will be used to generate all possible segments within the protein
-    SegmentBorderList=[0] # Beginning of protein counts as a segment border
-    ThiolList=GoodThiolList+OKThiolList+PoorThiolList
-    for i,Char in enumerate(ProteinSeq):
-        if Char in ThiolList and MinSegLen<=i<=(len(ProteinSeq)-MinSegLen) and not ProteinSeq[i-1] in ForbidTEList:
-            SegmentBorderList.append(i)
-    # Add a marker for the end of the protein as well
-    SegmentBorderList.append(len(ProteinSeq))
+    if RerankFolder==None:
+        # Get any strategy constraints for this protein (None if unconstrained)
+        Constraints=getProteinConstraints(ProteinName)
+        if Constraints!=None:
+            print('Applying strategy constraints: '+'; '.join(describeConstraints(Constraints)))
 
-    # Determine from this list if any strategies will be possible; if there is a long stretch in between ligation junctions with no valid segments, we cannot make strategies
-    StrategiesArePossible=True
-    LastPosition=0
-    for n in SegmentBorderList:
-        if LastPosition+MaxSegLen<n:
-            StrategiesArePossible=False
-            print(f'NO POSSIBLE STRATEGIES - Large gap between junctions {LastPosition} and {n} ({n-LastPosition}-aa segment)')
-        if LastPosition+MinSegLen<n:
-            LastPosition=n
+        (SegmentBorderList,SegmentScoreDict,StartPointDict,StrategiesArePossible)=buildSegments(ProteinSeq,Constraints)
+    else:
+        # RE-RANK MODE - rescore the cached segment components of the previous run with the new weights
+        (Constraints,SegmentScoreDict,StartPointDict,StrategiesArePossible)=loadSegmentTable(SegmentTableDict[ProteinName])
+        # Junctions without any valid segment are not in the segment table, and can never be used
+        SegmentBorderList=sorted(set(Index for SegmentKey in SegmentScoreDict for Index in SegmentKey)|{0,len(ProteinSeq)})
 
-    if report_to_screen==True:
-        gettime('Scoring all possible segments')
+    gettime(f'Segment scoring complete...found {len(SegmentScoreDict)} valid segments')
+    indexSegmentUses(SegmentIndex,ProteinName,ProteinSeq,SegmentScoreDict)
 
-    # Define all possible segments for the protein, discarding those too small to be considered. If not too large, score and add to dictionary.
-    SegmentScoreDict={} # Only includes valid segments between minimum and maximum length
-    StartPointDict={} # Contains all segments grouped by starting point
-    for i,LeftIndex in enumerate(SegmentBorderList):
-        for RightIndex in SegmentBorderList[i+1:]:
-            Segment=ProteinSeq[LeftIndex:RightIndex]
-            # If segment is an acceptable size, score and add to segment dictionary for later reference
-            if MinSegLen<=len(Segment)<=MaxSegLen:
-                SegmentKey=(LeftIndex,RightIndex)
-                # This is a valid start point; keep track of all segments sharing this start point
-                if not LeftIndex in StartPointDict:
-                    StartPointDict.update({LeftIndex:[]})
-                StartPointDict[LeftIndex].append(RightIndex) # List of right indices of valid segments
-                SegmentScoreDict.update({SegmentKey:{}}) # Key is index borders of segment; value is a sub-dictionary detailing all scores
-                SegmentScoreDict[SegmentKey].update({'seq':Segment}) # Add segment sequence
-
-                #Score based on thioesters in segments.
-                TEScore = 0
-                if RightIndex != len(ProteinSeq): #This causes the C-terminal protein segments to not be counted.
-                    if ProteinSeq[RightIndex-1] in PreferredTEList:
-                        TEScore += 2
-                    elif ProteinSeq[RightIndex-1] in AcceptedTEList:
-                        TEScore += 0
-                SegmentScoreDict[SegmentKey].update({'thioester':TEScore})
-
-                #Creates an average solubility score for each segment.
-                SolubScore = 0
-                HHSite = False
-                for char in Segment:
-                    if char in PosResList:
-                        SolubScore += 1
-                    elif char in ProblematicResList:
-                        SolubScore -= 1
-                    if HHFlag == True and char in SolubilizingTagList:
-                        HHSite = True
-                SegmentScoreDict[SegmentKey].update({'HH':HHSite})
-                #Divide by length to get average
-                AverageSolubScore = (float(SolubScore) / len(Segment))
-                #Scale for scoring segments based on average solubility.
-                #Scores based on average solubility distributions observed for 3 different
-                #protein subsets of the E. coli ribosome.
-                if AverageSolubScore >= meanSolLimit:
-                    FinalSolubScore = 0
-                elif AverageSolubScore < meanSolLimit and AverageSolubScore >= (oneStdDev):
-                    FinalSolubScore = (-1)*((AverageSolubScore - (meanSolLimit)) / ((oneStdDev)-(meanSolLimit)))
-                elif AverageSolubScore < (oneStdDev) and AverageSolubScore >= (twoStdDev):
-                    FinalSolubScore = (-1) + ((-1)*((AverageSolubScore - (oneStdDev)) / ((twoStdDev)-(oneStdDev))))
-                elif AverageSolubScore < (twoStdDev) and AverageSolubScore >= (threeStdDev):
-                    FinalSolubScore = (-2) + ((-1)*((AverageSolubScore - (twoStdDev)) / ((threeStdDev)-(twoStdDev))))
-                elif AverageSolubScore < (threeStdDev):
-                    FinalSolubScore = (-3)
-                # If helping hand reward function is on, negative solubility scores are halved
-                if FinalSolubScore < 0 and HHSite == True and HHFlag == True:
-                    FinalSolubScore = float(FinalSolubScore)/2
-                # Save solubility score to dictionary
-                SegmentScoreDict[SegmentKey].update({'solubility':FinalSolubScore}) # This is actually used for strategy scoring
-                SegmentScoreDict[SegmentKey].update({'avgsolubility':AverageSolubScore}) # Both are reported in Segment Scores output file
-
-                #Score based on length of segment.
-                lenScore = 0
-                if len(Segment) == bestSegmentLen:
-                    lenScore += 2
-                elif len(Segment) < bestSegmentLen:
-                    lenScore += 2 + ((len(Segment) - bestSegmentLen) * 0.1)
-                else:
-                    lenScore += 2 + ((len(Segment) - bestSegmentLen) * -0.1)
-                # Save length score to dictionary
-                SegmentScoreDict[SegmentKey].update({'length':lenScore})
-
-                # Thiol penalty - apply penalty for desulfurization (e.g., Ala), and double penalty for poor kinetics w/desulfurization (e.g., Val)
-                # May be changed in Custom Parameters Input file
-                LigSiteScore = 0
-                if LeftIndex!=0: # This causes the leftmost segment to not be counted
-                    if Segment[0] in OKThiolList:
-                        LigSiteScore-=2
-                    elif Segment[0] in PoorThiolList:
-                        LigSiteScore-=4
-                SegmentScoreDict[SegmentKey].update({'thiol':LigSiteScore})
-
-                # TOTAL SCORE - SUM OF ALL OTHER SCORES
-                TotalScore=TEScore+FinalSolubScore+lenScore+LigSiteScore
-                SegmentScoreDict[SegmentKey].update({'total':TotalScore})
+    # Constructs of a boundary scan end before the C-terminus, so they are scanned over the segments before pruning
+    if BoundaryRanges!=None:
+        BoundaryStartPointDict=dict(StartPointDict)
 
-    gettime(f'Segment scoring complete...found {len(SegmentScoreDict)} valid segments')
+    # Constraint pruning - drop segments that lead to junctions from which the C-terminus can no longer be reached
+    (SegsToEndDict,StrategiesArePossible)=pruneToConstraints(StartPointDict,len(ProteinSeq),Constraints,StrategiesArePossible)
 
-    # Write segment solubility scores to output file
-    OutputFilepath=f'{OutputFolder}/Viable Segment List for {ProteinName}.csv'
-    with open(OutputFilepath,'w') as f:
-        # Write header line
-        f.write(f'First AA,Last AA,Sequence,Average AA Solubility,Final Solubility Score,Solubility Tag Sites ({"/".join(SolubilizingTagList)})?\n')
-        # If no viable segments, write n/a in relevant fields
-        if len(SegmentScoreDict)==0:
-            f.write('n/a,n/a,NO VIABLE SEGMENTS')
-        # Otherwise loop through segments
-        else:
-            for (FirstAA,LastAA) in sorted(SegmentScoreDict.keys()):
-                SegmentKey=(FirstAA,LastAA)
-                # Get text to report for true/false value for helping hand sites
-                HHReportText=""
-                if SegmentScoreDict[SegmentKey]["HH"]==True:
-                    HHReportText="Yes"
-                # Write info about segment to its own line
-                f.write(f'{str(FirstAA+1)},{str(LastAA)},{SegmentScoreDict[SegmentKey]["seq"]},{SegmentScoreDict[SegmentKey]["avgsolubility"]},{SegmentScoreDict[SegmentKey]["solubility"]},{HHReportText}\n')
-
-    # Report success and track for later
-    print('Wrote "Viable Segment List" file')
-    SegFileDict[ProteinName]=OutputFilepath
+    # SEGMENT USAGE - the number of valid strategies using each segment and junction, and their weighted usage, for the
+    # Viable Segment List (counted over all valid strategies, not only those output)
+    UsageMarginals=None
+    if StrategiesArePossible==True:
+        UsageMarginals=getUsageMarginals(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints,Temperature if Temperature!=None else UsageTemperature)
+        if report_to_screen==True:
+            gettime(f'Counted segment and junction usage over {UsageMarginals[0]} valid strategies')
+
+    # JUNCTION SENSITIVITY - the best score with each junction forced and with it forbidden, for the Viable Segment List
+    JunctionSensitivity=None
+    if StrategiesArePossible==True:
+        JunctionSensitivity=getJunctionSensitivity(StartPointDict,SegmentScoreDict,len(ProteinSeq),SegmentBorderList[1:-1],Constraints)
+        if report_to_screen==True:
+            gettime(f'Found the best scores with each of {len(SegmentBorderList)-2} junctions forced and forbidden')
+
+    PipelineStats["scoring"]+=time.time()-ProteinStartTime
+    stopProfilePhase(ProfileEntry,ProteinName,"Segment scoring")
+    SearchStartTime=time.time()
+    ProfileEntry=startProfilePhase()
     print('-----------------')
 
-    # 'Unrestrained' mode - temporarily set the Max Strategies to a ridiculously high number; but continue to trim the Excel output file
+    # 'Unrestrained' mode - set the per-endpoint strategy limit to a ridiculously high number; but continue to trim the Excel output file
     # Only recommended for development purposes
+    # The beam width (per-endpoint strategy limit) is the maximum number of strategies output, unless set with --beam
+    StrategyLimit=MaxStrategies
+    if BeamWidth!=None:
+        StrategyLimit=BeamWidth
+    elif BeamAuto==True:
+        StrategyLimit=max(1,int(MaxStrategies*AutoBeamFraction))
     if unrestrained_mode==True:
-        OldMaxStrategies=MaxStrategies
-        MaxStrategies=1000000000000000000000000000000000
+        StrategyLimit=1000000000000000000000000000000000
 
     # Begin creating strategies, resulting in final sorted list which will be written to file
     if StrategiesArePossible==True:
-        print('Now creating strategies....')
-
-        # Create the starting list of segments to begin processing all possible strategies
-        StrategyQueue = []
-        FinalStrategyList = []
-        for r in StartPointDict[0]:
-            Strategy = (0,r) # Single-segment strategy looks the same as a single segment
-            StrategyQueue.append(Strategy)
-
-        if report_to_screen==True:
-            print(f'Found {len(StrategyQueue)} starting segments')
-
-        # For printing to screen
-        loopcount=0
-
-        # MAIN LOOP OF BUILDING STRATEGIES
-        while len(StrategyQueue)>0:
-            loopcount+=1
-            if report_to_screen==True:
-                gettime(f'-------\nRanking {loopcount+1}-segment strategies...\n')
-            # Copy and clear queue
-            PrevQueue=StrategyQueue[:]
-            report_inputstrats=len(PrevQueue)
-            StrategyQueue=[]
-            NextQueue=[]
-            # Loop through copied list to generate all strategies with 1 additional segment
-            report_finalstrats=0
-            for Strategy in PrevQueue:
-                LastAA=Strategy[-1]
-                # If this strategy is complete (ends at the final AA), add it to our final output list
-                if LastAA==len(ProteinSeq):
-                    FinalStrategyList.append(Strategy)
-                    report_finalstrats=len(FinalStrategyList)
-                # If the strategy is incomplete, generate the list of next strategies by adding 1 additional segment
-                elif LastAA in StartPointDict:
-                    NextEndPoints=StartPointDict[LastAA]
-                    for EndPoint in NextEndPoints:
-                        NextStrategy=list(Strategy)+[EndPoint] # Convert to list of numbers and add next number
-                        NextStrategy=tuple(NextStrategy) # Convert back to tuple
-                        NextQueue.append(NextStrategy)
-
-            # Done adding strategies to queue; verbose printout for debugging
-            # if report_to_screen==True:
-                # print(f'Detected {report_finalstrats} complete strategies (total {len(FinalStrategyList)} so far), {report_inputstrats-report_finalstrats} partial')
-                # print(f'Partial list expanded to {len(NextQueue)} next strategies')
-            report_newstratsfound=len(NextQueue)
-
-
-            # SORT AND TRIM PARTIAL STRATEGIES
-            # Verbose printout for debugging
-            # if report_to_screen==True:
-            #         print(f'Performing dead-end elimination... (<={MaxStrategies} strategies per endpoint)')
-            # Partial strategy scores can only be directly compared if they represent the same slice of the protein; in other words, if they share a start and endpoint
-            # Since all partial strategies share the same start point (0), group these by endpoint
-            PartialStrategiesByEndPoint={}
-            for Strategy in NextQueue:
-                EndPoint=Strategy[-1]
-                if not EndPoint in PartialStrategiesByEndPoint:
-                    PartialStrategiesByEndPoint.update({EndPoint:[]}) # First time we encounter a number, add a blank entry
-                PartialStrategiesByEndPoint[EndPoint].append(Strategy) # Save each strategy with its endpoint
-
-            # Dead-end elimination; trim each sub-list to the top 1000
-            for EndPoint in PartialStrategiesByEndPoint:
-                StrategyList=PartialStrategiesByEndPoint[EndPoint]
-                # print(f'EndPoint {EndPoint}: {len(StrategyList)} Strategies')
-                # If this list is greater than 1000, sort and trim to the top 1000
-                if len(StrategyList)>MaxStrategies:
-                    StrategyList.sort(key=lambda Strategy:scoreStrategy(Strategy)["total"],reverse=True) # Reverse order = higher scores first
-                    StrategyList=StrategyList[0:MaxStrategies]
-
-                # Pass group of strategies back to queue after trimming (or not trimming)
-                for Strategy in StrategyList:
-                    StrategyQueue.append(Strategy)
-
-            # Report some info to screen at the end of each loop
+        if SampleCount!=None:
+            # SAMPLING MODE - count the valid strategies through each junction once, then draw random strategies
+            (WeightDict,ChoiceDict)=getStrategyWeights(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints,Temperature)
+            FinalStrategyList=[]
+            # Each protein has its own random sequence, so a seeded sample does not depend on the other proteins
+            if Args.seed!=None:
+                random.seed(f'{Args.seed} {ProteinName}')
+            if (0,0) in ChoiceDict:
+                FinalStrategyList=sampleStrategies(ChoiceDict,len(ProteinSeq),SampleCount,Temperature)
+            if Temperature==None:
+                ValidStrategyCount=WeightDict.get((0,0),0)
+                SampleDict[ProteinName]={"validstrategies":ValidStrategyCount}
+                print(f'Drew {len(FinalStrategyList)} random strategies uniformly from {ValidStrategyCount} valid strategies')
+            else:
+                SampleDict[ProteinName]={"temperature":Temperature}
+                print(f'Drew {len(FinalStrategyList)} random strategies weighted by exp(score/{Temperature})')
+        elif DiverseDistance!=None:
+            # DIVERSE MODE - the best strategies that differ from each other in at least DiverseDistance junctions; strategies
+            # are built in score order, and partial strategies that can only end too close to one already listed are pruned
+            (FinalStrategyList,SuppressedCount,PrunedCount,LimitReached)=getDiverseStrategies(StartPointDict,SegmentScoreDict,len(ProteinSeq),MaxStrategies,DiverseDistance,Constraints)
+            DiverseDict[ProteinName]={"suppressed":SuppressedCount,"pruned":PrunedCount,"limitreached":LimitReached}
             if report_to_screen==True:
-                if len(PartialStrategiesByEndPoint)>0:
-                    # Verbose printout for debugging
-                    # print(f'Total number of endpoints = {len(PartialStrategiesByEndPoint)}, ranging from {min(PartialStrategiesByEndPoint.keys())} to {max(PartialStrategiesByEndPoint.keys())}')
-                    # print(f'List of {len(NextQueue)} partial strategies trimmed to {len(StrategyQueue)}')
-                    # User printout
-                    report_trimmedstrategies=len(StrategyQueue)
-                    print(f'End of loop: {report_finalstrats} complete strategies for {ProteinName}\n{report_trimmedstrategies} remaining {loopcount+1}-segment strategies')
+                gettime(f'Found {len(FinalStrategyList)} strategies differing in at least {DiverseDistance} junctions; {SuppressedCount} strategies suppressed and {PrunedCount} partial strategies pruned as too similar')
+            if LimitReached==True:
+                print(f'WARNING: stopped after {DiverseCandidateLimit} partial strategies without finding {MaxStrategies} diverse strategies')
+        elif RerankFolder==None:
+            Deadline=None
+            if TimeBudget!=None:
+                Deadline=ProteinStartTime+TimeBudget
+            # BEAM WIDTH - a beam at least as wide as the output keeps the true top strategies, since each of them only
+            # needs its own partial strategy to stay among the best at every endpoint. A narrower beam is checked
+            # against the best completion of every trimmed partial strategy. In auto mode, a beam that is not proven
+            # exact is doubled until it finds as many strategies as are output; the last of these scores at most the
+            # true last top strategy, so a final beam as wide as the output only has to keep partial strategies that
+            # can still reach its score
+            CompletionDict=None
+            ScoreThreshold=None
+            if StrategyLimit<MaxStrategies:
+                (PrefixDict,CompletionDict)=getNodeScoreBounds(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints)
+            while True:
+                BuildArgs=(ProteinName,ProteinSeq,StartPointDict,Constraints,SegsToEndDict,StrategyLimit,Deadline,CompletionDict,ScoreThreshold)
+                if Args.benchmark==True:
+                    (FinalStrategyList,FrontierNodeSet,TrimmedBound)=benchmarkStrategySearch(BuildArgs,BenchmarkDict)
                 else:
-                    print(f'No partial strategies left - this is the final loop.')
-
-        # Finished with strategy-building loop
-        if report_to_screen==True:
-            gettime(f'--------\nDone with protein {ProteinName}...found {len(FinalStrategyList)} total strategies')
+                    (FinalStrategyList,FrontierNodeSet,TrimmedBound)=buildStrategies(*BuildArgs,Workers=SearchWorkerCount)
+                BeamIsExact=StrategyLimit>=MaxStrategies or strategiesAreExact(FinalStrategyList,TrimmedBound,MaxStrategies)
+                BeamDict[ProteinName]={"beam":StrategyLimit,"exact":FrontierNodeSet==None and BeamIsExact,"trimmedbound":TrimmedBound}
+                if BeamAuto==False or BeamDict[ProteinName]["exact"]==True or FrontierNodeSet!=None:
+                    break
+                if len(FinalStrategyList)>=MaxStrategies:
+                    ScoreThreshold=sorted((scoreStrategy(Strategy)['total'] for Strategy in FinalStrategyList),reverse=True)[MaxStrategies-1]
+                    StrategyLimit=MaxStrategies
+                    print(f'Output strategies are not proven exact; widening the beam to {StrategyLimit}, keeping only partial strategies that can reach {ScoreThreshold}')
+                else:
+                    StrategyLimit=min(2*StrategyLimit,MaxStrategies)
+                    print(f'Output strategies are not proven exact; widening the beam to {StrategyLimit}')
+            # ANYTIME MODE - the time budget ran out before all strategies were built. The best score of any strategy
+            # through each unfinished node bounds the strategies that were never built, and the single best strategy is
+            # always added (it comes straight from the forward pass, so it costs nothing extra)
+            if FrontierNodeSet!=None:
+                (PrefixDict,CompletionDict)=getNodeScoreBounds(StartPointDict,SegmentScoreDict,len(ProteinSeq),Constraints)
+                ScoreBound=None
+                for (Junction,NumberOfSegments) in FrontierNodeSet:
+                    if NumberOfSegments in CompletionDict.get(Junction,{}):
+                        NodeBound=PrefixDict[Junction][NumberOfSegments][0]+CompletionDict[Junction][NumberOfSegments]
+                        if ScoreBound==None or NodeBound>ScoreBound:
+                            ScoreBound=NodeBound
+                # Strategies trimmed by a narrow beam were not built either
+                if TrimmedBound!=None and (ScoreBound==None or TrimmedBound>ScoreBound):
+                    ScoreBound=TrimmedBound
+                BestStrategy=getBestStrategy(PrefixDict,CompletionDict,len(ProteinSeq))
+                if BestStrategy!=None and not BestStrategy in FinalStrategyList:
+                    FinalStrategyList.append(BestStrategy)
+                TimeBudgetDict[ProteinName]={"scorebound":ScoreBound}
+        else:
+            # RE-RANK MODE - the exact top strategies are found directly from the junction graph
+            FinalStrategyList=getTopStrategies(StartPointDict,SegmentScoreDict,len(ProteinSeq),MaxStrategies,Constraints)
+            if report_to_screen==True:
+                gettime(f'Re-ranked top {len(FinalStrategyList)} strategies for {ProteinName}')
 
     # CLEAN DATA FOR FILE OUTPUT
-    # Reset max strategies for file output
-    if unrestrained_mode==True:
-        MaxStrategies=OldMaxStrategies
-
     # Sort and trim final strategy list
-    if StrategiesArePossible==True:
+    # Sampled strategies are kept in the order they were drawn, so the sample stays unbiased
+    if StrategiesArePossible==True and SampleCount==None:
         FinalStrategyList.sort(key=lambda Strategy:scoreStrategy(Strategy)['total'],reverse=True)
         if len(FinalStrategyList)>MaxStrategies:
             FinalStrategyList = FinalStrategyList[0:MaxStrategies]
         if report_to_screen==True:
             gettime(f'Sorted final output list to top {MaxStrategies}')
 
+    if StrategiesArePossible==True:
+
+        # Anytime mode - no strategy that was not built can score above the score bound, so each listed strategy is
+        # within the optimality gap of the true strategy at the same rank, and listed strategies scoring at least the
+        # bound are exactly ranked
+        if ProteinName in TimeBudgetDict:
+            ScoreBound=TimeBudgetDict[ProteinName]["scorebound"]
+            ListedScoreList=[scoreStrategy(Strategy)['total'] for Strategy in FinalStrategyList]
+            OptimalityGap=0
+            ExactRanks=len(ListedScoreList)
+            if ScoreBound!=None and len(ListedScoreList)>0:
+                OptimalityGap=max(0,ScoreBound-ListedScoreList[-1])
+                ExactRanks=len([Score for Score in ListedScoreList if Score>=ScoreBound])
+            TimeBudgetDict[ProteinName].update({"optimalitygap":OptimalityGap,"exactranks":ExactRanks})
+            print(f'Strategies not built score at most {ScoreBound}; listed strategies are within {OptimalityGap} of optimal at each rank ({ExactRanks} exact)')
+
+        # Narrow beam - strategies that were trimmed score at most the trimmed bound, so listed strategies scoring at least
+        # the bound are exactly ranked (with a time budget, the trimmed bound is part of the score bound above instead)
+        if ProteinName in BeamDict and BeamDict[ProteinName]["exact"]==False and not ProteinName in TimeBudgetDict:
+            TrimmedBound=BeamDict[ProteinName]["trimmedbound"]
+            ListedScoreList=[scoreStrategy(Strategy)['total'] for Strategy in FinalStrategyList]
+            OptimalityGap=0
+            if len(ListedScoreList)>0:
+                OptimalityGap=max(0,TrimmedBound-ListedScoreList[-1])
+            ExactRanks=len([Score for Score in ListedScoreList if Score>=TrimmedBound])
+            BeamDict[ProteinName].update({"optimalitygap":OptimalityGap,"exactranks":ExactRanks})
+            print(f'Beam of {BeamDict[ProteinName]["beam"]} is not proven exact: strategies trimmed score at most {TrimmedBound}; listed strategies are within {OptimalityGap} of optimal at each rank ({ExactRanks} exact)')
+
         # Get the longest strategy in the list
         for Strategy in FinalStrategyList:
             StrategyLength=len(Strategy)-1 # Number of endpoints, minus the start 0
@@ -1046,52 +4771,105 @@ for (ProteinName,ProteinSeq) in ProteinNameAndSeqList:
                 MaxWidthSoFar=StrategyLength
         MaxWidthDict[ProteinName]=MaxWidthSoFar
 
-    print(f'Now writing to file')
-
-    # OUTPUT TOTAL SCORES CSV FILE
-    # Will be converted to .xlsx later
-    OutputFilepath=f'{OutputFolder}/Aligator Analysis for {ProteinName}.csv'
-    with open(OutputFilepath,'w') as f:
-        # Write file header w/column names
-        f.write('TOTAL SCORE,Thioester Score,Solubility Score,Segment Length Score,Thiol Penalty,#Ligations Penalty,Segments (from N- to C-terminus)...,\n')
-        # If strategies were not possible, write N/A in relevant columns
-        if StrategiesArePossible==False:
-            f.write('n/a,n/a,n/a,n/a,n/a,n/a,NO STRATEGIES')
-        # Otherwise, loop through final strategies and write to file
-        else:
-            for Strategy in FinalStrategyList:
-                Scores=scoreStrategy(Strategy)
-                f.write(f'{Scores["total"]},{Scores["thioester"]},{Scores["solubility"]},{Scores["length"]},{Scores["thiol"]},{Scores["ligations"]},')
-                # Write AA sequence of each segment
-                for i in range(0,len(Strategy)-1):
-                    LeftIndex=Strategy[i]
-                    RightIndex=Strategy[i+1]
-                    f.write(ProteinSeq[LeftIndex:RightIndex]+',')
-                f.write('\n')
-
-    # Record for later
-    LigFileDict[ProteinName]=OutputFilepath
-
-    # OUTPUT ALL STRATEGIES TEXT FILE
-    # Simpler output containing only the Total score and list of segments; ideal for passing to BracketMaker (github.com/Kay-Lab/BracketMaker)
-    if output_all_strategies_text==True and StrategiesArePossible==True:
-        # Name the folder and create the new directory (only first time)
-        AllStrategiesFolder="Ligation Strategies Text Files"
-        os.makedirs(f'{OutputFolder}/{AllStrategiesFolder}',exist_ok=True)
-        with open(f'{OutputFolder}/{AllStrategiesFolder}/{ProteinName} All Strategies.txt','w') as f:
-            # Write file header w/column names
-            f.write("Strategy Score\tSegments\n")
-            for Strategy in FinalStrategyList:
-                Scores=scoreStrategy(Strategy)
-                f.write(f'{Scores["total"]}\t')
-                for i in range(0,len(Strategy)-1):
-                    LeftIndex=Strategy[i]
-                    RightIndex=Strategy[i+1]
-                    SegmentKey=(LeftIndex,RightIndex)
-                    SegmentSequence = SegmentScoreDict[SegmentKey]['seq']
-                    f.write(f'{SegmentSequence}\t')
-                f.write('\n')
-
+    PipelineStats["search"]+=time.time()-SearchStartTime
+    stopProfilePhase(ProfileEntry,ProteinName,"Strategy search")
+
+    # PARETO FRONT
+    # Strategies that are not beaten on every chosen sub-score by another strategy; the files of all proteins are
+    # merged into one extra sheet of the Aligator Analysis workbook
+    ParetoStrategyList=None
+    ParetoWidth=1
+    if ParetoScoreList!=None:
+        ParetoStartTime=time.time()
+        ProfileEntry=startProfilePhase()
+        ParetoStrategyList=[]
+        if StrategiesArePossible==True:
+            ParetoStrategyList=getParetoStrategies(StartPointDict,SegmentScoreDict,len(ProteinSeq),ParetoScoreList,Constraints)
+            ParetoStrategyList.sort(key=lambda ParetoStrategy:scoreStrategy(ParetoStrategy[0])['total'],reverse=True)
+        ParetoCountDict[ProteinName]=[TieCount for (Strategy,TieCount) in ParetoStrategyList]
+        if report_to_screen==True:
+            gettime(f'Found {len(ParetoStrategyList)} points on the Pareto front over {", ".join(ParetoScoreList)}, reached by {sum(ParetoCountDict[ProteinName])} strategies')
+        for (Strategy,TieCount) in ParetoStrategyList:
+            ParetoWidth=max(ParetoWidth,len(Strategy)-1)
+        ParetoFileDict[ProteinName]=ProteinFileDict["pareto"]
+        ParetoMaxWidth=max(ParetoMaxWidth,ParetoWidth)
+        PipelineStats["pareto"]+=time.time()-ParetoStartTime
+        stopProfilePhase(ProfileEntry,ProteinName,"Pareto front")
+
+    # ASSEMBLY ORDER
+    # The best ligation order of each output strategy; the runs of segments shared by its strategies are scored once
+    AssemblyList=None
+    if Args.assembly==True:
+        AssemblyStartTime=time.time()
+        ProfileEntry=startProfilePhase()
+        AssemblyList=[]
+        AssemblyStatsDict[ProteinName]={"convergent":0,"runs":0,"allruns":0}
+        if StrategiesArePossible==True:
+            AssemblyMemo=startAssemblyMemo(ProteinSeq)
+            AssemblyList=[getAssemblyOrder(AssemblyMemo,Strategy) for Strategy in FinalStrategyList]
+            AssemblyStatsDict[ProteinName]={"convergent":len([Assembly for Assembly in AssemblyList if Assembly["convergent"]>0]),"runs":len(AssemblyMemo["runs"]),
+                                            "allruns":sum((len(Strategy)-1)*len(Strategy)//2 for Strategy in FinalStrategyList)}
+            del AssemblyMemo
+        if report_to_screen==True:
+            gettime(f'Found the best assembly orders of {len(AssemblyList)} strategies ({AssemblyStatsDict[ProteinName]["convergent"]} convergent), '
+                    f'scoring {AssemblyStatsDict[ProteinName]["runs"]} runs of segments')
+        AssemblyFileDict[ProteinName]=ProteinFileDict["assembly"]
+        PipelineStats["assembly"]+=time.time()-AssemblyStartTime
+        stopProfilePhase(ProfileEntry,ProteinName,"Assembly orders")
+
+    # BOUNDARY SCAN
+    # The best strategy of every construct between the start and end ranges, from the segments of the full sequence
+    ConstructList=None
+    if BoundaryRanges!=None:
+        BoundaryStartTime=time.time()
+        ProfileEntry=startProfilePhase()
+        ConstructList=scanConstructBoundaries(ProteinSeq,SegmentBorderList,SegmentScoreDict,BoundaryStartPointDict,BoundaryRanges[0],BoundaryRanges[1],Constraints)
+        PossibleList=[Construct for Construct in ConstructList if Construct["strategy"]!=None]
+        BoundaryStatsDict[ProteinName]={"constructs":len(ConstructList),"possible":len(PossibleList),"bestscore":None,"beststart":None,"bestend":None}
+        if len(PossibleList)>0:
+            BestConstruct=max(PossibleList,key=lambda Construct:Construct["scores"]["total"])
+            BoundaryStatsDict[ProteinName].update({"bestscore":BestConstruct["scores"]["total"],"beststart":BestConstruct["start"]+1,"bestend":BestConstruct["end"]})
+        if report_to_screen==True:
+            gettime(f'Found the best strategies of {len(PossibleList)} of {len(ConstructList)} constructs')
+        BoundaryFileDict[ProteinName]=ProteinFileDict["boundary"]
+        del BoundaryStartPointDict,PossibleList
+        PipelineStats["boundary"]+=time.time()-BoundaryStartTime
+        stopProfilePhase(ProfileEntry,ProteinName,"Boundary scan")
+
+    # Summary of this protein for the run manifest
+    ManifestEntry={"protein":ProteinName,"length":len(ProteinSeq),"strategies":0,"bestscore":None,"bestsegments":None,
+                   "timebudgetreached":ProteinName in TimeBudgetDict,"runtime":round(time.time()-ProteinStartTime,2),
+                   "parameterhash":ParameterHash,"maxwidth":MaxWidthDict[ProteinName]}
+    if StrategiesArePossible==True and len(FinalStrategyList)>0:
+        BestListed=max(FinalStrategyList,key=lambda Strategy:scoreStrategy(Strategy)['total'])
+        ManifestEntry.update({"strategies":len(FinalStrategyList),"bestscore":scoreStrategy(BestListed)['total'],"bestsegments":len(BestListed)-1})
+    if ProteinName in TimeBudgetDict:
+        ManifestEntry.update(TimeBudgetDict[ProteinName])
+    if ProteinName in SampleDict:
+        ManifestEntry.update(SampleDict[ProteinName])
+    if ProteinName in BeamDict:
+        ManifestEntry.update({"beam":BeamDict[ProteinName]})
+    if ProteinName in DiverseDict:
+        ManifestEntry.update({"diverse":DiverseDict[ProteinName]})
+    if ProteinName in ParetoCountDict:
+        ManifestEntry.update({"paretoties":ParetoCountDict[ProteinName],"paretowidth":ParetoWidth})
+    if ProteinName in AssemblyStatsDict:
+        ManifestEntry.update({"assembly":AssemblyStatsDict[ProteinName]})
+    if ProteinName in BoundaryStatsDict:
+        ManifestEntry.update({"boundary":BoundaryStatsDict[ProteinName]})
+
+    # Hand the results to the output writer, and free them here; the writer frees them once they are written
+    if StrategiesArePossible==False:
+        FinalStrategyList=[]
+    queueOutputJob(OutputQueue,PipelineStats,{"protein":ProteinName,"sequence":ProteinSeq,"files":ProteinFileDict,"segmentscores":SegmentScoreDict,
+                                              "strategies":FinalStrategyList,"strategiespossible":StrategiesArePossible,"constraints":Constraints,
+                                              "pareto":ParetoStrategyList,"timebudget":TimeBudgetDict.get(ProteinName),"beam":BeamDict.get(ProteinName),
+                                              "diverse":DiverseDict.get(ProteinName),"sample":SampleDict.get(ProteinName),"assembly":AssemblyList,"usage":UsageMarginals,"sensitivity":JunctionSensitivity,"boundary":ConstructList,"manifest":ManifestEntry})
+    SegFileDict[ProteinName]=ProteinFileDict["segments"]
+    SensitivityFileDict[ProteinName]=ProteinFileDict["sensitivity"]
+    LigFileDict[ProteinName]=ProteinFileDict["analysis"]
+    print('Queued output files for writing')
+    del SegmentScoreDict,StartPointDict,SegsToEndDict,FinalStrategyList,ParetoStrategyList,AssemblyList,UsageMarginals,JunctionSensitivity,ConstructList
 
     gettime('end')
     print("**************")
@@ -1099,9 +4877,144 @@ for (ProteinName,ProteinSeq) in ProteinNameAndSeqList:
     # END PROCESSING THIS FILE
 # END LOOP THROUGH FILES
 
+# Wait for the output writer to finish the last proteins
+OutputQueue.put(None)
+OutputWriter.join()
+SearchPoolStack.close()
+if PipelineStats["error"]!=None:
+    raise PipelineStats["error"]
+
 #Saves run time of Aligator.
 RunTime = round((time.time() - start_time), 2)
 
+#Writes the segments shared between proteins, and how many segments were scored for the whole batch, to the run info file.
+ReusableSegmentsFilepath=None
+if len(ProteinNameAndSeqList)>1:
+    ReusableSegmentsFilepath=f'{OutputFolder}/Reusable Segments for {folder}.csv'
+    ReusableSegmentCount=writeReusableSegments(SegmentIndex,ReusableSegmentsFilepath)
+    SegmentUseCount=sum(len(IndexEntry["uses"]) for IndexEntry in SegmentIndex.values())
+    RunInfoFile.write(f"SEGMENT INDEX: {len(SegmentIndex)} unique segments for {SegmentUseCount} valid segments in {len(ProteinNameAndSeqList)} proteins\n")
+    RunInfoFile.write(f"{ReusableSegmentCount} segments are valid in more than one protein (Reusable Segments sheet of the Viable Segment Lists file)\n")
+    RunInfoFile.write("\n")
+    print(f'{ReusableSegmentCount} segments are shared between proteins ({len(SegmentIndex)} unique segments in {SegmentUseCount} valid segments)')
+    print("")
+
+#Reports the time spent in each stage of the pipeline, and how long the computation and the output writer waited for
+#each other through the queue, to the screen and the run info file.
+PipelineReport=[f'Reading FASTA files: {PipelineStats["ingest"]:.2f} s',
+                f'Segment scoring: {PipelineStats["scoring"]:.2f} s',
+                f'Strategy search: {PipelineStats["search"]:.2f} s']
+if ParetoScoreList!=None:
+    PipelineReport.append(f'Pareto front: {PipelineStats["pareto"]:.2f} s')
+if Args.assembly==True:
+    PipelineReport.append(f'Assembly orders: {PipelineStats["assembly"]:.2f} s')
+if BoundaryRanges!=None:
+    PipelineReport.append(f'Boundary scan: {PipelineStats["boundary"]:.2f} s')
+PipelineReport+=[f'Writing output files (background): {PipelineStats["write"]:.2f} s',
+                 f'Queue wait, computation waiting for the writer: {PipelineStats["computewait"]:.2f} s',
+                 f'Queue wait, writer waiting for the computation: {PipelineStats["writerwait"]:.2f} s']
+if report_to_screen==True:
+    print("PIPELINE STAGE TIMES:")
+    for Line in PipelineReport:
+        print(Line)
+    print("")
+RunInfoFile.write("PIPELINE STAGE TIMES:\n")
+for Line in PipelineReport:
+    RunInfoFile.write(Line+"\n")
+RunInfoFile.write("\n")
+
+#Reports the strategy search time and speedup with each number of workers (--benchmark).
+if len(BenchmarkDict)>0:
+    BenchmarkReport=getBenchmarkReport(BenchmarkDict)
+    if report_to_screen==True:
+        print("STRATEGY SEARCH BENCHMARK:")
+        for Line in BenchmarkReport:
+            print(Line.replace(","," | "))
+        print("")
+    RunInfoFile.write("STRATEGY SEARCH BENCHMARK (strategies found are identical with every number of workers):\n")
+    for Line in BenchmarkReport:
+        RunInfoFile.write(Line+"\n")
+    RunInfoFile.write("\n")
+
+#Writes the proteins that reached the time budget to the run info file.
+if TimeBudget!=None:
+    RunInfoFile.write(f"TIME BUDGET PER PROTEIN: {TimeBudget} seconds\n")
+    if len(TimeBudgetDict)==0:
+        RunInfoFile.write("No proteins reached the time budget.\n")
+    for ProteinName in TimeBudgetDict:
+        RunInfoFile.write(f'{ProteinName} reached the time budget (score bound for strategies not built = {TimeBudgetDict[ProteinName]["scorebound"]}, '
+                          f'optimality gap = {TimeBudgetDict[ProteinName]["optimalitygap"]}, exact ranks = {TimeBudgetDict[ProteinName]["exactranks"]})\n')
+    RunInfoFile.write("\n")
+
+#Writes the beam width used for each protein, and whether its output strategies are proven exact, to the run info file.
+if len(BeamDict)>0:
+    if BeamAuto==True:
+        RunInfoFile.write(f"BEAM WIDTH: auto (starting at {max(1,int(MaxStrategies*AutoBeamFraction))} strategies per endpoint, up to {MaxStrategies})\n")
+    else:
+        RunInfoFile.write(f"BEAM WIDTH: {BeamWidth if BeamWidth!=None else MaxStrategies} strategies per endpoint\n")
+    for ProteinName in BeamDict:
+        if BeamDict[ProteinName]["exact"]==True:
+            RunInfoFile.write(f'{ProteinName}: beam {BeamDict[ProteinName]["beam"]}, exact\n')
+        elif "optimalitygap" in BeamDict[ProteinName]:
+            RunInfoFile.write(f'{ProteinName}: beam {BeamDict[ProteinName]["beam"]}, not proven exact (optimality gap = {BeamDict[ProteinName]["optimalitygap"]}, exact ranks = {BeamDict[ProteinName]["exactranks"]})\n')
+        else:
+            RunInfoFile.write(f'{ProteinName}: beam {BeamDict[ProteinName]["beam"]}, not proven exact (time budget reached)\n')
+    RunInfoFile.write("\n")
+
+#Writes the minimum junction distance and the number of strategies suppressed for each protein to the run info file.
+if DiverseDistance!=None:
+    RunInfoFile.write(f"DIVERSE STRATEGIES: strategies differ from each other in at least {DiverseDistance} junctions\n")
+    for ProteinName in DiverseDict:
+        LimitText=f' (stopped after {DiverseCandidateLimit} partial strategies)' if DiverseDict[ProteinName]["limitreached"]==True else ''
+        RunInfoFile.write(f'{ProteinName}: {DiverseDict[ProteinName]["suppressed"]} strategies suppressed and {DiverseDict[ProteinName]["pruned"]} partial strategies pruned as too similar{LimitText}\n')
+    RunInfoFile.write("\n")
+
+#Writes the sampling settings and the number of valid strategies for each protein to the run info file.
+if SampleCount!=None:
+    if Temperature==None:
+        RunInfoFile.write(f"RANDOM SAMPLE: {SampleCount} strategies per protein, drawn uniformly from all valid strategies\n")
+    else:
+        RunInfoFile.write(f"RANDOM SAMPLE: {SampleCount} strategies per protein, drawn with probability proportional to exp(score/{Temperature})\n")
+    if Args.seed!=None:
+        RunInfoFile.write(f"Random seed: {Args.seed}\n")
+    for ProteinName in SampleDict:
+        if Temperature==None:
+            RunInfoFile.write(f'{ProteinName}: {SampleDict[ProteinName]["validstrategies"]} valid strategies\n')
+    RunInfoFile.write("\n")
+
+#Writes the assembly order weights and, for each protein, how many strategies are best assembled convergently to the run info file.
+if Args.assembly==True:
+    RunInfoFile.write(f'ASSEMBLY ORDER WEIGHTS: ligation step = {AssemblyWeights["LigationStep"]}, convergent ligation = {AssemblyWeights["ConvergentLigation"]}, '
+                      f'intermediate solubility = {AssemblyWeights["IntermediateSolubility"]}\n')
+    for ProteinName in AssemblyStatsDict:
+        RunInfoFile.write(f'{ProteinName}: {AssemblyStatsDict[ProteinName]["convergent"]} strategies best assembled convergently; '
+                          f'{AssemblyStatsDict[ProteinName]["runs"]} runs of segments scored for {AssemblyStatsDict[ProteinName]["allruns"]} in all strategies\n')
+    RunInfoFile.write("\n")
+
+#Writes the construct ranges and the best construct of each protein to the run info file.
+if BoundaryRanges!=None:
+    RunInfoFile.write(f"BOUNDARY SCAN: constructs starting at residues {Args.boundary_scan.split(':')[0].strip()} and ending at residues {Args.boundary_scan.split(':')[1].strip()}\n")
+    for ProteinName in BoundaryStatsDict:
+        BestText="no constructs have strategies"
+        if BoundaryStatsDict[ProteinName]["bestscore"]!=None:
+            BestText=f'best construct {BoundaryStatsDict[ProteinName]["beststart"]}-{BoundaryStatsDict[ProteinName]["bestend"]} (score {BoundaryStatsDict[ProteinName]["bestscore"]})'
+        RunInfoFile.write(f'{ProteinName}: {BoundaryStatsDict[ProteinName]["possible"]} of {BoundaryStatsDict[ProteinName]["constructs"]} constructs have strategies; {BestText}\n')
+    RunInfoFile.write("\n")
+
+#Writes the sub-scores of the Pareto front, and the number of points on the front and of strategies tied at each point for each protein, to the run info file.
+if ParetoScoreList!=None:
+    RunInfoFile.write(f"PARETO FRONT OVER: {', '.join(ParetoScoreList)}\n")
+    for ProteinName in ParetoCountDict:
+        TieText=', '.join(str(TieCount) for TieCount in ParetoCountDict[ProteinName])
+        RunInfoFile.write(f'{ProteinName}: {len(ParetoCountDict[ProteinName])} points on the Pareto front, reached by {sum(ParetoCountDict[ProteinName])} Pareto-optimal strategies '
+                          f'(tied strategies at each point, in the order of the Pareto Front sheet: {TieText})\n')
+    RunInfoFile.write("\n")
+
+#Writes where the results database is, and the run_id of this run in it, to the run info file.
+if ResultsDatabase!=None:
+    RunInfoFile.write(f"RESULTS DATABASE: {os.path.abspath(ResultsDatabasePath)} (run_id {DatabaseRunId})\n")
+    RunInfoFile.write("\n")
+
 #Writes run time to the run info file and closes the file.
 RunInfoFile.write("Aligator took "+str(RunTime)+" seconds to run.")
 RunInfoFile.close()
@@ -1110,77 +5023,62 @@ RunInfoFile.close()
 # Merge output .csv files into .xlsx documents
 if merge_output_csv==True:
     print("Merging output CSV files to Excel format")
+    ProfileEntry=startProfilePhase()
+    ProteinNameList=list(SegFileDict)
+    SheetTitleDict=getSheetTitles(ProteinNameList)
+    for ProteinName in ProteinNameList:
+        if SheetTitleDict[ProteinName]!=ProteinName:
+            print(f'The sheets of {ProteinName} are named "{SheetTitleDict[ProteinName]}" (Excel sheet names have at most {ExcelTitleLength} characters, none of []:*?/\\, and differ in more than case)')
+    # CSV files are only deleted after all workbooks are saved, so an interrupted merge can be resumed
+    MergedFileList=[FileDict[ProteinName] for FileDict in (SegFileDict,SensitivityFileDict,LigFileDict,ParetoFileDict,AssemblyFileDict,BoundaryFileDict) for ProteinName in FileDict]
+    if ReusableSegmentsFilepath!=None:
+        MergedFileList.append(ReusableSegmentsFilepath)
+
+    if ShardProteins==None and ShardBytes==None:
+        # SEGMENT LISTS AND ALIGATOR STRATEGIES
+        writeSegmentWorkbook((f"{OutputFolder}/Viable Segment Lists for {folder}.xlsx",ProteinNameList,SheetTitleDict,ReusableSegmentsFilepath))
+        writeAnalysisWorkbook((f"{OutputFolder}/Aligator Analysis for {folder}.xlsx",ProteinNameList,SheetTitleDict))
+    else:
+        # SHARDED WORKBOOKS - each shard's pair of workbooks is built on a worker process (forked, so the workers share
+        # the file lists of the run), and the index workbook is written once they are all saved
+        ShardList=getExcelShards(ProteinNameList,ShardProteins,ShardBytes)
+        ShardFileList=[(f"{OutputFolder}/Viable Segment Lists for {folder} part {ShardNumber} of {len(ShardList)}.xlsx",
+                        f"{OutputFolder}/Aligator Analysis for {folder} part {ShardNumber} of {len(ShardList)}.xlsx") for ShardNumber in range(1,len(ShardList)+1)]
+        TaskList=[]
+        for (ShardProteinList,(SegmentFilepath,AnalysisFilepath)) in zip(ShardList,ShardFileList):
+            TaskList+=[(writeSegmentWorkbook,(SegmentFilepath,ShardProteinList,SheetTitleDict,None)),(writeAnalysisWorkbook,(AnalysisFilepath,ShardProteinList,SheetTitleDict))]
+        ExportWorkers=min(WorkerCount,len(TaskList))
+        if not "fork" in multiprocessing.get_all_start_methods():
+            ExportWorkers=1
+        if ExportWorkers>1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=ExportWorkers,mp_context=multiprocessing.get_context("fork"),
+                                                        initializer=signal.signal,initargs=(signal.SIGINT,signal.SIG_IGN)) as ExportPool:
+                for Future in [ExportPool.submit(Function,Task) for (Function,Task) in TaskList]:
+                    Future.result()
+        else:
+            for (Function,Task) in TaskList:
+                Function(Task)
+        writeExcelIndex(f"{OutputFolder}/Aligator Output Index for {folder}.xlsx",ShardList,ShardFileList,SheetTitleDict,ReusableSegmentsFilepath)
+        print(f'Wrote {len(ShardList)} pairs of workbooks, {ExportWorkers} at a time; the Aligator Output Index file lists the workbook of each protein')
 
-    # SEGMENT LISTS
-    # Create Excel file for viable segment lists
-    ExcelFileSeg=openpyxl.Workbook()
-
-    # From recorded list of relevant files, create a new Excel sheet for each and transfer all of the data
-    for SheetName in SegFileDict:
-        ExcelFileSeg.create_sheet(index=-1,title=SheetName)
-        sheet=ExcelFileSeg[SheetName]
-        filepath=SegFileDict[SheetName]
-        with open(filepath,'r') as f:
-            reader=csv.reader(f, delimiter=',')
-            for row in reader:
-                sheet.append(row)
-
-        # Apply formatting to header row
-        for cell in ("A1","B1","C1","D1","E1","F1"):
-            sheet[cell].alignment = center
-            sheet[cell].font = Font(size = 12, bold = True)
-        sheet["C1"].fill=aquaFill
-        sheet["E1"].fill=redFill
-
-        # Delete the csv file
-        os.remove(filepath)
-
-    # Remove initial blank sheet
-    ExcelFileSeg.remove(ExcelFileSeg["Sheet"])
-
-    # Save output file
-    ExcelFileSeg.save(f"{OutputFolder}/Viable Segment Lists for {folder}.xlsx")
-
-
-    # ALIGATOR STRATEGIES
-    # Create Excel file for ligation strategy scores
-    ExcelFileLig=openpyxl.Workbook()
-
-    # From recorded list of relevant files, create a new Excel sheet for each and transfer all of the data
-    for SheetName in LigFileDict:
-        ExcelFileLig.create_sheet(index=-1,title=SheetName)
-        sheet=ExcelFileLig[SheetName]
-        filepath=LigFileDict[SheetName]
-        with open(filepath,'r') as f:
-            reader=csv.reader(f, delimiter=',')
-            for row in reader:
-                sheet.append(row)
-
-        # Apply formatting to header row
-        for cell in ("A1","B1","C1","D1","E1","F1","G1"):
-            sheet[cell].alignment = center
-            sheet[cell].font = Font(size = 12, bold = True)
-        sheet["A1"].fill=greenFill
-        sheet["B1"].fill=redFill
-        sheet["C1"].fill=redFill
-        sheet["D1"].fill=redFill
-        sheet["E1"].fill=redFill
-        sheet["F1"].fill=redFill
-        sheet["G1"].fill=aquaFill
-
-        # Merge "Segments N to C" header to span entire row, from width recorded during processing
-        if MaxWidthDict[SheetName]>1:
-            extracells=MaxWidthDict[SheetName]-1
-            sheet.merge_cells(start_row=1, start_column=7, end_row=1, end_column=7+extracells)
+    # BOUNDARY SCANS
+    if BoundaryRanges!=None:
+        writeBoundaryWorkbook(f"{OutputFolder}/Aligator Boundary Scan for {folder}.xlsx",ProteinNameList,SheetTitleDict)
 
-        # Delete the csv file
+    for filepath in MergedFileList:
         os.remove(filepath)
-
-    # Remove initial blank sheet
-    ExcelFileLig.remove(ExcelFileLig["Sheet"])
-
-    # Save output file
-    ExcelFileLig.save(f"{OutputFolder}/Aligator Analysis for {folder}.xlsx")
+    stopProfilePhase(ProfileEntry,None,"Excel merge")
+
+#Writes the profile reports (--profile).
+if len(ProfileDict)>0 or len(RunProfileDict)>0:
+    ProfileFolder=writeProfileReports(ProfileDict,RunProfileDict)
+    print(f'Profile reports are in the {os.path.basename(ProfileFolder)} sub-folder.')
+
+# The run is complete, so there is nothing left to resume
+writeRunManifest(ManifestList,True)
+if ResultsDatabase!=None:
+    finishDatabaseRun(ResultsDatabase,DatabaseRunId,RunTime)
+    ResultsDatabase.close()
 
 #Prints conclusion to user and lists full time it took to run Aligator.
 print ("Aligator complete! Your data files are in the "+timestamp+" folder.")